@@ -0,0 +1,325 @@
+"""
+Benchmark batch của ba chế độ trên workload tổng hợp (benchmarks/workload_generator.py).
+
+Mỗi trường hợp chạy đúng pipeline mà giao diện/CLI dùng và lấy thời gian theo
+giai đoạn từ utils.stage_timer:
+
+    read     đọc file Excel đầu vào
+    extract  tách dữ liệu từng dòng / đánh giá hệ số
+    encode   mã hóa keylog
+    solve    giải hệ / tìm nghiệm (gồm cả dựng kết quả của chế độ đa thức)
+    export   ghi workbook kết quả (hình học ghi streaming trong cùng pipeline)
+
+Kết quả là JSON (mỗi trường hợp có id cố định) để so sánh giữa các commit:
+
+    python benchmarks/batch_benchmark.py --rows 1k --output before.json
+    git checkout <commit khác>
+    python benchmarks/batch_benchmark.py --rows 1k --output after.json --compare before.json
+
+Các tham số khác:
+    --modes geometry,equation,polynomial   chế độ cần đo
+    --geometry-cases all|quick             mọi tổ hợp đối tượng/phép toán hoặc một tổ hợp mỗi phép toán
+    --rows 1k,100k,1M                      kích thước workload (sinh lần đầu, dùng lại ở lần sau)
+    --repeat 3                             lặp mỗi trường hợp, lấy lần nhanh nhất
+
+Mã thoát 1 nếu có --compare, --fail-on-regression và một trường hợp chậm hơn
+baseline quá --threshold.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.workload_generator import (DEFAULT_SEED, DEFAULT_WORKLOAD_DIR, generate_workload,  # noqa: E402
+                                           parse_rows)
+
+SHAPES = ["Điểm", "Đường thẳng", "Mặt phẳng", "Đường tròn", "Mặt cầu"]
+DISTANCE_SHAPES = ["Điểm", "Đường thẳng", "Mặt phẳng"]
+REPORTED_STAGES = ["read", "extract", "encode", "solve", "export"]
+# Chênh lệch tuyệt đối nhỏ hơn mức này không tính là chậm đi (nhiễu đo)
+NOISE_FLOOR_SECONDS = 0.05
+
+
+def geometry_cases(selection: str = "all") -> List[Tuple[str, str, Optional[str]]]:
+    """
+    Các tổ hợp (phép toán, đối tượng A, đối tượng B) theo đúng lựa chọn của giao diện
+    (GeometryController.update_dropdown_options).
+    """
+    cases = [("Tương giao", a, b) for a in SHAPES for b in SHAPES]
+    cases += [("Khoảng cách", a, b) for a in DISTANCE_SHAPES for b in DISTANCE_SHAPES]
+    cases += [("Diện tích", "Đường tròn", None), ("Diện tích", "Mặt cầu", None),
+              ("Thể tích", "Mặt cầu", None), ("PT đường thẳng", "Điểm", "Điểm")]
+    if selection == "quick":
+        seen = set()
+        cases = [case for case in cases if not (case[0] in seen or seen.add(case[0]))]
+    return cases
+
+
+# ========== CHẠY TỪNG CHẾ ĐỘ ==========
+def _stage_seconds(report: Dict[str, Any], name: str) -> float:
+    return report['stages'].get(name, {}).get('seconds', 0.0)
+
+
+def run_geometry_case(file_path: str, output_dir: str, operation: str, shape_a: str, shape_b: Optional[str],
+                      version: str, workers: int, chunksize: int) -> Dict[str, Any]:
+    from controllers.geometry_controller import GeometryController
+    from utils.stage_timer import StageTimer
+
+    controller = GeometryController()
+    controller.set_current_version(version)
+    timer = StageTimer('geometry')
+    started = time.perf_counter()
+    _, _, processed, errors = controller.process_excel_batch_chunked(
+        file_path, shape_a, shape_b, operation, "3", "3", chunksize=chunksize,
+        output_path=os.path.join(output_dir, "geometry.xlsx"), workers=workers, timer=timer
+    )
+    wall = time.perf_counter() - started
+    report = timer.report()
+    return {
+        'wall_seconds': wall,
+        'stages': {
+            'read': _stage_seconds(report, 'open') + _stage_seconds(report, 'read'),
+            'extract': _stage_seconds(report, 'extract'),
+            'encode': _stage_seconds(report, 'encode'),
+            'solve': 0.0,
+            'export': _stage_seconds(report, 'write'),
+        },
+        'rows_ok': processed,
+        'rows_error': errors,
+    }
+
+
+def run_equation_case(file_path: str, output_dir: str, so_an: int, version: str) -> Dict[str, Any]:
+    from controllers.equation_controller import EquationController
+    from processors.excel_processor import ExcelProcessor
+    from views.equation.batch_processing_service import BatchProcessingService
+    from views.equation.file_import_export_service import FileImportExportService
+    from utils.stage_timer import StageTimer
+
+    excel_processor = ExcelProcessor()
+    batch_service = BatchProcessingService(EquationController(), excel_processor)
+    file_service = FileImportExportService(excel_processor)
+    process_timer = StageTimer('equation')
+    export_timer = StageTimer('equation')
+
+    started = time.perf_counter()
+    results = batch_service.process_batch_file(file_path, so_an, version, timer=process_timer)
+    export_started = time.perf_counter()
+    file_service.export_batch_results(file_path, results, so_an,
+                                      os.path.join(output_dir, "equation.xlsx"), export_timer)
+    finished = time.perf_counter()
+
+    report = process_timer.report()
+    errors = sum(1 for result in results if result.get('trang_thai') == 'Lỗi')
+    return {
+        'wall_seconds': finished - started,
+        'stages': {
+            'read': _stage_seconds(report, 'read'),
+            'extract': _stage_seconds(report, 'extract'),
+            'encode': _stage_seconds(report, 'encode'),
+            'solve': _stage_seconds(report, 'solve'),
+            'export': finished - export_started,
+        },
+        'rows_ok': len(results) - errors,
+        'rows_error': errors,
+    }
+
+
+def run_polynomial_case(file_path: str, output_dir: str, degree: int = 2) -> Dict[str, Any]:
+    from processors.excel_processor import ExcelProcessor
+    from views.polynomial.polynomial_batch_service import PolynomialBatchService
+    from utils.stage_timer import StageTimer
+
+    batch_service = PolynomialBatchService(ExcelProcessor())
+    process_timer = StageTimer('polynomial')
+    export_timer = StageTimer('polynomial')
+
+    started = time.perf_counter()
+    results = batch_service.process_batch_file(file_path, degree, process_timer)
+    export_started = time.perf_counter()
+    batch_service.export_batch_results(file_path, results, os.path.join(output_dir, "polynomial.xlsx"),
+                                       export_timer)
+    finished = time.perf_counter()
+
+    report = process_timer.report()
+    errors = sum(1 for result in results if result.get('trang_thai') == 'Lỗi')
+    return {
+        'wall_seconds': finished - started,
+        'stages': {
+            'read': _stage_seconds(report, 'read'),
+            'extract': _stage_seconds(report, 'extract'),
+            'encode': 0.0,
+            'solve': _stage_seconds(report, 'solve') + _stage_seconds(report, 'build'),
+            'export': finished - export_started,
+        },
+        'rows_ok': len(results) - errors,
+        'rows_error': errors,
+    }
+
+
+def build_cases(args: argparse.Namespace) -> List[Tuple[str, str, str, Callable[[str, str], Dict[str, Any]]]]:
+    """[(chế độ, tên trường hợp, loại workload, hàm chạy(file, thư mục output))]"""
+    modes = [mode.strip() for mode in args.modes.split(",")]
+    cases = []
+    if "geometry" in modes:
+        for operation, shape_a, shape_b in geometry_cases(args.geometry_cases):
+            name = f"{operation}/{shape_a}" + (f"-{shape_b}" if shape_b else "")
+            cases.append(("geometry", name, "geometry",
+                          lambda path, out, op=operation, a=shape_a, b=shape_b:
+                          run_geometry_case(path, out, op, a, b, args.version, args.workers, args.chunk_size)))
+    if "equation" in modes:
+        for so_an in (2, 3, 4):
+            cases.append(("equation", f"{so_an}_an", f"equation_{so_an}",
+                          lambda path, out, n=so_an: run_equation_case(path, out, n, args.version)))
+    if "polynomial" in modes:
+        cases.append(("polynomial", "bac_2_3_4", "polynomial", run_polynomial_case))
+    return cases
+
+
+# ========== CHẠY VÀ SO SÁNH ==========
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                   capture_output=True, text=True, timeout=10)
+        return completed.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    report = {
+        'benchmark': 'batch',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'workers': args.workers,
+        'repeat': args.repeat,
+        'cases': [],
+    }
+    cases = build_cases(args)
+
+    for rows in (parse_rows(text) for text in args.rows.split(",")):
+        for mode, name, kind, run in cases:
+            file_path = generate_workload(kind, rows, args.seed, args.workload_dir)
+            runs = []
+            for _ in range(max(1, args.repeat)):
+                with tempfile.TemporaryDirectory() as output_dir, \
+                        open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    # Log từng dòng lỗi của pipeline không được tính vào thời gian đo trên console
+                    runs.append(run(file_path, output_dir))
+            best = min(runs, key=lambda result: result['wall_seconds'])
+
+            case = {
+                'id': f"{mode}/{name}/{rows}",
+                'mode': mode,
+                'case': name,
+                'rows': rows,
+                'wall_seconds': round(best['wall_seconds'], 4),
+                'rows_per_second': round(rows / best['wall_seconds'], 1) if best['wall_seconds'] > 0 else None,
+                'stages': {stage: round(best['stages'].get(stage, 0.0), 4) for stage in REPORTED_STAGES},
+                'rows_ok': best['rows_ok'],
+                'rows_error': best['rows_error'],
+            }
+            report['cases'].append(case)
+            print(f"{case['id']}: {case['wall_seconds']:.3f}s ({case['rows_per_second']} dòng/giây)",
+                  file=sys.stderr)
+    return report
+
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    So sánh từng trường hợp có cùng id với baseline.
+
+    Returns:
+        Danh sách so sánh; 'regression' = True nếu chậm hơn quá threshold (tỉ lệ)
+        và quá NOISE_FLOOR_SECONDS
+    """
+    baseline_cases = {case['id']: case for case in baseline.get('cases', [])}
+    comparisons = []
+    for case in current['cases']:
+        before = baseline_cases.get(case['id'])
+        if before is None:
+            continue
+        ratio = case['wall_seconds'] / before['wall_seconds'] if before['wall_seconds'] > 0 else None
+        delta = case['wall_seconds'] - before['wall_seconds']
+        comparisons.append({
+            'id': case['id'],
+            'baseline_seconds': before['wall_seconds'],
+            'current_seconds': case['wall_seconds'],
+            'ratio': round(ratio, 3) if ratio is not None else None,
+            'stage_ratios': {
+                stage: round(case['stages'][stage] / before['stages'][stage], 3)
+                for stage in REPORTED_STAGES
+                if before.get('stages', {}).get(stage) and stage in case['stages']
+            },
+            'regression': ratio is not None and ratio > 1 + threshold and delta > NOISE_FLOOR_SECONDS,
+        })
+    return comparisons
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark batch hình học, hệ phương trình, đa thức")
+    parser.add_argument("--modes", default="geometry,equation,polynomial", help="Các chế độ cần đo")
+    parser.add_argument("--rows", default="1k", help="Số dòng mỗi workload (vd. 1k,100k,1M)")
+    parser.add_argument("--geometry-cases", default="all", choices=["all", "quick"],
+                        help="all: mọi tổ hợp; quick: một tổ hợp mỗi phép toán")
+    parser.add_argument("--version", default="fx799", help="Phiên bản máy tính")
+    parser.add_argument("--workers", type=int, default=1, help="Số process mã hóa hình học")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Số dòng mỗi chunk (hình học)")
+    parser.add_argument("--repeat", type=int, default=1, help="Số lần chạy mỗi trường hợp (lấy lần nhanh nhất)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed sinh workload")
+    parser.add_argument("--workload-dir", default=DEFAULT_WORKLOAD_DIR, help="Thư mục chứa workload")
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file thay vì stdout")
+    parser.add_argument("--compare", help="File kết quả baseline để so sánh")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Tỉ lệ chậm đi tối đa cho phép (0.10 = 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Mã thoát 1 nếu có trường hợp chậm đi")
+    args = parser.parse_args(argv)
+
+    # Đường dẫn người dùng tính theo thư mục hiện tại; config/ tính theo thư mục dự án
+    args.workload_dir = os.path.abspath(args.workload_dir)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    os.chdir(PROJECT_ROOT)
+
+    report = run_benchmark(args)
+
+    regressions = []
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparisons = compare_reports(report, baseline, args.threshold)
+        report['comparison'] = {'baseline': baseline_path, 'baseline_commit': baseline.get('git_commit'),
+                                'threshold': args.threshold, 'cases': comparisons}
+        for item in comparisons:
+            status = "CHẬM HƠN" if item['regression'] else "OK"
+            print(f"[{status}] {item['id']}: {item['baseline_seconds']:.3f}s → {item['current_seconds']:.3f}s "
+                  f"(x{item['ratio']})", file=sys.stderr)
+        regressions = [item for item in comparisons if item['regression']]
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    return 1 if args.fail_on_regression and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
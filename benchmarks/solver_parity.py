@@ -0,0 +1,122 @@
+"""
+Kiểm tra batch solver hệ phương trình cho kết quả giống hệt giải từng hệ.
+
+So sánh EquationSolverService.solve_equation_systems (Gauss-Jordan vector hóa)
+với solve_equation_system (từng hệ) trên các hệ ngẫu nhiên theo seed cố định:
+
+    mixed      hệ số trộn như dữ liệu thật (benchmarks/workload_generator.py)
+    realistic  1/3, \\sqrt{2}, \\frac{1}{7}, 100000, 1.0000000001...
+    tiny       hệ số cỡ 1e-9 / 1e-11 (gần ngưỡng eps của Gauss-Jordan)
+    singular   hai phương trình gần tỉ lệ (suy biến / điều kiện kém)
+
+Cách chạy (từ thư mục gốc dự án):
+    python benchmarks/solver_parity.py
+    python benchmarks/solver_parity.py --rows 20000 --seed 7
+
+Mã thoát 1 nếu có hệ cho kết quả khác nhau (in ra vài ví dụ).
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Sequence
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.workload_generator import DEFAULT_SEED, random_coefficient  # noqa: E402
+
+REALISTIC_VALUES = ["1/3", "\\sqrt{2}", "sqrt(3)", "\\frac{1}{7}", "-\\frac{2}{3}", "100000", "-100000",
+                    "1.0000000001", "0.1", "0", "1", "-1", "2", "0.5"]
+TINY_VALUES = ["1e-9", "-1e-9", "1e-11", "-1e-11", "3e-10", "0", "1", "2"]
+
+
+def _mixed(rng: random.Random) -> str:
+    return random_coefficient(rng)
+
+
+def _realistic(rng: random.Random) -> str:
+    return rng.choice(REALISTIC_VALUES)
+
+
+def _tiny(rng: random.Random) -> str:
+    return rng.choice(TINY_VALUES)
+
+
+KINDS: Dict[str, Callable[[random.Random], str]] = {
+    'mixed': _mixed,
+    'realistic': _realistic,
+    'tiny': _tiny,
+}
+
+
+def generate_rows(kind: str, so_an: int, rows: int, rng: random.Random) -> List[List[str]]:
+    """Danh sách hệ số (so_an * (so_an + 1) chuỗi mỗi hệ)"""
+    result = []
+    for _ in range(rows):
+        if kind == 'singular':
+            # Phương trình cuối gần bằng một phương trình khác nhân hệ số
+            equations = [[repr(rng.uniform(-10, 10)) for _ in range(so_an + 1)] for _ in range(so_an - 1)]
+            source = rng.choice(equations)
+            scale = rng.choice([1.0, 2.0, -3.0, 1.0 + 10 ** rng.uniform(-12, -3)])
+            last = [repr(float(value) * scale) for value in source[:so_an]]
+            last.append(rng.choice([source[so_an], repr(rng.uniform(-10, 10))]))
+            equations.append(last)
+            result.append([value for equation in equations for value in equation])
+        else:
+            generate = KINDS[kind]
+            result.append([generate(rng) for _ in range(so_an * (so_an + 1))])
+    return result
+
+
+def check(rows: int, seed: int, so_an_list: Sequence[int], examples: int = 3) -> Dict[str, Dict]:
+    from views.equation.equation_solver_service import EquationSolverService
+
+    solver = EquationSolverService()
+    report = {}
+    for so_an in so_an_list:
+        for kind in list(KINDS) + ['singular']:
+            rng = random.Random(f"{seed}:{kind}:{so_an}")
+            data = generate_rows(kind, so_an, rows, rng)
+            started = time.perf_counter()
+            batch = solver.solve_equation_systems(data, so_an)
+            batch_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            single = [solver.solve_equation_system(row, so_an) for row in data]
+            single_seconds = time.perf_counter() - started
+            mismatches = [(row, a, b) for row, a, b in zip(data, batch, single) if a != b]
+            report[f"{kind}_{so_an}"] = {
+                'rows': rows,
+                'mismatches': len(mismatches),
+                'batch_seconds': round(batch_seconds, 3),
+                'single_seconds': round(single_seconds, 3),
+                'examples': [{'he_so': row, 'batch': a, 'single': b} for row, a, b in mismatches[:examples]],
+            }
+    return report
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="So sánh batch solver với giải từng hệ")
+    parser.add_argument("--rows", type=int, default=6000, help="Số hệ mỗi trường hợp")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed sinh dữ liệu")
+    parser.add_argument("--so-an", default="2,3,4", help="Số ẩn, phân tách bằng dấu phẩy")
+    args = parser.parse_args(argv)
+
+    os.chdir(PROJECT_ROOT)
+    report = check(args.rows, args.seed, [int(text) for text in args.so_an.split(",")])
+    failed = False
+    for case, info in report.items():
+        status = "OK" if not info['mismatches'] else "KHÁC"
+        failed = failed or bool(info['mismatches'])
+        print(f"[{status}] {case}: {info['mismatches']}/{info['rows']} khác, "
+              f"batch {info['batch_seconds']}s, từng hệ {info['single_seconds']}s")
+        for example in info['examples']:
+            print("    " + json.dumps(example, ensure_ascii=False))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Đo thời gian khởi động bằng `python -X importtime` và so với ngân sách.
+
+Mỗi module đích (main_view và các view của từng chế độ) được import trong một
+process Python mới, lặp lại nhiều lần và lấy lần nhanh nhất. Kết quả gồm tổng
+thời gian import, thời gian chạy cả process (cold start), các module chậm nhất
+và các thư viện nặng (pandas, openpyxl, numpy, sympy, psutil) lỡ bị nạp sẵn.
+
+Cách chạy (từ thư mục gốc dự án):
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --repeat 5 --output startup.json
+
+Mã thoát 1 nếu vượt ngân sách hoặc có thư viện nặng bị import khi khởi động.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Phân tích output của -X importtime.
+
+    Dòng có dạng: 'import time:  self [us] | cumulative | tên module', tên module
+    thụt lề theo độ sâu import lồng nhau.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # Dòng tiêu đề
+        # Cột tên bắt đầu bằng một dấu cách, mỗi mức lồng thêm hai dấu cách
+        name = parts[2].rstrip()
+        entries.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_us': int(parts[0]),
+            'cumulative_us': int(parts[1])
+        })
+    return entries
+
+
+def measure_target(target: str, python: str = sys.executable) -> Dict[str, Any]:
+    """Import module đích trong process mới, trả về thời gian import và danh sách module"""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {target}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    wall_seconds = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise Exception(f"Không import được {target}: {completed.stderr.strip().splitlines()[-1:]}")
+
+    entries = parse_importtime(completed.stderr)
+    top_level = [entry for entry in entries if entry['depth'] == 0]
+    return {
+        'wall_seconds': wall_seconds,
+        'import_seconds': sum(entry['cumulative_us'] for entry in top_level) / 1e6,
+        'entries': entries
+    }
+
+
+def run_benchmark(budget: Dict[str, Any], repeat: int = 3, top: int = 10) -> Dict[str, Any]:
+    """Đo tất cả module đích trong file ngân sách"""
+    forbidden = set(budget.get('forbidden_modules', []))
+    cold_start_budget = budget.get('cold_start_budget_seconds')
+    report = {'python': sys.version.split()[0], 'repeat': repeat, 'targets': {}, 'passed': True}
+
+    for target, target_budget in budget['targets'].items():
+        try:
+            runs = [measure_target(target) for _ in range(max(1, repeat))]
+        except Exception as e:
+            report['targets'][target] = {'passed': False, 'failures': [str(e)]}
+            report['passed'] = False
+            continue
+        best = min(runs, key=lambda run: run['import_seconds'])
+        modules = {entry['module'] for entry in best['entries']}
+        heavy = sorted(modules & forbidden)
+        slowest = sorted(best['entries'], key=lambda entry: entry['self_us'], reverse=True)[:top]
+
+        import_seconds = best['import_seconds']
+        wall_seconds = min(run['wall_seconds'] for run in runs)
+        failures = []
+        if import_seconds > target_budget['budget_seconds']:
+            failures.append(f"import {import_seconds:.3f}s > ngân sách {target_budget['budget_seconds']:.3f}s")
+        if cold_start_budget is not None and wall_seconds > cold_start_budget:
+            failures.append(f"cold start {wall_seconds:.3f}s > ngân sách {cold_start_budget:.3f}s")
+        if heavy:
+            failures.append(f"thư viện nặng bị import khi khởi động: {', '.join(heavy)}")
+
+        report['targets'][target] = {
+            'import_seconds': round(import_seconds, 4),
+            'wall_seconds': round(wall_seconds, 4),
+            'budget_seconds': target_budget['budget_seconds'],
+            'module_count': len(modules),
+            'heavy_modules': heavy,
+            'slowest_modules': [
+                {'module': entry['module'], 'self_ms': entry['self_us'] / 1000,
+                 'cumulative_ms': entry['cumulative_us'] / 1000}
+                for entry in slowest
+            ],
+            'passed': not failures,
+            'failures': failures
+        }
+        report['passed'] = report['passed'] and not failures
+
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Kiểm tra thời gian khởi động so với ngân sách")
+    parser.add_argument("--budget", default=DEFAULT_BUDGET_FILE, help="File JSON ngân sách")
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần đo mỗi module (lấy lần nhanh nhất)")
+    parser.add_argument("--top", type=int, default=10, help="Số module chậm nhất được liệt kê")
+    parser.add_argument("--output", help="Ghi báo cáo JSON ra file thay vì stdout")
+    args = parser.parse_args(argv)
+
+    with open(args.budget, 'r', encoding='utf-8') as f:
+        budget = json.load(f)
+
+    report = run_benchmark(budget, args.repeat, args.top)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    for target, result in report['targets'].items():
+        status = "OK" if result['passed'] else "FAIL"
+        if 'import_seconds' in result:
+            print(f"[{status}] {target}: import {result['import_seconds']:.3f}s, "
+                  f"cold start {result['wall_seconds']:.3f}s", file=sys.stderr)
+        else:
+            print(f"[{status}] {target}", file=sys.stderr)
+        for failure in result['failures']:
+            print(f"    - {failure}", file=sys.stderr)
+
+    return 0 if report['passed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
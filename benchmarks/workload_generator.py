@@ -0,0 +1,234 @@
+"""
+Sinh file Excel tổng hợp cho benchmark của cả ba chế độ.
+
+Hệ số được trộn giống dữ liệu thật: số nguyên, số thập phân, \\frac{p}{q},
+\\sqrt{n} và hàm lượng giác. Dữ liệu sinh theo seed cố định nên hai lần chạy
+(hai commit khác nhau) đo trên cùng một workload.
+
+    geometry     một sheet chứa cột của mọi đối tượng nhóm A và nhóm B trong
+                 excel_mapping.json, dùng chung cho mọi tổ hợp đối tượng/phép toán
+    equation_N   hệ N phương trình N ẩn (N = 2, 3, 4), cột 'Phương trình i'
+    polynomial   phương trình bậc 2, 3, 4 trộn lẫn (cột 'Bậc', a..e)
+
+Cách chạy (từ thư mục gốc dự án):
+    python benchmarks/workload_generator.py --rows 1k,100k
+    python benchmarks/workload_generator.py --kinds equation_3 --rows 1M --output-dir /tmp/workloads
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WORKLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workloads")
+EXCEL_MAPPING_FILE = os.path.join(PROJECT_ROOT, "config", "excel_mapping.json")
+
+DEFAULT_SEED = 20250120
+KINDS = ["geometry", "equation_2", "equation_3", "equation_4", "polynomial"]
+
+# Tỉ lệ các dạng hệ số
+COEFFICIENT_WEIGHTS = {
+    'integer': 0.40,
+    'decimal': 0.25,
+    'fraction': 0.15,
+    'sqrt': 0.10,
+    'trig': 0.10,
+}
+
+
+# ========== HỆ SỐ NGẪU NHIÊN ==========
+def _integer(rng: random.Random) -> str:
+    return str(rng.randint(-50, 50))
+
+
+def _decimal(rng: random.Random) -> str:
+    return f"{rng.uniform(-100, 100):.{rng.randint(1, 3)}f}"
+
+
+def _fraction(rng: random.Random) -> str:
+    sign = "-" if rng.random() < 0.3 else ""
+    return f"{sign}\\frac{{{rng.randint(1, 20)}}}{{{rng.randint(2, 20)}}}"
+
+
+def _sqrt(rng: random.Random) -> str:
+    sign = "-" if rng.random() < 0.3 else ""
+    factor = f"{rng.randint(2, 9)}*" if rng.random() < 0.3 else ""
+    return f"{sign}{factor}\\sqrt{{{rng.choice([2, 3, 5, 6, 7, 10, 11])}}}"
+
+
+def _trig(rng: random.Random) -> str:
+    function = rng.choice(["\\sin", "\\cos", "\\tan"])
+    argument = rng.choice(["pi/6", "pi/4", "pi/3", "\\frac{1}{2}", "0.5", "1"])
+    return f"{function}({argument})"
+
+
+_GENERATORS: Dict[str, Callable[[random.Random], str]] = {
+    'integer': _integer,
+    'decimal': _decimal,
+    'fraction': _fraction,
+    'sqrt': _sqrt,
+    'trig': _trig,
+}
+
+
+def random_coefficient(rng: random.Random, nonzero: bool = False) -> str:
+    """Một hệ số ngẫu nhiên theo COEFFICIENT_WEIGHTS (nonzero: không trả về '0')"""
+    kind = rng.choices(list(COEFFICIENT_WEIGHTS), weights=list(COEFFICIENT_WEIGHTS.values()))[0]
+    value = _GENERATORS[kind](rng)
+    if nonzero and value in ("0", "-0"):
+        return str(rng.randint(1, 50))
+    return value
+
+
+def _tuple(rng: random.Random, count: int, nonzero: bool = False) -> str:
+    return ",".join(random_coefficient(rng, nonzero) for _ in range(count))
+
+
+def _radius(rng: random.Random) -> str:
+    """Bán kính dương"""
+    return rng.choice([str(rng.randint(1, 20)), f"{rng.uniform(0.5, 20):.2f}",
+                       f"\\sqrt{{{rng.randint(2, 30)}}}", f"\\frac{{{rng.randint(1, 20)}}}{{{rng.randint(2, 9)}}}"])
+
+
+# ========== DỮ LIỆU THEO ĐỐI TƯỢNG ==========
+# Giá trị theo khóa cột trong excel_mapping.json (point_input, line_A1, plane_a...)
+_SHAPE_VALUES: Dict[str, Callable[[random.Random], str]] = {
+    'point_input': lambda rng: _tuple(rng, 3),
+    'line_A1': lambda rng: _tuple(rng, 3),
+    'line_A2': lambda rng: _tuple(rng, 3),
+    'line_X1': lambda rng: _tuple(rng, 3, nonzero=True),
+    'line_X2': lambda rng: _tuple(rng, 3, nonzero=True),
+    'plane_a': lambda rng: random_coefficient(rng, nonzero=True),
+    'plane_b': random_coefficient,
+    'plane_c': random_coefficient,
+    'plane_d': random_coefficient,
+    'circle_center': lambda rng: _tuple(rng, 2),
+    'circle_radius': _radius,
+    'sphere_center': lambda rng: _tuple(rng, 3),
+    'sphere_radius': _radius,
+}
+
+
+def _load_excel_mapping(path: str = EXCEL_MAPPING_FILE) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def geometry_columns(mapping: Dict) -> List[tuple]:
+    """[(tên cột Excel, khóa dữ liệu)] của mọi đối tượng nhóm A rồi nhóm B"""
+    columns = []
+    for group in ("group_a_mapping", "group_b_mapping"):
+        for shape_config in mapping[group].values():
+            for key, column in shape_config['columns'].items():
+                columns.append((column['excel_column'], key))
+    return columns
+
+
+def geometry_rows(rng: random.Random, rows: int, mapping: Dict):
+    columns = geometry_columns(mapping)
+    yield [name for name, _ in columns]
+    generators = [_SHAPE_VALUES[key] for _, key in columns]
+    for _ in range(rows):
+        yield [generate(rng) for generate in generators]
+
+
+def equation_rows(rng: random.Random, rows: int, mapping: Dict, so_an: int):
+    config = mapping['equation_mapping_by_phuong_trinh'][f"{so_an}_an"]
+    yield list(config['required_columns'])
+    for _ in range(rows):
+        yield [_tuple(rng, so_an + 1) for _ in range(so_an)]
+
+
+def polynomial_rows(rng: random.Random, rows: int, mapping: Dict):
+    config = mapping['polynomial_mapping']
+    degree_column = config['degree_column']['excel_column']
+    coefficient_columns = [column['excel_column'] for column in config['columns'].values()]
+    yield [degree_column] + coefficient_columns
+    for _ in range(rows):
+        degree = rng.choice([2, 3, 4])
+        coefficients = [random_coefficient(rng, nonzero=True)]
+        coefficients += [random_coefficient(rng) for _ in range(degree)]
+        coefficients += [None] * (len(coefficient_columns) - len(coefficients))
+        yield [degree] + coefficients
+
+
+# ========== GHI FILE ==========
+def parse_rows(text: str) -> int:
+    """'1000', '1k', '100k', '1M' → số dòng"""
+    text = text.strip().lower()
+    multiplier = 1
+    if text.endswith("k"):
+        multiplier, text = 1000, text[:-1]
+    elif text.endswith("m"):
+        multiplier, text = 1000000, text[:-1]
+    return int(float(text) * multiplier)
+
+
+def workload_path(kind: str, rows: int, seed: int = DEFAULT_SEED,
+                  output_dir: str = DEFAULT_WORKLOAD_DIR) -> str:
+    return os.path.join(output_dir, f"{kind}_{rows}_s{seed}.xlsx")
+
+
+def generate_workload(kind: str, rows: int, seed: int = DEFAULT_SEED,
+                      output_dir: str = DEFAULT_WORKLOAD_DIR, force: bool = False,
+                      mapping: Optional[Dict] = None) -> str:
+    """
+    Sinh (hoặc dùng lại nếu đã có) file workload; trả về đường dẫn.
+
+    Args:
+        kind: một trong KINDS
+        force: sinh lại kể cả khi file đã tồn tại
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Loại workload không hợp lệ: {kind} (có: {', '.join(KINDS)})")
+    path = workload_path(kind, rows, seed, output_dir)
+    if os.path.exists(path) and not force:
+        return path
+
+    from openpyxl import Workbook
+
+    mapping = mapping or _load_excel_mapping()
+    # Seed riêng cho từng loại để thêm loại mới không làm đổi dữ liệu loại cũ
+    rng = random.Random(f"{seed}:{kind}")
+    if kind == "geometry":
+        row_iter = geometry_rows(rng, rows, mapping)
+    elif kind == "polynomial":
+        row_iter = polynomial_rows(rng, rows, mapping)
+    else:
+        row_iter = equation_rows(rng, rows, mapping, int(kind.split("_")[1]))
+
+    os.makedirs(output_dir, exist_ok=True)
+    temp_path = path + ".tmp"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Data")
+    for row in row_iter:
+        ws.append(row)
+    wb.save(temp_path)
+    os.replace(temp_path, path)
+    return path
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sinh file Excel tổng hợp cho benchmark")
+    parser.add_argument("--kinds", default=",".join(KINDS), help=f"Các loại workload ({', '.join(KINDS)})")
+    parser.add_argument("--rows", default="1k", help="Số dòng, phân tách bằng dấu phẩy (vd. 1k,100k,1M)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed sinh dữ liệu")
+    parser.add_argument("--output-dir", default=DEFAULT_WORKLOAD_DIR, help="Thư mục chứa workload")
+    parser.add_argument("--force", action="store_true", help="Sinh lại kể cả khi file đã có")
+    args = parser.parse_args(argv)
+
+    mapping = _load_excel_mapping()
+    for rows in (parse_rows(text) for text in args.rows.split(",")):
+        for kind in args.kinds.split(","):
+            started = time.perf_counter()
+            path = generate_workload(kind.strip(), rows, args.seed, args.output_dir, args.force, mapping)
+            print(f"{path} ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+"""
+Chạy batch Excel không cần giao diện (dùng trên server, cron job).
+
+Ví dụ:
+    python cli.py geometry -i input.xlsx -o output.xlsx --shape-a "Điểm" --shape-b "Điểm" \\
+        --operation "Khoảng cách" --version fx799 --workers 4 --chunk-size 2000
+    python cli.py equation -i he_pt.xlsx -o ket_qua.xlsx --so-an 3 --version fx799,fx880
+    python cli.py polynomial -i da_thuc.xlsx -o nghiem.xlsx --degree 3 --json-progress
+    python cli.py cache inspect
+    python cli.py cache purge --mode geometry --older-than 30
+
+stdout chỉ chứa một dòng JSON tóm tắt kết quả; log và tiến độ (--json-progress:
+mỗi sự kiện là một dòng JSON) được ghi ra stderr. Báo cáo thời gian theo giai
+đoạn được ghi cạnh file kết quả (<tên file kết quả>.run.json).
+
+Kết quả từng dòng được lưu vào cache trên đĩa (utils.result_cache; --cache-file,
+mặc định ~/.tl_cache/results.sqlite3): chạy lại file đã sửa một phần chỉ tính lại
+các dòng thay đổi. Tắt bằng --no-cache.
+
+Kết quả được ghi dần vào file checkpoint (utils.checkpoint) cạnh file kết quả
+(<tên file kết quả>.checkpoint.jsonl) hoặc, khi không có -o, cạnh file đầu vào
+(<tên file đầu vào>.<chế độ>.checkpoint.jsonl): nếu lần chạy bị ngắt, chạy lại
+đúng lệnh cũ (cùng -i, -o nếu có và tham số) sẽ tiếp tục từ đoạn đã lưu cuối
+cùng. File checkpoint bị xóa khi file kết quả đã ghi xong. Tắt bằng
+--no-checkpoint; --checkpoint-every đặt số dòng mỗi đoạn (hệ phương trình, đa
+thức - hình học ghi mỗi chunk một đoạn).
+
+--version nhận nhiều phiên bản phân tách bằng dấu phẩy (geometry, equation): dữ
+liệu chỉ mã hóa một lần, file kết quả có một cột keylog/Ket_Qua_Tong cho mỗi phiên bản.
+
+Mã thoát: 0 thành công, 1 lỗi khi chạy, 2 sai tham số,
+3 có dòng lỗi khi dùng --fail-on-row-errors.
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+GEOMETRY_SHAPES = ["Điểm", "Đường thẳng", "Mặt phẳng", "Đường tròn", "Mặt cầu"]
+GEOMETRY_OPERATIONS = ["Tương giao", "Khoảng cách", "Diện tích", "Thể tích", "PT đường thẳng"]
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ROW_ERRORS = 3
+
+
+class ProgressReporter:
+    """Ghi sự kiện tiến độ ra stderr (JSON mỗi dòng nếu bật --json-progress)"""
+
+    def __init__(self, mode: str, enabled: bool, stream=None):
+        self.mode = mode
+        self.enabled = enabled
+        self.stream = stream or sys.stderr
+        self.started = time.perf_counter()
+
+    def emit(self, event: str, **fields: Any):
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter() - self.started
+        record = {'event': event, 'mode': self.mode, 'elapsed_seconds': round(elapsed, 3)}
+        record.update(fields)
+        done = fields.get('done')
+        if done and elapsed > 0:
+            record['rows_per_second'] = round(done / elapsed, 1)
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def geometry_callback(self) -> Callable[[float, int, int, int, int], None]:
+        """progress_callback cho GeometryController.process_excel_batch_chunked"""
+        def callback(progress, done, total, processed, errors):
+            self.emit('progress', percent=round(progress, 2), done=done, total=total,
+                      processed=processed, errors=errors)
+        return callback
+
+
+@contextlib.contextmanager
+def _stdout_to_stderr():
+    """
+    Chuyển stdout (mức file descriptor, gồm cả process worker) sang stderr trong lúc chạy,
+    để stdout chỉ còn dòng JSON tóm tắt.
+    """
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved_fd, 1)
+        os.close(saved_fd)
+
+
+def _parse_versions(text: str) -> List[str]:
+    """'fx799,fx880' → ['fx799', 'fx880'] (bỏ trùng, giữ thứ tự)"""
+    versions = []
+    for version in text.split(","):
+        version = version.strip()
+        if version and version not in versions:
+            versions.append(version)
+    if not versions:
+        raise ValueError("Chưa chỉ định phiên bản (--version)")
+    return versions
+
+
+def _open_cache(args: argparse.Namespace):
+    """Cache kết quả của lần chạy (None nếu --no-cache)"""
+    if args.no_cache:
+        return None
+    from utils.result_cache import ResultCache
+    return ResultCache(args.cache_file)
+
+
+def _cache_summary(cache) -> Optional[Dict[str, Any]]:
+    if cache is None:
+        return None
+    cache.close()
+    return {'hits': cache.hits, 'misses': cache.misses, 'evictions': cache.evictions}
+
+
+def _open_checkpoint(args: argparse.Namespace, output_path: str):
+    """
+    Checkpoint của lần chạy (None nếu --no-checkpoint): cạnh file kết quả nếu có -o, nếu không
+    thì cạnh file đầu vào (tên file kết quả mặc định có thời gian, chạy lại sẽ không tìm thấy)
+    """
+    if args.no_checkpoint:
+        return None
+    from utils.checkpoint import BatchCheckpoint
+    if args.output:
+        path = BatchCheckpoint.checkpoint_path(output_path)
+    else:
+        path = BatchCheckpoint.checkpoint_path(args.input, args.mode)
+    return BatchCheckpoint(path, args.checkpoint_every)
+
+
+def _default_output_path(input_path: str, suffix: str) -> str:
+    """<thư mục input>/<tên input>_<suffix>_<thời gian>.xlsx"""
+    base = os.path.splitext(input_path)[0]
+    return f"{base}_{suffix}_{time.strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+
+# ========== CÁC CHẾ ĐỘ ==========
+def run_geometry(args: argparse.Namespace, reporter: ProgressReporter) -> Dict[str, Any]:
+    from controllers.geometry_controller import GeometryController
+    from models.geometry_encoder import SINGLE_GROUP_OPERATIONS
+    from utils.stage_timer import StageTimer
+
+    controller = GeometryController()
+    available = controller.get_available_versions()
+    versions = _parse_versions(args.version)
+    for version in versions:
+        if version not in available:
+            raise ValueError(f"Phiên bản không hợp lệ: {version} (có: {', '.join(available)})")
+    controller.set_current_version(versions[0])
+
+    shape_b = None if args.operation in SINGLE_GROUP_OPERATIONS else args.shape_b
+    if args.operation not in SINGLE_GROUP_OPERATIONS and not shape_b:
+        raise ValueError(f"Phép toán '{args.operation}' cần --shape-b")
+
+    output_path = args.output or _default_output_path(args.input, "encoded")
+    timer = StageTimer('geometry')
+    cache = _open_cache(args)
+    checkpoint = _open_checkpoint(args, output_path)
+    reporter.emit('start', input=args.input, output=output_path, workers=args.workers, chunk_size=args.chunk_size)
+    results, output_file, processed, errors = controller.process_excel_batch_chunked(
+        args.input, args.shape_a, shape_b, args.operation, args.dim_a, args.dim_b,
+        chunksize=args.chunk_size, progress_callback=reporter.geometry_callback(),
+        output_path=output_path, workers=args.workers, timer=timer,
+        versions=versions if len(versions) > 1 else None, cache=cache, checkpoint=checkpoint
+    )
+    return {'output': output_file, 'rows': len(results), 'processed': processed, 'errors': errors,
+            'report': timer.report_file, 'cache': _cache_summary(cache),
+            'resumed_rows': timer.context.get('resumed_rows', 0)}
+
+
+def run_equation(args: argparse.Namespace, reporter: ProgressReporter) -> Dict[str, Any]:
+    from controllers.equation_controller import EquationController
+    from processors.excel_processor import ExcelProcessor
+    from views.equation.batch_processing_service import BatchProcessingService
+    from views.equation.file_import_export_service import FileImportExportService
+    from utils.stage_timer import StageTimer
+
+    controller = EquationController()
+    available = controller.get_all_supported_versions()
+    versions = _parse_versions(args.version)
+    for version in versions:
+        if version not in available:
+            raise ValueError(f"Phiên bản không hợp lệ: {version} (có: {', '.join(available)})")
+
+    excel_processor = ExcelProcessor()
+    batch_service = BatchProcessingService(controller, excel_processor)
+    file_service = FileImportExportService(excel_processor)
+
+    # Cấu trúc file được kiểm tra ngay trên DataFrame mà process_batch_file đọc (không đọc file trước)
+    output_path = args.output or os.path.join(os.path.dirname(args.input),
+                                              file_service.default_output_filename(args.so_an))
+    reporter.emit('start', input=args.input, output=output_path, so_an=args.so_an)
+
+    multi_versions = versions if len(versions) > 1 else None
+    timer = StageTimer('equation')
+    cache = _open_cache(args)
+    checkpoint = _open_checkpoint(args, output_path)
+    results = batch_service.process_batch_file(args.input, args.so_an, versions[0], timer=timer,
+                                               versions=multi_versions, cache=cache, checkpoint=checkpoint)
+    errors = sum(1 for result in results if result.get('trang_thai') == 'Lỗi')
+    reporter.emit('progress', percent=100.0, done=len(results), total=len(results),
+                  processed=len(results) - errors, errors=errors)
+
+    output_file = file_service.export_batch_results(args.input, results, args.so_an, output_path, timer,
+                                                    multi_versions)
+    if checkpoint is not None:
+        checkpoint.complete()
+    return {'output': output_file, 'rows': len(results), 'processed': len(results) - errors, 'errors': errors,
+            'report': timer.report_file, 'cache': _cache_summary(cache),
+            'resumed_rows': timer.context.get('resumed_rows', 0)}
+
+
+def run_polynomial(args: argparse.Namespace, reporter: ProgressReporter) -> Dict[str, Any]:
+    from processors.excel_processor import ExcelProcessor
+    from views.polynomial.polynomial_batch_service import PolynomialBatchService
+    from utils.stage_timer import StageTimer
+
+    batch_service = PolynomialBatchService(ExcelProcessor())
+    # Cấu trúc file được kiểm tra ngay trên DataFrame mà process_batch_file đọc (không đọc file trước)
+    output_path = args.output or _default_output_path(args.input, f"bac{args.degree}_nghiem")
+    reporter.emit('start', input=args.input, output=output_path, degree=args.degree)
+
+    timer = StageTimer('polynomial')
+    cache = _open_cache(args)
+    checkpoint = _open_checkpoint(args, output_path)
+    results = batch_service.process_batch_file(args.input, args.degree, timer, cache, checkpoint)
+    errors = sum(1 for result in results if result.get('trang_thai') == 'Lỗi')
+    reporter.emit('progress', percent=100.0, done=len(results), total=len(results),
+                  processed=len(results) - errors, errors=errors)
+
+    output_file = batch_service.export_batch_results(args.input, results, output_path, timer)
+    if checkpoint is not None:
+        checkpoint.complete()
+    return {'output': output_file, 'rows': len(results), 'processed': len(results) - errors, 'errors': errors,
+            'report': timer.report_file, 'cache': _cache_summary(cache),
+            'resumed_rows': timer.context.get('resumed_rows', 0)}
+
+
+def run_cache(args: argparse.Namespace) -> int:
+    """Xem hoặc xóa cache kết quả; in một dòng JSON ra stdout"""
+    from utils.result_cache import ResultCache
+
+    with ResultCache(args.cache_file) as cache:
+        if args.action == 'purge':
+            removed = cache.purge(args.purge_mode, args.older_than)
+            summary = {'removed': removed, **cache.stats()}
+        else:
+            summary = cache.stats()
+    for key in ('hits', 'misses', 'evictions', 'hit_rate'):
+        summary.pop(key, None)
+    print(json.dumps(dict(mode='cache', action=args.action, success=True, **summary), ensure_ascii=False))
+    return EXIT_OK
+
+
+RUNNERS = {
+    'geometry': run_geometry,
+    'equation': run_equation,
+    'polynomial': run_polynomial,
+}
+
+
+# ========== THAM SỐ DÒNG LỆNH ==========
+def build_parser() -> argparse.ArgumentParser:
+    from utils.checkpoint import DEFAULT_INTERVAL
+
+    parser = argparse.ArgumentParser(prog="cli.py", description="Chạy batch Excel không cần giao diện")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-i", "--input", required=True, help="File Excel đầu vào")
+    common.add_argument("-o", "--output", help="File Excel kết quả (mặc định: cạnh file đầu vào)")
+    common.add_argument("--json-progress", action="store_true", help="Ghi tiến độ dạng JSON (mỗi dòng) ra stderr")
+    common.add_argument("--fail-on-row-errors", action="store_true", help="Trả mã thoát 3 nếu có dòng lỗi")
+    common.add_argument("--cache-file", help="File cache kết quả (mặc định: $TL_RESULT_CACHE hoặc ~/.tl_cache)")
+    common.add_argument("--no-cache", action="store_true", help="Không dùng cache kết quả, tính lại mọi dòng")
+    common.add_argument("--no-checkpoint", action="store_true",
+                        help="Không ghi checkpoint (không chạy tiếp được khi bị ngắt)")
+    common.add_argument("--checkpoint-every", type=int, default=DEFAULT_INTERVAL, metavar="N",
+                        help=f"Số dòng mỗi đoạn checkpoint (mặc định {DEFAULT_INTERVAL}); với equation / polynomial "
+                             "đây cũng là số dòng mỗi khối giải (trừ khi --no-checkpoint)")
+
+    geometry = subparsers.add_parser("geometry", parents=[common], help="Mã hóa hình học")
+    geometry.add_argument("--shape-a", required=True, choices=GEOMETRY_SHAPES, help="Đối tượng nhóm A")
+    geometry.add_argument("--shape-b", choices=GEOMETRY_SHAPES, help="Đối tượng nhóm B")
+    geometry.add_argument("--operation", required=True, choices=GEOMETRY_OPERATIONS, help="Phép toán")
+    geometry.add_argument("--dim-a", default="3", choices=["2", "3"], help="Kích thước nhóm A")
+    geometry.add_argument("--dim-b", default="3", choices=["2", "3"], help="Kích thước nhóm B")
+    geometry.add_argument("--version", default="fx799",
+                          help="Phiên bản (theo version_mapping.json), nhiều phiên bản cách nhau dấu phẩy")
+    geometry.add_argument("--workers", type=int, default=1,
+                          help="Số process mã hóa (0 = số CPU); chỉ có ở geometry")
+    geometry.add_argument("--chunk-size", type=int, default=1000,
+                          help="Số dòng mỗi chunk; chỉ có ở geometry (equation / polynomial: --checkpoint-every)")
+
+    equation = subparsers.add_parser("equation", parents=[common], help="Giải và mã hóa hệ phương trình")
+    equation.add_argument("--so-an", type=int, default=2, choices=[2, 3, 4], help="Số ẩn")
+    equation.add_argument("--version", default="fx799", help="Phiên bản máy tính, nhiều phiên bản cách nhau dấu phẩy")
+
+    polynomial = subparsers.add_parser("polynomial", parents=[common], help="Giải phương trình bậc cao")
+    polynomial.add_argument("--degree", type=int, default=2, choices=[2, 3, 4],
+                            help="Bậc mặc định (dòng có cột 'Bậc' dùng giá trị của dòng)")
+
+    cache = subparsers.add_parser("cache", help="Xem / xóa cache kết quả")
+    cache.add_argument("action", choices=["inspect", "purge"], help="inspect: thống kê, purge: xóa")
+    cache.add_argument("--cache-file", help="File cache kết quả (mặc định: $TL_RESULT_CACHE hoặc ~/.tl_cache)")
+    cache.add_argument("--mode", dest="purge_mode", choices=list(RUNNERS), help="purge: chỉ xóa kết quả của chế độ này")
+    cache.add_argument("--older-than", type=float, metavar="DAYS",
+                       help="purge: chỉ xóa kết quả không được dùng trong DAYS ngày")
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.cache_file:
+        args.cache_file = os.path.abspath(args.cache_file)
+    if args.mode == 'cache':
+        os.chdir(PROJECT_ROOT)
+        if PROJECT_ROOT not in sys.path:
+            sys.path.insert(0, PROJECT_ROOT)
+        try:
+            return run_cache(args)
+        except Exception as e:
+            print(json.dumps({'mode': 'cache', 'success': False, 'error': str(e)}, ensure_ascii=False))
+            return EXIT_FAILED
+
+    # Đường dẫn người dùng tính theo thư mục hiện tại; config/ tính theo thư mục dự án
+    args.input = os.path.abspath(args.input)
+    if args.output:
+        args.output = os.path.abspath(args.output)
+    os.chdir(PROJECT_ROOT)
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+
+    reporter = ProgressReporter(args.mode, args.json_progress)
+    started = time.perf_counter()
+    try:
+        if not os.path.exists(args.input):
+            raise FileNotFoundError(f"Không tìm thấy file: {args.input}")
+        with _stdout_to_stderr():
+            summary = RUNNERS[args.mode](args, reporter)
+    except Exception as e:
+        reporter.emit('error', message=str(e))
+        print(json.dumps({'mode': args.mode, 'success': False, 'error': str(e)}, ensure_ascii=False))
+        return EXIT_FAILED
+
+    summary = dict(mode=args.mode, success=True, **summary,
+                   elapsed_seconds=round(time.perf_counter() - started, 3))
+    reporter.emit('done', **{key: summary[key] for key in ('output', 'rows', 'processed', 'errors')})
+    print(json.dumps(summary, ensure_ascii=False))
+
+    if args.fail_on_row_errors and summary['errors']:
+        return EXIT_ROW_ERRORS
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    # Cần cho ProcessPoolExecutor khi đóng gói thành file chạy (Windows)
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Registry cấu hình dùng chung cho toàn ứng dụng.
+
+Mỗi file JSON chỉ được đọc và parse một lần; mọi controller/service dùng chung
+cùng một object chỉ-đọc (FrozenDict/FrozenList). Registry ghi nhớ mtime và kích
+thước file: lần truy cập sau khi file thay đổi sẽ đọc lại file, và nếu nội dung
+thực sự khác (so sánh SHA-1) thì gọi các reload hook đã đăng ký để những cache
+đã biên dịch (encoder mapping, bộ đánh giá biểu thức, prefix...) tự làm mới.
+
+Hook nhận cấu hình mới làm tham số duy nhất. Bound method được giữ bằng weak
+reference nên đăng ký hook không giữ controller/service sống mãi.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ReloadHook = Callable[[Any], None]
+
+_READ_ONLY_MESSAGE = "Cấu hình dùng chung là chỉ-đọc, dùng thaw() để lấy bản sao có thể sửa"
+
+
+class FrozenDict(dict):
+    """dict chỉ-đọc; copy/deepcopy/pickle trả về dict thường"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+    """list chỉ-đọc; copy/deepcopy/pickle trả về list thường"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(_READ_ONLY_MESSAGE)
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def freeze(value: Any) -> Any:
+    """Chuyển dữ liệu JSON thành cấu trúc chỉ-đọc"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Bản sao có thể sửa (dict/list thường) của cấu hình chỉ-đọc"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+class _ConfigEntry:
+    __slots__ = ('data', 'signature', 'fingerprint', 'checked_at')
+
+    def __init__(self, data: Any, signature: Tuple[int, int], fingerprint: str, checked_at: float):
+        self.data = data
+        self.signature = signature
+        self.fingerprint = fingerprint
+        self.checked_at = checked_at
+
+
+class ConfigRegistry:
+    """
+    Cache các file cấu hình JSON theo đường dẫn tuyệt đối.
+
+    Args:
+        check_interval: khoảng thời gian (giây) tối thiểu giữa hai lần stat() file
+            trong load(); refresh()/reload() luôn kiểm tra ngay
+    """
+
+    def __init__(self, check_interval: float = 0.5):
+        self.check_interval = check_interval
+        self._entries: Dict[str, _ConfigEntry] = {}
+        self._hooks: Dict[str, List[Any]] = {}
+        self._lock = threading.RLock()
+        self._loads = 0
+        self._reloads = 0
+        self._hits = 0
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.abspath(path)
+
+    @staticmethod
+    def _read(key: str) -> Tuple[Any, Tuple[int, int], str]:
+        """Đọc file: (dữ liệu chỉ-đọc, (mtime_ns, size), SHA-1 nội dung)"""
+        stat = os.stat(key)
+        with open(key, 'rb') as f:
+            raw = f.read()
+        data = freeze(json.loads(raw.decode('utf-8')))
+        return data, (stat.st_mtime_ns, stat.st_size), hashlib.sha1(raw).hexdigest()
+
+    def _check(self, key: str, force: bool) -> Tuple[_ConfigEntry, bool]:
+        """
+        Trả về (entry hiện tại, nội dung có thay đổi so với lần đọc trước không).
+
+        Raises:
+            FileNotFoundError / ValueError: file chưa từng đọc được và hiện không đọc được
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and not force and now - entry.checked_at < self.check_interval:
+            self._hits += 1
+            return entry, False
+
+        try:
+            stat = os.stat(key)
+            if entry is not None and entry.signature == (stat.st_mtime_ns, stat.st_size):
+                entry.checked_at = now
+                self._hits += 1
+                return entry, False
+            data, signature, fingerprint = self._read(key)
+        except Exception as e:
+            if entry is None:
+                raise
+            # File đang được sửa dở hoặc bị xóa: giữ cấu hình cũ, thử lại ở lần sau
+            print(f"Lỗi đọc lại cấu hình {key}: {e} - tiếp tục dùng bản đã nạp")
+            entry.checked_at = now
+            return entry, False
+
+        self._loads += 1
+        changed = entry is not None and entry.fingerprint != fingerprint
+        if entry is not None and not changed:
+            # Chỉ mtime thay đổi (file được lưu lại nguyên nội dung): giữ object cũ
+            entry.signature = signature
+            entry.checked_at = now
+            return entry, False
+
+        entry = _ConfigEntry(data, signature, fingerprint, now)
+        self._entries[key] = entry
+        if changed:
+            self._reloads += 1
+        return entry, changed
+
+    def _run_hooks(self, key: str, data: Any):
+        with self._lock:
+            refs = list(self._hooks.get(key, []))
+        for ref in refs:
+            hook = ref() if isinstance(ref, weakref.WeakMethod) else ref
+            if hook is None:
+                continue
+            try:
+                hook(data)
+            except Exception as e:
+                print(f"Lỗi reload hook cho {key}: {e}")
+
+        with self._lock:
+            # Dọn các hook đã bị thu hồi
+            hooks = self._hooks.get(key)
+            if hooks:
+                hooks[:] = [ref for ref in hooks
+                            if not (isinstance(ref, weakref.WeakMethod) and ref() is None)]
+
+    def _get_entry(self, path: str, force: bool = False) -> _ConfigEntry:
+        key = self._key(path)
+        with self._lock:
+            entry, changed = self._check(key, force)
+        if changed:
+            self._run_hooks(key, entry.data)
+        return entry
+
+    def load(self, path: str) -> Any:
+        """
+        Cấu hình (chỉ-đọc) của file JSON, đọc lại nếu file đã thay đổi.
+
+        Raises:
+            FileNotFoundError: file không tồn tại
+            ValueError: file không phải JSON hợp lệ
+        """
+        return self._get_entry(path).data
+
+    def fingerprint(self, path: str) -> str:
+        """SHA-1 nội dung file cấu hình (dùng làm một phần key của cache)"""
+        return self._get_entry(path).fingerprint
+
+    def reload(self, path: str) -> bool:
+        """Kiểm tra file ngay (bỏ qua check_interval); trả về True nếu nội dung đã thay đổi"""
+        key = self._key(path)
+        with self._lock:
+            entry, changed = self._check(key, force=True)
+        if changed:
+            self._run_hooks(key, entry.data)
+        return changed
+
+    def refresh(self, path: Optional[str] = None) -> List[str]:
+        """Kiểm tra lại một file hoặc mọi file đã nạp; trả về danh sách file đã thay đổi"""
+        if path is not None:
+            return [self._key(path)] if self.reload(path) else []
+        with self._lock:
+            keys = list(self._entries)
+        return [key for key in keys if self.reload(key)]
+
+    def subscribe(self, path: str, hook: ReloadHook) -> ReloadHook:
+        """Đăng ký hook được gọi với cấu hình mới mỗi khi nội dung file thay đổi"""
+        ref = weakref.WeakMethod(hook) if hasattr(hook, '__self__') else hook
+        with self._lock:
+            self._hooks.setdefault(self._key(path), []).append(ref)
+        return hook
+
+    def unsubscribe(self, path: str, hook: ReloadHook):
+        """Hủy đăng ký hook"""
+        with self._lock:
+            hooks = self._hooks.get(self._key(path), [])
+            hooks[:] = [ref for ref in hooks
+                        if (ref() if isinstance(ref, weakref.WeakMethod) else ref) != hook]
+
+    def clear(self):
+        """Xóa toàn bộ cấu hình đã nạp (hook vẫn giữ nguyên)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Thống kê registry"""
+        with self._lock:
+            return {
+                'files': len(self._entries),
+                'loads': self._loads,
+                'reloads': self._reloads,
+                'hits': self._hits,
+                'hooks': sum(len(hooks) for hooks in self._hooks.values())
+            }
+
+
+# ========== REGISTRY DÙNG CHUNG ==========
+_registry = ConfigRegistry()
+
+
+def get_registry() -> ConfigRegistry:
+    """Registry dùng chung của process hiện tại"""
+    return _registry
+
+
+def load(path: str) -> Any:
+    """Cấu hình chỉ-đọc của file JSON (xem ConfigRegistry.load)"""
+    return _registry.load(path)
+
+
+def fingerprint(path: str) -> str:
+    """SHA-1 nội dung file cấu hình"""
+    return _registry.fingerprint(path)
+
+
+def reload(path: str) -> bool:
+    """Đọc lại một file ngay nếu đã thay đổi, gọi reload hook"""
+    return _registry.reload(path)
+
+
+def refresh(path: Optional[str] = None) -> List[str]:
+    """Kiểm tra lại các file đã nạp, gọi reload hook cho file đã thay đổi"""
+    return _registry.refresh(path)
+
+
+def subscribe(path: str, hook: ReloadHook) -> ReloadHook:
+    """Đăng ký reload hook cho một file cấu hình"""
+    return _registry.subscribe(path, hook)
+
+
+def unsubscribe(path: str, hook: ReloadHook):
+    """Hủy đăng ký reload hook"""
+    _registry.unsubscribe(path, hook)
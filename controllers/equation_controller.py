@@ -1,10 +1,9 @@
-import pandas as pd
 from datetime import datetime
+from config import registry as config_registry
 from models.mapping_manager import MappingManager
-from processors.excel_processor import ExcelProcessor
-from typing import Tuple, List, Dict, Any
+from utils.latex_parser import LatexSyntaxError
+from typing import Tuple, List, Dict, Any, Optional
 import os
-import json
 
 
 class EquationController:
@@ -18,7 +17,9 @@ class EquationController:
         self.ket_qua_ma_hoa = []
 
         # Load equation prefixes (tập trung tại equation_prefixes.json)
-        self.equation_prefixes_data = self._load_equation_prefixes()
+        self.prefixes_file = "config/equation_prefixes.json"
+        self.equation_prefixes_data = self._load_equation_prefixes(self.prefixes_file)
+        config_registry.subscribe(self.prefixes_file, self._on_equation_prefixes_changed)
 
     def _load_equation_prefixes(self, file_path: str = "config/equation_prefixes.json") -> dict:
         """Load tiền tố phương trình từ JSON với cấu trúc mới hỗ trợ nhiều phiên bản"""
@@ -26,20 +27,25 @@ class EquationController:
             if not os.path.exists(file_path):
                 return self._get_default_equation_prefixes()
 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # Validate cấu trúc file
-            if "versions" not in data or "global_defaults" not in data:
-                print(f"File {file_path} không có cấu trúc mong đợi, sử dụng mặc định")
-                return self._get_default_equation_prefixes()
-
-            return data
+            data = config_registry.load(file_path)
+            return self._validate_equation_prefixes(data, file_path)
 
         except Exception as e:
             print(f"Lỗi khi đọc file equation_prefixes.json: {e}")
             return self._get_default_equation_prefixes()
 
+    def _validate_equation_prefixes(self, data: dict, file_path: str) -> dict:
+        """Kiểm tra cấu trúc file prefix, sai cấu trúc → cấu hình mặc định"""
+        if "versions" not in data or "global_defaults" not in data:
+            print(f"File {file_path} không có cấu trúc mong đợi, sử dụng mặc định")
+            return self._get_default_equation_prefixes()
+
+        return data
+
+    def _on_equation_prefixes_changed(self, data: dict):
+        """Reload hook: dùng prefix mới khi equation_prefixes.json thay đổi"""
+        self.equation_prefixes_data = self._validate_equation_prefixes(data, self.prefixes_file)
+
     def _get_default_equation_prefixes(self) -> dict:
         """Trả về cấu hình mặc định nếu file không tồn tại hoặc lỗi"""
         return {
@@ -96,10 +102,10 @@ class EquationController:
             }
         }
 
-    def get_equation_prefix(self, so_an: int) -> str:
-        """Lấy tiền tố cho phiên bản máy và số ẩn cụ thể"""
+    def get_equation_prefix(self, so_an: int, phien_ban: Optional[str] = None) -> str:
+        """Lấy tiền tố cho phiên bản máy và số ẩn cụ thể (phien_ban None → phiên bản hiện tại)"""
         try:
-            version = self.phien_ban
+            version = phien_ban or self.phien_ban
             so_an_str = str(so_an)
 
             # Lấy cấu hình phiên bản
@@ -181,7 +187,8 @@ class EquationController:
         self.so_an = int(so_an)
 
     def set_phien_ban(self, phien_ban):
-        """Thiết lập phiên bản máy tính"""
+        """Thiết lập phiên bản máy tính (kiểm tra lại các file cấu hình đã sửa trước khi mã hóa)"""
+        config_registry.refresh()
         self.phien_ban = phien_ban
 
     def set_he_so(self, danh_sach_he_so):
@@ -202,6 +209,10 @@ class EquationController:
 
             return self.ket_qua_ma_hoa
 
+        except LatexSyntaxError:
+            # Hệ số viết sai LaTeX: báo lỗi cho người gọi thay vì trả về kết quả rỗng
+            self.ket_qua_ma_hoa = []
+            raise
         except Exception as e:
             print(f"Lỗi khi mã hóa: {e}")
             return []
@@ -259,7 +270,8 @@ class EquationController:
     def reload_equation_prefixes(self):
         """Reload lại cấu hình prefix (hữu ích khi cập nhật file config)"""
         try:
-            self.equation_prefixes_data = self._load_equation_prefixes()
+            config_registry.reload(self.prefixes_file)
+            self.equation_prefixes_data = self._load_equation_prefixes(self.prefixes_file)
             return True
         except Exception as e:
             print(f"Lỗi khi reload equation prefixes: {e}")
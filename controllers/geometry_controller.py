@@ -1,12 +1,16 @@
-import pandas as pd
 from datetime import datetime
+from config import registry as config_registry
 from models.geometry_models import GeometryData
+from models.geometry_encoder import (GeometryEncoder, SINGLE_GROUP_OPERATIONS, load_version_config,
+                                     load_version_mapping, version_config_path)
 from models.mapping_manager import MappingManager
-from processors.excel_processor import ExcelProcessor
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional, Sequence
 import os
-import json
 from utils.file_utils import FileUtils
+from utils.checkpoint import BatchCheckpoint
+from utils.job_runner import CancellationToken
+from utils.result_cache import ResultCache, make_scope, rules_fingerprint
+from utils.stage_timer import StageTimer
 
 
 class GeometryController:
@@ -39,55 +43,47 @@ class GeometryController:
         self.kich_thuoc_A = "3"
         self.kich_thuoc_B = "3"
 
-        self.excel_processor = ExcelProcessor()
+        # Bộ xử lý Excel (kéo theo pandas/openpyxl) chỉ được tạo khi import/xuất file lần đầu
+        self._excel_processor = None
+        # Số process mã hóa batch mặc định (1 = tuần tự, None/0 = theo số CPU)
+        self.batch_workers = 1
+        # Báo cáo thời gian theo giai đoạn của lần chạy batch gần nhất (utils.stage_timer)
+        self.last_run_report = None
 
         # KHỞI TẠO VERSION MAPPING TRƯỚC
         self.version_mapping = self._load_version_mapping()
-        self.current_version_config = self._load_version_config("Phiên bản 1.0")
+        self.current_version_name = "Phiên bản 1.0"
+
+        # Lõi mã hóa không trạng thái - controller chỉ giữ trạng thái của giao diện
+        self.encoder = GeometryEncoder(self.mapping_manager, self.geometry_data, self.version_mapping)
+
+    @property
+    def excel_processor(self):
+        """OptimizedExcelProcessor, khởi tạo ở lần dùng đầu tiên"""
+        if self._excel_processor is None:
+            from processors.optimized_excel_processor import OptimizedExcelProcessor
+            self._excel_processor = OptimizedExcelProcessor()
+        return self._excel_processor
 
     def _load_version_mapping(self):
         """Load mapping phiên bản từ file JSON"""
-        try:
-            with open("config/version_configs/version_mapping.json", 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("version_file_mapping", {})
-        except Exception as e:
-            print(f"Lỗi load version mapping: {e}")
-            # Fallback mapping nếu file không tồn tại
-            return {
-                "fx799": "fx799.json",
-                "fx800": "fx800.json",
-                "fx801": "fx801.json",
-                "fx802": "fx802.json",
-                "fx803": "fx803.json"
-            }
+        return load_version_mapping()
 
     def _load_version_config(self, version_name):
         """Load cấu hình cho phiên bản được chọn"""
-        try:
-            # Đảm bảo version_mapping đã được khởi tạo
-            if not hasattr(self, 'version_mapping'):
-                self.version_mapping = self._load_version_mapping()
-
-            config_file = self.version_mapping.get(version_name, "version_1.0.json")
-            config_path = f"config/version_configs/{config_file}"
-
-            # Kiểm tra file tồn tại
-            if not os.path.exists(config_path):
-                print(f"File config không tồn tại: {config_path}")
-                return {"version": version_name, "prefix": "wj"}
-
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        if not hasattr(self, 'version_mapping'):
+            self.version_mapping = self._load_version_mapping()
+        return load_version_config(version_name, self.version_mapping)
 
-        except Exception as e:
-            print(f"Lỗi load config phiên bản {version_name}: {e}")
-            # Fallback về phiên bản 1.0 nếu có lỗi
-            return {"version": version_name, "prefix": "wj"}
+    @property
+    def current_version_config(self):
+        """Cấu hình phiên bản hiện tại (lấy từ registry, chỉ đọc lại file khi đã sửa)"""
+        return self._load_version_config(self.current_version_name)
 
     def set_current_version(self, version_name):
         """Thiết lập phiên bản hiện tại"""
-        self.current_version_config = self._load_version_config(version_name)
+        config_registry.refresh()
+        self.current_version_name = version_name
 
     def get_available_versions(self):
         """Lấy danh sách phiên bản khả dụng"""
@@ -96,59 +92,189 @@ class GeometryController:
         return list(self.version_mapping.keys())
     def process_excel_batch(self, file_path: str, shape_a: str, shape_b: str,
                             operation: str, dimension_a: str, dimension_b: str,
-                            output_path: str = None) -> Tuple[List[str], str, int, int]:
+                            output_path: str = None, workers: int = None, progress_callback=None,
+                            cancel_token: Optional[CancellationToken] = None,
+                            timer: Optional[StageTimer] = None,
+                            versions: Optional[Sequence[str]] = None,
+                            cache: Optional[ResultCache] = None,
+                            checkpoint: Optional[BatchCheckpoint] = None) -> Tuple[List[Any], str, int, int]:
         """Process entire Excel file in batch with pre-selected output path"""
         try:
-            # Read and validate Excel file
-            df = self.excel_processor.read_excel_data(file_path)
-            is_valid, missing_cols = self.excel_processor.validate_excel_structure(df, shape_a, shape_b)
-
-            if not is_valid:
-                raise Exception(f"Thiếu các cột: {', '.join(missing_cols)}")
-
-            encoded_results = []
-            processed_count = 0
-            error_count = 0
-
-            # Process each row
-            for index, row in df.iterrows():
-                try:
-                    # Set current state for this row
-                    self.set_current_shapes(shape_a, shape_b)
-                    self.set_kich_thuoc(dimension_a, dimension_b)
-                    self.current_operation = operation
-
-                    # Extract data for both groups
-                    data_a = self.excel_processor.extract_shape_data(row, shape_a, 'A')
-                    data_b = self.excel_processor.extract_shape_data(row, shape_b, 'B') if shape_b else {}
-
-                    # Process data
-                    self.thuc_thi_tat_ca(data_a, data_b)
-                    result = self.generate_final_result()
-
-                    encoded_results.append(result)
-                    processed_count += 1
+            return self._run_batch_pipeline(file_path, shape_a, shape_b, operation,
+                                            dimension_a, dimension_b, output_path,
+                                            progress_callback=progress_callback, workers=workers,
+                                            cancel_token=cancel_token, timer=timer, versions=versions,
+                                            cache=cache, checkpoint=checkpoint)
+        except Exception as e:
+            raise Exception(f"Lỗi xử lý file Excel: {str(e)}")
 
-                except Exception as e:
-                    # Log error but continue with next row
-                    encoded_results.append(f"LỖI: {str(e)}")
-                    error_count += 1
-                    print(f"Lỗi dòng {index + 1}: {str(e)}")
+    def _get_output_path(self, file_path: str) -> str:
+        """Tạo đường dẫn file kết quả mặc định trong thư mục hiện tại"""
+        original_name = os.path.splitext(os.path.basename(file_path))[0]
+        output_path = f"{original_name}_encoded_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        return os.path.join(os.getcwd(), output_path)
 
-            # Generate output path if not provided (fallback for backward compatibility)
-            if not output_path:
-                original_name = os.path.splitext(os.path.basename(file_path))[0]
-                output_path = f"{original_name}_encoded_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-                # Ensure we save in current directory if no path provided
-                output_path = os.path.join(os.getcwd(), output_path)
+    def _run_batch_pipeline(self, file_path: str, shape_a: str, shape_b: str,
+                            operation: str, dimension_a: str, dimension_b: str,
+                            output_path: str = None, chunksize: int = 1000,
+                            progress_callback=None, workers: int = None,
+                            cancel_token: Optional[CancellationToken] = None,
+                            timer: Optional[StageTimer] = None,
+                            versions: Optional[Sequence[str]] = None,
+                            cache: Optional[ResultCache] = None,
+                            checkpoint: Optional[BatchCheckpoint] = None) -> Tuple[List[Any], str, int, int]:
+        """
+        Pipeline một lượt: đọc → trích xuất → mã hóa → ghi.
+        Workbook chỉ được đọc đúng một lần, kết quả được ghi thẳng ra file output theo từng dòng.
+
+        workers > 1: các chunk được mã hóa song song trên ProcessPoolExecutor,
+        kết quả vẫn được ghi theo đúng thứ tự dòng trong file gốc.
+
+        cancel_token: được kiểm tra giữa các chunk; khi bị hủy, pipeline dừng và file output
+        chỉ chứa các dòng đã xử lý.
+
+        timer: đo thời gian từng giai đoạn (None → tạo mới); báo cáo JSON được ghi cạnh file output
+        và giữ lại ở self.last_run_report.
+
+        versions: mã hóa cho nhiều phiên bản trong một lượt (vd. ["fx799", "fx880"]). Mỗi dòng
+        chỉ mã hóa một lần, keylog được ghép với prefix của từng phiên bản và ghi vào cột
+        'keylog_<phiên bản>'; mỗi phần tử kết quả trả về là danh sách keylog theo thứ tự versions.
+        None → chỉ phiên bản hiện tại, cột 'keylog' như cũ.
+
+        cache: cache kết quả trên đĩa - chỉ các dòng chưa có trong cache (hoặc đã đổi dữ liệu,
+        đổi mapping.json / cấu hình phiên bản) mới được mã hóa lại.
+
+        checkpoint: kết quả từng chunk được ghi vào file checkpoint; nếu checkpoint đã có các
+        dòng đầu của cùng file đầu vào và cùng tham số, các dòng đó không mã hóa lại mà lấy
+        kết quả đã lưu để ghép vào file output. File checkpoint bị xóa khi output ghi xong
+        (bị hủy giữa chừng → giữ lại để chạy tiếp).
+        """
+        from processors.geometry_batch import (iter_cached_results, iter_checkpointed_results,
+                                               iter_parallel_results, resolve_worker_count)
+
+        # Áp dụng các thay đổi file cấu hình (mapping, phiên bản) trước khi chạy batch
+        config_registry.refresh()
+        if not output_path:
+            output_path = self._get_output_path(file_path)
+        workers = resolve_worker_count(self.batch_workers if workers is None else workers)
+        if timer is None:
+            timer = StageTimer('geometry')
+        if versions:
+            versions = list(versions)
+            prefixes = [self.encoder.resolve_prefix(version_name) for version_name in versions]
+            result_columns = [f"keylog_{version_name}" for version_name in versions]
+        else:
+            versions = prefixes = result_columns = None
+        timer.context.update(input=os.path.abspath(file_path), shape_a=shape_a, shape_b=shape_b,
+                             operation=operation, dimensions=[dimension_a, dimension_b],
+                             version=versions or self.current_version_name, workers=workers,
+                             chunksize=chunksize)
+
+        should_stop = cancel_token.is_cancelled if cancel_token else (lambda: False)
+        encoded_results = []
+        processed_count = 0
+        error_count = 0
 
-            # Export results to the pre-selected output path
-            output_file = self.excel_processor.export_results(df, encoded_results, output_path)
+        with timer.stage('open'):
+            stream = self.excel_processor.open_stream(file_path, chunksize)
+        with stream:
+            is_valid, missing_cols = self.excel_processor.validate_header(stream.header, shape_a, shape_b)
+            if not is_valid:
+                raise Exception(f"Thiếu các cột: {', '.join(missing_cols)}")
 
-            return encoded_results, output_file, processed_count, error_count
+            total_rows = stream.total_rows
+            header = stream.header
+            with timer.stage('open'):
+                writer = self.excel_processor.open_result_writer(output_path, header, result_columns)
+            dims = (dimension_a, dimension_b)
+            version = self.current_version_config
+            chunks = timer.iterate('read', stream)
+
+            plan = self.excel_processor.build_extraction_plan(header, shape_a, shape_b)
+
+            if workers > 1 and total_rows > chunksize:
+                def encode_chunks(source):
+                    return iter_parallel_results(
+                        source, workers, self.mapping_manager.mapping_file, self.excel_processor.mapping_file,
+                        header, shape_a, shape_b, operation, dims, version,
+                        should_stop=should_stop, prefixes=prefixes
+                    )
+            else:
+                def encode_chunks(source):
+                    return self._iter_sequential_results(source, plan, shape_a, shape_b,
+                                                         operation, dims, version, should_stop, prefixes)
+
+            version_files = [version_config_path(name, self.version_mapping)
+                             for name in (versions or [self.current_version_name])]
+            rules = rules_fingerprint(self.mapping_manager.mapping_file, *version_files)
+            batch_params = dict(shape_a=shape_a, shape_b=shape_b, operation=operation, dims=list(dims),
+                                prefixes=prefixes or [self.encoder.resolve_prefix(version)],
+                                fields=plan.field_names)
+
+            if cache is not None:
+                scope = make_scope('geometry', rules, **batch_params)
+                cache_hits, cache_misses = cache.hits, cache.misses
+                uncached_chunks = encode_chunks
+
+                def encode_chunks(source):
+                    return iter_cached_results(source, uncached_chunks, cache, scope, plan)
+
+            if checkpoint is not None:
+                with timer.stage('checkpoint'):
+                    resumed_rows = checkpoint.begin('geometry', file_path, dict(batch_params, rules=rules))
+                timer.context['resumed_rows'] = resumed_rows
+                chunk_results = iter_checkpointed_results(chunks, encode_chunks, checkpoint)
+            else:
+                chunk_results = encode_chunks(chunks)
+
+            for rows, (results, chunk_processed, chunk_errors, chunk_timings) in chunk_results:
+                for name, seconds in chunk_timings.items():
+                    timer.add(name, seconds, len(rows))
+                with timer.stage('write', len(rows)):
+                    for values, result in zip(rows, results):
+                        writer.write_row(values, result)
+                encoded_results.extend(results)
+                processed_count += chunk_processed
+                error_count += chunk_errors
+                timer.count('chunks')
+
+                if progress_callback:
+                    done = processed_count + error_count
+                    progress = (done / total_rows) * 100 if total_rows > 0 else 0
+                    progress_callback(progress, done, total_rows, processed_count, error_count)
+
+            with timer.stage('write'):
+                output_file = writer.close()
+
+        timer.count('rows_ok', processed_count)
+        timer.count('rows_error', error_count)
+        if cache is not None:
+            timer.count('cache_hits', cache.hits - cache_hits)
+            timer.count('cache_misses', cache.misses - cache_misses)
+        cancelled = should_stop()
+        if checkpoint is not None:
+            if cancelled:
+                checkpoint.close()
+            else:
+                checkpoint.complete()
+        report_file = timer.write_report(output_file, cancelled=cancelled)
+        self.last_run_report = timer.report(output=os.path.abspath(output_file), cancelled=cancelled,
+                                            report_file=report_file)
+        return encoded_results, output_file, processed_count, error_count
+
+    def _iter_sequential_results(self, stream, plan, shape_a, shape_b, operation, dims, version, should_stop,
+                                 prefixes=None):
+        """Mã hóa tuần tự từng chunk trên process hiện tại"""
+        from processors.geometry_batch import encode_rows
+
+        start_row = 0
+        for rows in stream:
+            if should_stop():
+                break
+            yield rows, encode_rows(self.encoder, plan, rows,
+                                    shape_a, shape_b, operation, dims, version, start_row, prefixes)
+            start_row += len(rows)
 
-        except Exception as e:
-            raise Exception(f"Lỗi xử lý file Excel: {str(e)}")
     def get_available_shapes(self):
         """Get list of available geometric shapes"""
         return ["Điểm", "Đường thẳng", "Mặt phẳng", "Đường tròn", "Mặt cầu"]
@@ -179,175 +305,63 @@ class GeometryController:
 
     def cap_nhat_ket_qua(self, chuoi_dau_vao, so_tham_so=3, apply_keylog=True):
         """Update results from input string - similar to original function"""
-        if not chuoi_dau_vao:
-            return ["" for _ in range(so_tham_so)]
-
-        chuoi_dau_vao = chuoi_dau_vao.replace(" ", "")
-        ds = chuoi_dau_vao.split(',')
-        while len(ds) < so_tham_so:
-            ds.append("0")
-        ds = ds[:so_tham_so]
+        return self.encoder.encode_values(chuoi_dau_vao, so_tham_so, apply_keylog)
 
-        if apply_keylog:
-            ket_qua = [self.mapping_manager.encode_string(item) for item in ds]
-        else:
-            ket_qua = ds
-
-        return ket_qua
+    def _luu_ket_qua(self, group, shape_type, values):
+        """Lưu kết quả mã hóa vào các trường hiển thị/xuất file của nhóm"""
+        if shape_type == "Điểm":
+            setattr(self, f"ket_qua_diem_{group}", values)
+        elif shape_type == "Đường thẳng":
+            suffix = "1" if group == "A" else "2"
+            setattr(self, f"ket_qua_A{suffix}", values[:3])
+            setattr(self, f"ket_qua_X{suffix}", values[3:])
+        elif shape_type == "Mặt phẳng":
+            setattr(self, "ket_qua_N1" if group == "A" else "ket_qua_N2", values)
+        elif shape_type == "Đường tròn":
+            setattr(self, f"ket_qua_duong_tron_{group}", values)
+        elif shape_type == "Mặt cầu":
+            setattr(self, f"ket_qua_mat_cau_{group}", values)
 
-    # ========== GROUP A PROCESSING ==========
-    def process_point_A(self, input_data):
-        """Process point data for group A"""
-        so_chieu = int(self.kich_thuoc_A)
-        if so_chieu == 2:
-            self.ket_qua_diem_A = self.cap_nhat_ket_qua(input_data, so_tham_so=2)
-        else:
-            self.ket_qua_diem_A = self.cap_nhat_ket_qua(input_data, so_tham_so=3)
-        return self.ket_qua_diem_A
-
-    def process_line_A(self, input_A1, input_X1):
-        """Process line data for group A"""
-        self.ket_qua_A1 = self.cap_nhat_ket_qua(input_A1)
-        self.ket_qua_X1 = self.cap_nhat_ket_qua(input_X1)
-        return self.ket_qua_A1 + self.ket_qua_X1
-
-    def process_plane_A(self, coefficients):
-        """Process plane data for group A"""
-        # coefficients should be a list of [a, b, c, d]
-        self.ket_qua_N1 = [self.mapping_manager.encode_string(coef) for coef in coefficients]
-        return self.ket_qua_N1
-
-    def process_circle_A(self, center_input, radius_input):
-        """Process circle data for group A - 2 inputs: center and radius"""
-        # Xử lý tâm (2 tham số: x,y)
-        center_result = self.cap_nhat_ket_qua(center_input, so_tham_so=2)
-        # Xử lý bán kính (1 tham số)
-        radius_result = self.cap_nhat_ket_qua(radius_input, so_tham_so=1)
-
-        # Kết hợp kết quả: [x, y, r]
-        self.ket_qua_duong_tron_A = center_result + radius_result
-        return self.ket_qua_duong_tron_A
-
-    def process_sphere_A(self, center_input, radius_input):
-        """Process sphere data for group A - 2 inputs: center and radius"""
-        # Xử lý tâm (3 tham số: x,y,z)
-        center_result = self.cap_nhat_ket_qua(center_input, so_tham_so=3)
-        # Xử lý bán kính (1 tham số)
-        radius_result = self.cap_nhat_ket_qua(radius_input, so_tham_so=1)
-
-        # Kết hợp kết quả: [x, y, z, r]
-        self.ket_qua_mat_cau_A = center_result + radius_result
-        return self.ket_qua_mat_cau_A
-
-    # ========== GROUP B PROCESSING ==========
-    def process_point_B(self, input_data):
-        """Process point data for group B"""
-        so_chieu = int(self.kich_thuoc_B)
-        if so_chieu == 2:
-            self.ket_qua_diem_B = self.cap_nhat_ket_qua(input_data, so_tham_so=2)
-        else:
-            self.ket_qua_diem_B = self.cap_nhat_ket_qua(input_data, so_tham_so=3)
-        return self.ket_qua_diem_B
-
-    def process_line_B(self, input_A2, input_X2):
-        """Process line data for group B"""
-        self.ket_qua_A2 = self.cap_nhat_ket_qua(input_A2)
-        self.ket_qua_X2 = self.cap_nhat_ket_qua(input_X2)
-        return self.ket_qua_A2 + self.ket_qua_X2
-
-    def process_plane_B(self, coefficients):
-        """Process plane data for group B"""
-        # coefficients should be a list of [a, b, c, d]
-        self.ket_qua_N2 = [self.mapping_manager.encode_string(coef) for coef in coefficients]
-        return self.ket_qua_N2
-
-    def process_circle_B(self, center_input, radius_input):
-        """Process circle data for group B - 2 inputs: center and radius"""
-        center_result = self.cap_nhat_ket_qua(center_input, so_tham_so=2)
-        radius_result = self.cap_nhat_ket_qua(radius_input, so_tham_so=1)
-        self.ket_qua_duong_tron_B = center_result + radius_result
-        return self.ket_qua_duong_tron_B
-
-    def process_sphere_B(self, center_input, radius_input):
-        """Process sphere data for group B - 2 inputs: center and radius"""
-        center_result = self.cap_nhat_ket_qua(center_input, so_tham_so=3)
-        radius_result = self.cap_nhat_ket_qua(radius_input, so_tham_so=1)
-        self.ket_qua_mat_cau_B = center_result + radius_result
-        return self.ket_qua_mat_cau_B
+    def _lay_ket_qua(self, group, shape_type):
+        """Lấy kết quả mã hóa đã lưu của nhóm"""
+        if shape_type == "Điểm":
+            return getattr(self, f"ket_qua_diem_{group}")
+        elif shape_type == "Đường thẳng":
+            suffix = "1" if group == "A" else "2"
+            diem = list(getattr(self, f"ket_qua_A{suffix}")[:3])
+            vector = list(getattr(self, f"ket_qua_X{suffix}")[:3])
+            return diem + [""] * (3 - len(diem)) + vector + [""] * (3 - len(vector))
+        elif shape_type == "Mặt phẳng":
+            return self.ket_qua_N1 if group == "A" else self.ket_qua_N2
+        elif shape_type == "Đường tròn":
+            return getattr(self, f"ket_qua_duong_tron_{group}")
+        elif shape_type == "Mặt cầu":
+            return getattr(self, f"ket_qua_mat_cau_{group}")
+        return []
 
     # ========== MAIN PROCESSING METHODS ==========
     def thuc_thi_A(self, data_dict):
         """Process group A data based on current shape"""
+        config_registry.refresh()
         shape_type = self.current_shape_A
         self.raw_data_A = data_dict.copy()
 
-        if shape_type == "Điểm":
-            input_data = data_dict.get('point_input', '')
-            return self.process_point_A(input_data)
-
-        elif shape_type == "Đường thẳng":
-            input_A1 = data_dict.get('line_A1', '')
-            input_X1 = data_dict.get('line_X1', '')
-            return self.process_line_A(input_A1, input_X1)
-
-        elif shape_type == "Mặt phẳng":
-            coefficients = [
-                data_dict.get('plane_a', ''),
-                data_dict.get('plane_b', ''),
-                data_dict.get('plane_c', ''),
-                data_dict.get('plane_d', '')
-            ]
-            return self.process_plane_A(coefficients)
-
-        elif shape_type == "Đường tròn":
-            center_input = data_dict.get('circle_center', '')
-            radius_input = data_dict.get('circle_radius', '')
-            return self.process_circle_A(center_input, radius_input)
-
-        elif shape_type == "Mặt cầu":
-            center_input = data_dict.get('sphere_center', '')
-            radius_input = data_dict.get('sphere_radius', '')
-            return self.process_sphere_A(center_input, radius_input)
-
-        return []
+        result = self.encoder.encode_group(shape_type, data_dict, self.kich_thuoc_A, "A")
+        self._luu_ket_qua("A", shape_type, result)
+        return result
 
     def thuc_thi_B(self, data_dict):
         """Process group B data based on current shape"""
-        if self.current_operation in ["Diện tích", "Thể tích"]:
+        config_registry.refresh()
+        if self.current_operation in SINGLE_GROUP_OPERATIONS:
             return []
 
         shape_type = self.current_shape_B
         self.raw_data_B = data_dict.copy()
 
-        if shape_type == "Điểm":
-            input_data = data_dict.get('point_input', '')
-            return self.process_point_B(input_data)
-
-        elif shape_type == "Đường thẳng":
-            input_A2 = data_dict.get('line_A2', '')
-            input_X2 = data_dict.get('line_X2', '')
-            return self.process_line_B(input_A2, input_X2)
-
-        elif shape_type == "Mặt phẳng":
-            coefficients = [
-                data_dict.get('plane_a', ''),
-                data_dict.get('plane_b', ''),
-                data_dict.get('plane_c', ''),
-                data_dict.get('plane_d', '')
-            ]
-            return self.process_plane_B(coefficients)
-
-        elif shape_type == "Đường tròn":
-            center_input = data_dict.get('circle_center', '')
-            radius_input = data_dict.get('circle_radius', '')
-            return self.process_circle_B(center_input, radius_input)
-
-        elif shape_type == "Mặt cầu":
-            center_input = data_dict.get('sphere_center', '')
-            radius_input = data_dict.get('sphere_radius', '')
-            return self.process_sphere_B(center_input, radius_input)
-
-        return []
+        result = self.encoder.encode_group(shape_type, data_dict, self.kich_thuoc_B, "B")
+        self._luu_ket_qua("B", shape_type, result)
+        return result
 
     def thuc_thi_tat_ca(self, data_dict_A, data_dict_B):
         """Process all groups"""
@@ -357,182 +371,14 @@ class GeometryController:
 
     def generate_final_result(self):
         """Generate the final encoded string"""
-        if not self.current_shape_A or not self.current_operation:
-            return ""
-
-        pheptoan_code = self.geometry_data.pheptoan_map.get(self.current_operation, self.current_operation)
-
-        # Get T-code mappings
-        tcodeA = self._get_tcode_mapping("A", self.current_shape_A)
-
-        # For Area and Volume, don't include group B
-        if self.current_operation in ["Diện tích", "Thể tích"]:
-            tenB_code = ""
-            gia_tri_B = ""
-            tcodeB = ""
-        else:
-            tcodeB = self._get_tcode_mapping("B", self.current_shape_B)
-            tenB_code = self._get_shape_code_B(self.current_shape_B)
-            gia_tri_B = self._get_encoded_values_B()
-
-        tenA_code = self._get_shape_code_A(self.current_shape_A)
-        gia_tri_A = self._get_encoded_values_A()
-        prefix = self.current_version_config.get("prefix", "wj")
-        # Build final result
-        if self.current_operation in ["Diện tích", "Thể tích"]:
-            ket_qua = f"{prefix}{tenA_code}{gia_tri_A}C{pheptoan_code}{tcodeA}="
-        else:
-            ket_qua = f"{prefix}{tenA_code}{gia_tri_A}C{tenB_code}{gia_tri_B}C{pheptoan_code}{tcodeA}R{tcodeB}="
-
-        return ket_qua
-
-    def _get_tcode_mapping(self, group, shape):
-        """Get T-code mapping for shape"""
-        pheptoan = self.current_operation
-
-        if pheptoan in self.geometry_data.operation_tcodes:
-            operation_map = self.geometry_data.operation_tcodes[pheptoan]
-            if group == "A" and shape in operation_map["group_a"]:
-                return operation_map["group_a"][shape]
-            elif group == "B" and shape in operation_map["group_b"]:
-                return operation_map["group_b"][shape]
-
-        # Return default mapping if no operation-specific mapping found
-        if group == "A":
-            return self.geometry_data.default_group_a_tcodes.get(shape, "T0")
-        else:
-            return self.geometry_data.default_group_b_tcodes.get(shape, "T0")
-
-    def _get_shape_code_A(self, shape):
-        """Get shape code for group A"""
-        if shape == "Điểm" and self.kich_thuoc_A == "2":
-            return "112"
-        elif shape == "Điểm" and self.kich_thuoc_A == "3":
-            return "113"
-        elif shape == "Đường thẳng":
-            return "21"
-        elif shape == "Mặt phẳng":
-            return "31"
-        elif shape == "Đường tròn":
-            return "41"
-        elif shape == "Mặt cầu":
-            return "51"
-        else:
-            return "00"
-
-    def _get_shape_code_B(self, shape):
-        """Get shape code for group B"""
-        if shape == "Điểm" and self.kich_thuoc_B == "2":
-            return "qT11T122"
-        elif shape == "Điểm" and self.kich_thuoc_B == "3":
-            return "qT11T123"
-        elif shape == "Đường thẳng":
-            return "qT12T12"
-        elif shape == "Mặt phẳng":
-            return "qT13T12"
-        elif shape == "Đường tròn":
-            return "qT14T12"
-        elif shape == "Mặt cầu":
-            return "qT15T12"
-        else:
-            return "qT00T12"
-
-    def _get_encoded_values_A(self):
-        """Get encoded values for group A"""
-        shape = self.current_shape_A
-
-        if shape == "Điểm":
-            so_chieu = int(self.kich_thuoc_A)
-            if so_chieu == 2:
-                x_encoded = self.ket_qua_diem_A[0] if len(self.ket_qua_diem_A) > 0 else ""
-                y_encoded = self.ket_qua_diem_A[1] if len(self.ket_qua_diem_A) > 1 else ""
-                return f"{x_encoded}={y_encoded}="
-            else:
-                x_encoded = self.ket_qua_diem_A[0] if len(self.ket_qua_diem_A) > 0 else ""
-                y_encoded = self.ket_qua_diem_A[1] if len(self.ket_qua_diem_A) > 1 else ""
-                z_encoded = self.ket_qua_diem_A[2] if len(self.ket_qua_diem_A) > 2 else ""
-                return f"{x_encoded}={y_encoded}={z_encoded}="
-
-        elif shape == "Đường thẳng":
-            A_encoded = self.ket_qua_A1[0] if len(self.ket_qua_A1) > 0 else ""
-            X_encoded = self.ket_qua_X1[0] if len(self.ket_qua_X1) > 0 else ""
-            B_encoded = self.ket_qua_A1[1] if len(self.ket_qua_A1) > 1 else ""
-            Y_encoded = self.ket_qua_X1[1] if len(self.ket_qua_X1) > 1 else ""
-            C_encoded = self.ket_qua_A1[2] if len(self.ket_qua_A1) > 2 else ""
-            Z_encoded = self.ket_qua_X1[2] if len(self.ket_qua_X1) > 2 else ""
-            return f"{A_encoded}={X_encoded}={B_encoded}={Y_encoded}={C_encoded}={Z_encoded}="
-
-        elif shape == "Mặt phẳng":
-            N1_encoded = self.ket_qua_N1[0] if len(self.ket_qua_N1) > 0 else ""
-            N2_encoded = self.ket_qua_N1[1] if len(self.ket_qua_N1) > 1 else ""
-            N3_encoded = self.ket_qua_N1[2] if len(self.ket_qua_N1) > 2 else ""
-            N4_encoded = self.ket_qua_N1[3] if len(self.ket_qua_N1) > 3 else ""
-            return f"{N1_encoded}={N2_encoded}={N3_encoded}={N4_encoded}="
-
-        elif shape == "Đường tròn":
-            A1_encoded = self.ket_qua_duong_tron_A[0] if len(self.ket_qua_duong_tron_A) > 0 else ""
-            A2_encoded = self.ket_qua_duong_tron_A[1] if len(self.ket_qua_duong_tron_A) > 1 else ""
-            A3_encoded = self.ket_qua_duong_tron_A[2] if len(self.ket_qua_duong_tron_A) > 2 else ""
-            return f"{A1_encoded}={A2_encoded}={A3_encoded}="
-
-        elif shape == "Mặt cầu":
-            A1_encoded = self.ket_qua_mat_cau_A[0] if len(self.ket_qua_mat_cau_A) > 0 else ""
-            A2_encoded = self.ket_qua_mat_cau_A[1] if len(self.ket_qua_mat_cau_A) > 1 else ""
-            A3_encoded = self.ket_qua_mat_cau_A[2] if len(self.ket_qua_mat_cau_A) > 2 else ""
-            A4_encoded = self.ket_qua_mat_cau_A[3] if len(self.ket_qua_mat_cau_A) > 3 else ""
-            return f"{A1_encoded}={A2_encoded}={A3_encoded}={A4_encoded}="
-
-        return ""
-
-    def _get_encoded_values_B(self):
-        """Get encoded values for group B"""
-        if self.current_operation in ["Diện tích", "Thể tích"]:
-            return ""
-
-        shape = self.current_shape_B
-
-        if shape == "Điểm":
-            so_chieu = int(self.kich_thuoc_B)
-            if so_chieu == 2:
-                x_encoded = self.ket_qua_diem_B[0] if len(self.ket_qua_diem_B) > 0 else ""
-                y_encoded = self.ket_qua_diem_B[1] if len(self.ket_qua_diem_B) > 1 else ""
-                return f"{x_encoded}={y_encoded}="
-            else:
-                x_encoded = self.ket_qua_diem_B[0] if len(self.ket_qua_diem_B) > 0 else ""
-                y_encoded = self.ket_qua_diem_B[1] if len(self.ket_qua_diem_B) > 1 else ""
-                z_encoded = self.ket_qua_diem_B[2] if len(self.ket_qua_diem_B) > 2 else ""
-                return f"{x_encoded}={y_encoded}={z_encoded}="
-
-        elif shape == "Đường thẳng":
-            A_encoded = self.ket_qua_A2[0] if len(self.ket_qua_A2) > 0 else ""
-            X_encoded = self.ket_qua_X2[0] if len(self.ket_qua_X2) > 0 else ""
-            B_encoded = self.ket_qua_A2[1] if len(self.ket_qua_A2) > 1 else ""
-            Y_encoded = self.ket_qua_X2[1] if len(self.ket_qua_X2) > 1 else ""
-            C_encoded = self.ket_qua_A2[2] if len(self.ket_qua_A2) > 2 else ""
-            Z_encoded = self.ket_qua_X2[2] if len(self.ket_qua_X2) > 2 else ""
-            return f"{A_encoded}={X_encoded}={B_encoded}={Y_encoded}={C_encoded}={Z_encoded}="
-
-        elif shape == "Mặt phẳng":
-            N5_encoded = self.ket_qua_N2[0] if len(self.ket_qua_N2) > 0 else ""
-            N6_encoded = self.ket_qua_N2[1] if len(self.ket_qua_N2) > 1 else ""
-            N7_encoded = self.ket_qua_N2[2] if len(self.ket_qua_N2) > 2 else ""
-            N8_encoded = self.ket_qua_N2[3] if len(self.ket_qua_N2) > 3 else ""
-            return f"{N5_encoded}={N6_encoded}={N7_encoded}={N8_encoded}="
-
-        elif shape == "Đường tròn":
-            B1_encoded = self.ket_qua_duong_tron_B[0] if len(self.ket_qua_duong_tron_B) > 0 else ""
-            B2_encoded = self.ket_qua_duong_tron_B[1] if len(self.ket_qua_duong_tron_B) > 1 else ""
-            B3_encoded = self.ket_qua_duong_tron_B[2] if len(self.ket_qua_duong_tron_B) > 2 else ""
-            return f"{B1_encoded}={B2_encoded}={B3_encoded}="
-
-        elif shape == "Mặt cầu":
-            B1_encoded = self.ket_qua_mat_cau_B[0] if len(self.ket_qua_mat_cau_B) > 0 else ""
-            B2_encoded = self.ket_qua_mat_cau_B[1] if len(self.ket_qua_mat_cau_B) > 1 else ""
-            B3_encoded = self.ket_qua_mat_cau_B[2] if len(self.ket_qua_mat_cau_B) > 2 else ""
-            B4_encoded = self.ket_qua_mat_cau_B[3] if len(self.ket_qua_mat_cau_B) > 3 else ""
-            return f"{B1_encoded}={B2_encoded}={B3_encoded}={B4_encoded}="
-
-        return ""
+        values_B = [] if self.current_operation in SINGLE_GROUP_OPERATIONS else \
+            self._lay_ket_qua("B", self.current_shape_B)
+        return self.encoder.build_keylog(
+            self.current_shape_A, self.current_shape_B, self.current_operation,
+            (self.kich_thuoc_A, self.kich_thuoc_B),
+            self._lay_ket_qua("A", self.current_shape_A), values_B,
+            self.encoder.resolve_prefix(self.current_version_config)
+        )
 
     def export_to_excel(self, file_path=None):
         """Export current data to Excel với đường dẫn an toàn"""
@@ -549,6 +395,8 @@ class GeometryController:
             else:  # Nếu chỉ có tên file, lưu trong thư mục hiện tại
                 file_path = os.path.join(os.getcwd(), file_path)
 
+            import pandas as pd
+
             # Chuẩn bị dữ liệu để xuất
             data = self._prepare_comprehensive_export_data()
             df = pd.DataFrame(data)
@@ -720,69 +568,18 @@ class GeometryController:
 
     def process_excel_batch_chunked(self, file_path: str, shape_a: str, shape_b: str,
                                     operation: str, dimension_a: str, dimension_b: str,
-                                    chunksize: int = 1000, progress_callback=None):
-        """Xử lý file Excel lớn theo từng chunk"""
-
-        # Lấy tổng số dòng để tính tiến độ
-        total_rows = self.excel_processor.get_total_rows(file_path)
-        processed_rows = 0
-        success_count = 0
-        error_count = 0
-
-        all_results = []
-
+                                    chunksize: int = 1000, progress_callback=None, output_path: str = None,
+                                    workers: int = None, cancel_token: Optional[CancellationToken] = None,
+                                    timer: Optional[StageTimer] = None,
+                                    versions: Optional[Sequence[str]] = None,
+                                    cache: Optional[ResultCache] = None,
+                                    checkpoint: Optional[BatchCheckpoint] = None):
+        """Xử lý file Excel lớn theo từng chunk (workers > 1: song song nhiều process)"""
         try:
-            # Đọc file theo chunk
-            chunk_iterator = self.excel_processor.read_excel_data_chunked(file_path, chunksize)
-
-            for chunk_idx, chunk_df in enumerate(chunk_iterator):
-                if self._cancellation_requested:
-                    break
-
-                chunk_results = []
-
-                # Xử lý từng dòng trong chunk
-                for index, row in chunk_df.iterrows():
-                    try:
-                        # Set current state
-                        self.set_current_shapes(shape_a, shape_b)
-                        self.set_kich_thuoc(dimension_a, dimension_b)
-                        self.current_operation = operation
-
-                        # Extract và xử lý dữ liệu
-                        data_a = self.excel_processor.extract_shape_data(row, shape_a, 'A')
-                        data_b = self.excel_processor.extract_shape_data(row, shape_b, 'B') if shape_b else {}
-
-                        self.thuc_thi_tat_ca(data_a, data_b)
-                        result = self.generate_final_result()
-
-                        chunk_results.append(result)
-                        success_count += 1
-
-                    except Exception as e:
-                        chunk_results.append(f"LỖI: {str(e)}")
-                        error_count += 1
-
-                    processed_rows += 1
-
-                    # Cập nhật tiến độ sau mỗi dòng
-                    if progress_callback and processed_rows % 10 == 0:  # Cập nhật mỗi 10 dòng
-                        progress = (processed_rows / total_rows) * 100 if total_rows > 0 else 0
-                        progress_callback(progress, processed_rows, total_rows, success_count, error_count)
-
-                all_results.extend(chunk_results)
-
-                # Giải phóng bộ nhớ sau mỗi chunk
-                del chunk_df
-                import gc
-                gc.collect()
-
-            # Xuất kết quả cuối cùng
-            final_df = self.excel_processor.read_excel_data(file_path)
-            output_path = self._get_output_path(file_path)
-            final_output_path = self.excel_processor.export_results(final_df, all_results, output_path)
-
-            return all_results, final_output_path, success_count, error_count
-
+            return self._run_batch_pipeline(file_path, shape_a, shape_b, operation,
+                                            dimension_a, dimension_b, output_path,
+                                            chunksize=chunksize, progress_callback=progress_callback,
+                                            workers=workers, cancel_token=cancel_token, timer=timer,
+                                            versions=versions, cache=cache, checkpoint=checkpoint)
         except Exception as e:
-            raise Exception(f"Lỗi xử lý file Excel theo chunk: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Lỗi xử lý file Excel theo chunk: {str(e)}")
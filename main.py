@@ -1,5 +1,8 @@
+import multiprocessing
 from views.main_view import MainView
 
 if __name__ == "__main__":
+    # Cần cho ProcessPoolExecutor khi đóng gói thành file chạy (Windows)
+    multiprocessing.freeze_support()
     app = MainView()
     app.run()
\ No newline at end of file
@@ -0,0 +1,344 @@
+import os
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+from config import registry as config_registry
+from models.geometry_models import GeometryData
+from models.mapping_manager import MappingManager
+
+VERSION_CONFIG_DIR = "config/version_configs"
+VERSION_MAPPING_FILE = os.path.join(VERSION_CONFIG_DIR, "version_mapping.json")
+DEFAULT_PREFIX = "wj"
+
+# Phép toán chỉ dùng nhóm A
+SINGLE_GROUP_OPERATIONS = ("Diện tích", "Thể tích")
+
+# Mã tên đối tượng trong keylog
+_SHAPE_CODES_A = {"Đường thẳng": "21", "Mặt phẳng": "31", "Đường tròn": "41", "Mặt cầu": "51"}
+_SHAPE_CODES_B = {"Đường thẳng": "qT12T12", "Mặt phẳng": "qT13T12", "Đường tròn": "qT14T12", "Mặt cầu": "qT15T12"}
+# Số giá trị của mỗi đối tượng trong keylog (điểm phụ thuộc kích thước)
+_VALUE_COUNTS = {"Đường thẳng": 6, "Mặt phẳng": 4, "Đường tròn": 3, "Mặt cầu": 4}
+
+
+class KeylogTemplate(NamedTuple):
+    """
+    Phần tĩnh của keylog cho một tổ hợp (đối tượng A, B, phép toán, kích thước, prefix).
+
+    pattern là chuỗi str.format: {i} là giá trị đã mã hóa thứ i theo thứ tự của
+    encode_group (nhóm A rồi nhóm B); thứ tự nhập xen kẽ của đường thẳng đã nằm
+    sẵn trong chỉ số placeholder.
+    """
+    pattern: str
+    width: int
+
+    def assemble(self, columns: Sequence[Sequence[str]], count: int) -> List[str]:
+        """
+        Ghép keylog theo cột: columns[i] là cột giá trị thứ i của count dòng.
+        Mỗi dòng chỉ còn một lần gọi str.format, không tra bảng hay rẽ nhánh.
+        """
+        if not count:
+            return []
+        if not self.width:
+            return [self.pattern.format()] * count
+        return list(map(self.pattern.format, *columns))
+
+
+def load_version_mapping() -> Dict[str, str]:
+    """Load mapping tên phiên bản → file cấu hình (qua registry cấu hình dùng chung)"""
+    try:
+        return config_registry.load(VERSION_MAPPING_FILE).get("version_file_mapping", {})
+    except Exception as e:
+        print(f"Lỗi load version mapping: {e}")
+        # Fallback mapping nếu file không tồn tại
+        return {
+            "fx799": "fx799.json",
+            "fx800": "fx800.json",
+            "fx801": "fx801.json",
+            "fx802": "fx802.json",
+            "fx803": "fx803.json"
+        }
+
+
+def version_config_path(version_name: str, version_mapping: Mapping[str, str]) -> str:
+    """Đường dẫn file cấu hình của một phiên bản"""
+    return os.path.join(VERSION_CONFIG_DIR, version_mapping.get(version_name, "version_1.0.json"))
+
+
+def load_version_config(version_name: str, version_mapping: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Load cấu hình (chỉ-đọc) cho một phiên bản (fallback prefix wj nếu thiếu file).
+
+    File chỉ được đọc lại khi mtime thay đổi, nên gọi mỗi lần đổi phiên bản không tốn I/O.
+    """
+    try:
+        if version_mapping is None:
+            version_mapping = load_version_mapping()
+
+        config_path = version_config_path(version_name, version_mapping)
+
+        if not os.path.exists(config_path):
+            print(f"File config không tồn tại: {config_path}")
+            return {"version": version_name, "prefix": DEFAULT_PREFIX}
+
+        return config_registry.load(config_path)
+
+    except Exception as e:
+        print(f"Lỗi load config phiên bản {version_name}: {e}")
+        return {"version": version_name, "prefix": DEFAULT_PREFIX}
+
+
+class GeometryEncoder:
+    """
+    Lõi mã hóa hình học không trạng thái.
+
+    Mọi bảng tra (mã phép toán, T-code, prefix theo phiên bản) được nạp một lần
+    khi khởi tạo và không bị sửa tại chỗ (bảng prefix chỉ được thay nguyên khối khi
+    file cấu hình phiên bản thay đổi); encode() chỉ làm việc trên tham số
+    truyền vào nên có thể gọi đồng thời từ nhiều thread, hoặc tạo một instance
+    riêng trong mỗi process. Cache mã hóa của MappingManager tự đồng bộ bằng lock.
+    """
+
+    def __init__(self, mapping_manager: Optional[MappingManager] = None,
+                 geometry_data: Optional[GeometryData] = None,
+                 version_mapping: Optional[Dict[str, str]] = None):
+        self.mapping_manager = mapping_manager or MappingManager()
+        geometry_data = geometry_data or GeometryData()
+
+        self.pheptoan_map: Mapping[str, str] = MappingProxyType(dict(geometry_data.pheptoan_map))
+        self.default_group_a_tcodes: Mapping[str, str] = MappingProxyType(dict(geometry_data.default_group_a_tcodes))
+        self.default_group_b_tcodes: Mapping[str, str] = MappingProxyType(dict(geometry_data.default_group_b_tcodes))
+        self.operation_tcodes: Mapping[str, Dict[str, Dict[str, str]]] = MappingProxyType(
+            {op: {group: dict(codes) for group, codes in groups.items()}
+             for op, groups in geometry_data.operation_tcodes.items()}
+        )
+
+        if version_mapping is None:
+            version_mapping = load_version_mapping()
+        self.version_mapping: Mapping[str, str] = MappingProxyType(dict(version_mapping))
+        self.version_prefixes: Mapping[str, str] = self._load_version_prefixes()
+        # Template keylog theo (shape_a, shape_b, phép toán, kích thước, prefix); các bảng tra
+        # không đổi sau khởi tạo và prefix nằm trong khóa nên không cần xóa cache
+        self._keylog_templates: Dict[Tuple[Any, ...], KeylogTemplate] = {}
+        # Bảng prefix được dựng lại khi một file cấu hình phiên bản thay đổi
+        for config_file in set(self.version_mapping.values()):
+            config_registry.subscribe(os.path.join(VERSION_CONFIG_DIR, config_file), self._on_version_config_changed)
+
+    def _load_version_prefixes(self) -> Mapping[str, str]:
+        """Prefix của các phiên bản có file cấu hình"""
+        version_mapping = dict(self.version_mapping)
+        return MappingProxyType({
+            name: load_version_config(name, version_mapping).get("prefix", DEFAULT_PREFIX)
+            for name, config_file in version_mapping.items()
+            if os.path.exists(os.path.join(VERSION_CONFIG_DIR, config_file))
+        })
+
+    def _on_version_config_changed(self, data: Mapping[str, Any]):
+        """Reload hook: dựng lại bảng prefix theo phiên bản"""
+        self.version_prefixes = self._load_version_prefixes()
+
+    # ========== PHIÊN BẢN ==========
+    def resolve_prefix(self, version: Union[str, Mapping[str, Any], None]) -> str:
+        """Lấy prefix từ tên phiên bản hoặc dict cấu hình phiên bản"""
+        if version is None:
+            return DEFAULT_PREFIX
+        if isinstance(version, Mapping):
+            return version.get("prefix", DEFAULT_PREFIX)
+        prefix = self.version_prefixes.get(version)
+        if prefix is None:
+            prefix = load_version_config(version, dict(self.version_mapping)).get("prefix", DEFAULT_PREFIX)
+        return prefix
+
+    # ========== MÃ HÓA GIÁ TRỊ ==========
+    def encode_values(self, chuoi_dau_vao: str, so_tham_so: int = 3, apply_keylog: bool = True) -> List[str]:
+        """Tách chuỗi 'a,b,c' thành đúng so_tham_so phần tử (thiếu bù '0') rồi mã hóa từng phần tử"""
+        if not chuoi_dau_vao:
+            return ["" for _ in range(so_tham_so)]
+
+        ds = chuoi_dau_vao.replace(" ", "").split(',')
+        while len(ds) < so_tham_so:
+            ds.append("0")
+        ds = ds[:so_tham_so]
+
+        if apply_keylog:
+            encode = self.mapping_manager.encode_string
+            return [encode(item) for item in ds]
+        return ds
+
+    def encode_group(self, shape: str, data: Mapping[str, str], dimension: Union[str, int] = "3",
+                     group: str = "A") -> List[str]:
+        """
+        Mã hóa dữ liệu một nhóm đối tượng.
+
+        Returns:
+            Danh sách giá trị đã mã hóa theo thứ tự nhập: điểm [x, y(, z)],
+            đường thẳng [A, B, C, X, Y, Z], mặt phẳng [a, b, c, d],
+            đường tròn [x, y, r], mặt cầu [x, y, z, r]
+        """
+        if shape == "Điểm":
+            so_tham_so = 2 if int(dimension) == 2 else 3
+            return self.encode_values(data.get('point_input', ''), so_tham_so)
+
+        if shape == "Đường thẳng":
+            suffix = "1" if group == "A" else "2"
+            return (self.encode_values(data.get(f'line_A{suffix}', ''))
+                    + self.encode_values(data.get(f'line_X{suffix}', '')))
+
+        if shape == "Mặt phẳng":
+            encode = self.mapping_manager.encode_string
+            return [encode(data.get(key, '')) for key in ('plane_a', 'plane_b', 'plane_c', 'plane_d')]
+
+        if shape == "Đường tròn":
+            return (self.encode_values(data.get('circle_center', ''), so_tham_so=2)
+                    + self.encode_values(data.get('circle_radius', ''), so_tham_so=1))
+
+        if shape == "Mặt cầu":
+            return (self.encode_values(data.get('sphere_center', ''), so_tham_so=3)
+                    + self.encode_values(data.get('sphere_radius', ''), so_tham_so=1))
+
+        return []
+
+    # ========== GHÉP KEYLOG ==========
+    def get_tcode(self, operation: str, group: str, shape: str) -> str:
+        """T-code của đối tượng theo phép toán (fallback bảng mặc định)"""
+        operation_map = self.operation_tcodes.get(operation)
+        if operation_map:
+            codes = operation_map["group_a"] if group == "A" else operation_map["group_b"]
+            if shape in codes:
+                return codes[shape]
+
+        if group == "A":
+            return self.default_group_a_tcodes.get(shape, "T0")
+        return self.default_group_b_tcodes.get(shape, "T0")
+
+    @staticmethod
+    def get_shape_code(group: str, shape: str, dimension: Union[str, int] = "3") -> str:
+        """Mã tên đối tượng trong keylog"""
+        if shape == "Điểm":
+            dimension = str(dimension)
+            if dimension in ("2", "3"):
+                return ("11" if group == "A" else "qT11T12") + dimension
+        codes = _SHAPE_CODES_A if group == "A" else _SHAPE_CODES_B
+        return codes.get(shape, "00" if group == "A" else "qT00T12")
+
+    @staticmethod
+    def value_count(shape: str, dimension: Union[str, int] = "3") -> int:
+        """Số giá trị của đối tượng trong keylog (bằng số giá trị encode_group trả về)"""
+        if shape == "Điểm":
+            return 2 if int(dimension) == 2 else 3
+        return _VALUE_COUNTS.get(shape, 0)
+
+    @staticmethod
+    def format_values(shape: str, values: Sequence[str], dimension: Union[str, int] = "3") -> str:
+        """Ghép các giá trị đã mã hóa thành chuỗi phím 'v1=v2=...=' (thiếu giá trị thì để trống)"""
+        count = GeometryEncoder.value_count(shape, dimension)
+        values = list(values[:count]) + [""] * (count - len(values[:count]))
+        if shape == "Đường thẳng":
+            # Nhập xen kẽ điểm và vector: A=X=B=Y=C=Z=
+            values = [values[0], values[3], values[1], values[4], values[2], values[5]]
+        return "".join(f"{value}=" for value in values)
+
+    def build_keylog(self, shape_a: str, shape_b: str, operation: str,
+                     dims: Tuple[Union[str, int], Union[str, int]],
+                     values_a: Sequence[str], values_b: Sequence[str], prefix: str) -> str:
+        """Ghép keylog từ các giá trị đã mã hóa của hai nhóm"""
+        if not shape_a or not operation:
+            return ""
+
+        pheptoan_code = self.pheptoan_map.get(operation, operation)
+        tcode_a = self.get_tcode(operation, "A", shape_a)
+        ten_a = self.get_shape_code("A", shape_a, dims[0])
+        gia_tri_a = self.format_values(shape_a, values_a, dims[0])
+
+        if operation in SINGLE_GROUP_OPERATIONS:
+            return f"{prefix}{ten_a}{gia_tri_a}C{pheptoan_code}{tcode_a}="
+
+        tcode_b = self.get_tcode(operation, "B", shape_b)
+        ten_b = self.get_shape_code("B", shape_b, dims[1])
+        gia_tri_b = self.format_values(shape_b, values_b, dims[1])
+        return f"{prefix}{ten_a}{gia_tri_a}C{ten_b}{gia_tri_b}C{pheptoan_code}{tcode_a}R{tcode_b}="
+
+    def keylog_template(self, shape_a: str, shape_b: str, operation: str,
+                        dims: Tuple[Union[str, int], Union[str, int]], prefix: str = "") -> Optional[KeylogTemplate]:
+        """
+        Template keylog cho cả batch (None nếu thiếu shape_a hoặc phép toán).
+
+        Template được dựng bằng chính build_keylog với giá trị giữ chỗ, nên luôn cho
+        cùng kết quả với đường ghép từng dòng.
+        """
+        if not shape_a or not operation:
+            return None
+
+        key = (shape_a, shape_b, operation, str(dims[0]), str(dims[1]), prefix)
+        template = self._keylog_templates.get(key)
+        if template is None:
+            width_a = self.value_count(shape_a, dims[0])
+            width_b = 0 if operation in SINGLE_GROUP_OPERATIONS else self.value_count(shape_b, dims[1])
+            # Giá trị giữ chỗ không thể xuất hiện trong mã tĩnh; ngoặc nhọn tĩnh được escape
+            placeholders = [f"\x00{index}\x01" for index in range(width_a + width_b)]
+            keylog = self.build_keylog(shape_a, shape_b, operation, dims,
+                                       placeholders[:width_a], placeholders[width_a:], prefix)
+            pattern = keylog.replace("{", "{{").replace("}", "}}")
+            pattern = pattern.replace("\x00", "{").replace("\x01", "}")
+            template = self._keylog_templates[key] = KeylogTemplate(pattern, width_a + width_b)
+        return template
+
+    def encode_row_values(self, shape_a: str, shape_b: str, operation: str,
+                          dims: Tuple[Union[str, int], Union[str, int]],
+                          data_a: Mapping[str, str], data_b: Mapping[str, str]) -> List[str]:
+        """Giá trị đã mã hóa của một dòng theo thứ tự placeholder của keylog_template"""
+        values = self.encode_group(shape_a, data_a, dims[0], "A")
+        if operation not in SINGLE_GROUP_OPERATIONS:
+            values = values + self.encode_group(shape_b, data_b, dims[1], "B")
+        return values
+
+    def encode(self, shape_a: str, shape_b: str, operation: str,
+               dims: Tuple[Union[str, int], Union[str, int]],
+               data_a: Mapping[str, str], data_b: Mapping[str, str],
+               version: Union[str, Mapping[str, Any], None] = None) -> str:
+        """
+        Mã hóa một bài toán hình học thành keylog.
+
+        Args:
+            shape_a, shape_b: Đối tượng nhóm A/B ("Điểm", "Đường thẳng", ...)
+            operation: Phép toán ("Khoảng cách", "Diện tích", ...)
+            dims: Kích thước (A, B) của đối tượng điểm, "2" hoặc "3"
+            data_a, data_b: Dữ liệu nhập theo khóa của excel_mapping (point_input, line_A1...)
+            version: Tên phiên bản (vd. "fx799") hoặc dict cấu hình phiên bản
+
+        Returns:
+            Chuỗi keylog; "" nếu thiếu shape_a hoặc phép toán
+        """
+        if not shape_a or not operation:
+            return ""
+
+        values_a = self.encode_group(shape_a, data_a, dims[0], "A")
+        if operation in SINGLE_GROUP_OPERATIONS:
+            values_b = []
+        else:
+            values_b = self.encode_group(shape_b, data_b, dims[1], "B")
+
+        return self.build_keylog(shape_a, shape_b, operation, dims, values_a, values_b, self.resolve_prefix(version))
+
+    def encode_versions(self, shape_a: str, shape_b: str, operation: str,
+                        dims: Tuple[Union[str, int], Union[str, int]],
+                        data_a: Mapping[str, str], data_b: Mapping[str, str],
+                        prefixes: Sequence[str]) -> List[str]:
+        """
+        Mã hóa một bài toán cho nhiều phiên bản cùng lúc.
+
+        Các phiên bản chỉ khác nhau ở prefix đầu keylog, nên dữ liệu chỉ được mã hóa
+        một lần rồi ghép với từng prefix (đã tra sẵn bằng resolve_prefix).
+
+        Returns:
+            Keylog theo thứ tự prefixes
+        """
+        if not shape_a or not operation:
+            return [""] * len(prefixes)
+
+        values_a = self.encode_group(shape_a, data_a, dims[0], "A")
+        if operation in SINGLE_GROUP_OPERATIONS:
+            values_b = []
+        else:
+            values_b = self.encode_group(shape_b, data_b, dims[1], "B")
+
+        body = self.build_keylog(shape_a, shape_b, operation, dims, values_a, values_b, "")
+        return [f"{prefix}{body}" for prefix in prefixes]
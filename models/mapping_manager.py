@@ -1,50 +1,51 @@
-import json
 import re
 import os
-from typing import List, Dict, Any
-
-
-class MappingManager:
-    def __init__(self, mapping_file: str = "config/mapping.json"):
-        self.mapping_file = mapping_file
-        self.mappings = self._load_mappings()
-
-    def _load_mappings(self) -> List[Dict[str, Any]]:
-        """Load mappings from JSON file"""
-        if not os.path.exists(self.mapping_file):
-            raise FileNotFoundError(f"Mapping file not found: {self.mapping_file}")
-
-        with open(self.mapping_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("mappings", [])
-
-    def encode_string(self, input_string: str) -> str:
-        """Encode a string using the mapping rules"""
-        input_string = input_string.replace(" ", "")
-        if not input_string:
-            return ""
-
-        result = input_string
-        complex_fraction_pattern = r"\\frac\{((?:\{.*?\}|[^{}])+)\}\{((?:\{.*?\}|[^{}])+)\}"
-
-        def process_complex_fraction(match):
-            num = match.group(1)
-            den = match.group(2)
-            num_processed = self._process_nested_content(num)
-            den_processed = self._process_nested_content(den)
-            return f"{num_processed}a{den_processed}"
-
-        # Process complex fractions
-        changed = True
-        max_iterations = 20
-        while changed and max_iterations > 0:
-            new_result = re.sub(complex_fraction_pattern, process_complex_fraction, result)
-            changed = new_result != result
-            result = new_result
-            max_iterations -= 1
-
-        # Apply other mappings
-        for rule in self.mappings:
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from config import registry as config_registry
+from utils.latex_parser import encode_latex
+from utils.lru_cache import LRUCache
+
+# Ký tự đặc biệt của regex - pattern chứa chúng (không escape) không phải literal
+_REGEX_SPECIAL_CHARS = set(".^$*+?{}[]|()")
+
+
+def _literal_from_pattern(pattern: str) -> Optional[str]:
+    """Trả về chuỗi literal nếu pattern regex chỉ khớp đúng một chuỗi cố định, ngược lại None"""
+    chars = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                return None
+            chars.append(pattern[i + 1])
+            i += 2
+            continue
+        if ch in _REGEX_SPECIAL_CHARS:
+            return None
+        chars.append(ch)
+        i += 1
+    return "".join(chars)
+
+
+class CompiledEncoder:
+    """
+    Bộ mã hóa đã biên dịch sẵn từ danh sách rule trong mapping.json.
+
+    Mỗi rule được chuyển một lần thành lệnh ('literal', find, replace) hoặc
+    ('regex', pattern đã compile, replace). Rule phân số và rule không làm thay đổi
+    chuỗi bị loại bỏ; regex chỉ khớp chuỗi cố định được hạ xuống str.replace.
+    Phân số \\frac và ngoặc nhọn do utils.latex_parser xử lý trong một lượt.
+    """
+
+    def __init__(self, mappings: List[Dict[str, Any]]):
+        self.program: Tuple[Tuple[str, Any, str], ...] = self._compile(mappings)
+
+    @staticmethod
+    def _compile(mappings: List[Dict[str, Any]]) -> Tuple[Tuple[str, Any, str], ...]:
+        """Biên dịch danh sách rule thành chương trình bất biến, giữ nguyên thứ tự"""
+        program = []
+        for rule in mappings:
             find = rule.get("find", "")
             replace = rule.get("replace", "")
             rule_type = rule.get("type", "literal")
@@ -55,33 +56,106 @@ class MappingManager:
 
             if rule_type == "regex":
                 try:
-                    result = re.sub(find, replace, result)
+                    pattern = re.compile(find)
+                    # Kiểm tra chuỗi thay thế ngay lúc biên dịch (lỗi group reference...)
+                    pattern.sub(replace, "")
                 except Exception as e:
                     print(f"Regex error with pattern '{find}': {e}")
                     continue
+
+                literal = _literal_from_pattern(find)
+                if literal and "\\" not in replace:
+                    if literal != replace:
+                        program.append(("literal", literal, replace))
+                    continue
+                program.append(("regex", pattern, replace))
+            else:
+                if find and find != replace:
+                    program.append(("literal", find, replace))
+                elif not find:
+                    # str.replace("", x) chèn x vào giữa mọi ký tự - giữ nguyên hành vi
+                    program.append(("literal", find, replace))
+
+        return tuple(program)
+
+    def apply_rules(self, text: str) -> str:
+        """Áp dụng lần lượt các rule (không xử lý phân số)"""
+        for kind, find, replace in self.program:
+            if kind == "literal":
+                text = text.replace(find, replace)
             else:
-                result = result.replace(find, replace)
+                text = find.sub(replace, text)
+        return text
 
-        return result
+    def encode(self, input_string: str) -> str:
+        """Mã hóa một chuỗi - tương đương MappingManager.encode_string"""
+        input_string = input_string.replace(" ", "")
+        if not input_string:
+            return ""
 
-    def _process_nested_content(self, content: str) -> str:
-        """Process nested content with mappings"""
-        result = content
-        for rule in self.mappings:
-            find = rule.get("find", "")
-            replace = rule.get("replace", "")
-            rule_type = rule.get("type", "literal")
-            description = rule.get("description", "")
+        if "{" in input_string or "}" in input_string or "\\frac" in input_string:
+            return encode_latex(input_string, self.apply_rules)
+        return self.apply_rules(input_string)
 
-            if "frac" in description:
-                continue
+    def encode_many(self, items: Iterable[str]) -> List[str]:
+        """Mã hóa hàng loạt chuỗi"""
+        encode = self.encode
+        return [encode(item) for item in items]
 
-            if rule_type == "regex":
-                try:
-                    result = re.sub(find, replace, result)
-                except Exception:
-                    continue
-            else:
-                result = result.replace(find, replace)
 
-        return result
\ No newline at end of file
+class MappingManager:
+    def __init__(self, mapping_file: str = "config/mapping.json", cache_size: int = 8192):
+        self.mapping_file = mapping_file
+        self.mappings = self._load_mappings()
+        self.fingerprint = self._compute_fingerprint()
+        self.encoder = CompiledEncoder(self.mappings)
+        # Cache kết quả mã hóa: key = (fingerprint mapping, chuỗi đầu vào)
+        self.cache = LRUCache(cache_size)
+        # Biên dịch lại khi registry phát hiện mapping.json thay đổi
+        config_registry.subscribe(self.mapping_file, self._on_mapping_changed)
+
+    def _load_mappings(self) -> List[Dict[str, Any]]:
+        """Load mappings from JSON file (qua registry cấu hình dùng chung)"""
+        if not os.path.exists(self.mapping_file):
+            raise FileNotFoundError(f"Mapping file not found: {self.mapping_file}")
+
+        return config_registry.load(self.mapping_file).get("mappings", [])
+
+    def _compute_fingerprint(self) -> str:
+        """Fingerprint nội dung file mapping (dùng làm một phần key của cache)"""
+        return config_registry.fingerprint(self.mapping_file)
+
+    def _on_mapping_changed(self, data: Dict[str, Any]):
+        """Reload hook: biên dịch lại encoder và làm mới cache"""
+        self.mappings = data.get("mappings", [])
+        self.encoder = CompiledEncoder(self.mappings)
+        self.fingerprint = self._compute_fingerprint()
+        self.cache.clear()
+
+    def reload_mappings(self) -> bool:
+        """Kiểm tra lại file mapping; nếu nội dung đổi, hook sẽ biên dịch lại encoder và làm mới cache"""
+        return config_registry.reload(self.mapping_file)
+
+    def encode_string(self, input_string: str) -> str:
+        """Encode a string using the mapping rules"""
+        key = (self.fingerprint, input_string)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.encoder.encode(input_string)
+            self.cache.put(key, result)
+        return result
+
+    def encode_many(self, input_strings: Iterable[str]) -> List[str]:
+        """Encode many strings at once (batch mode)"""
+        encode = self.encode_string
+        return [encode(item) for item in input_strings]
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Thống kê cache mã hóa (hit/miss/eviction)"""
+        stats = self.cache.stats()
+        stats['fingerprint'] = self.fingerprint
+        return stats
+
+    def _process_nested_content(self, content: str) -> str:
+        """Process nested content with mappings"""
+        return self.encoder.apply_rules(content)
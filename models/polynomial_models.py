@@ -1,14 +1,16 @@
 """
 Polynomial Models - Xử lý logic giải phương trình đa thức
 Hỗ trợ giải phương trình bậc 2, 3, 4 với các phương pháp toán học chính xác
+
+Bậc 3, 4 được giải bằng bộ tìm nghiệm số (models.polynomial_roots); SymPy chỉ
+được import khi bật chế độ ký hiệu chính xác (exact=True).
 """
 
-import numpy as np
-import sympy as sp
 import cmath
 import math
 from typing import List, Union, Tuple, Dict, Any
 from decimal import Decimal, getcontext
+from utils import expressions
 
 # Set precision for decimal calculations
 getcontext().prec = 28
@@ -17,13 +19,27 @@ getcontext().prec = 28
 class PolynomialSolver:
     """
     Class chính để giải phương trình đa thức bậc cao
-    Sử dụng các thuật toán toán học chuẩn và thư viện SymPy
+    Mặc định giải số (trị riêng ma trận đồng hành + Newton); exact=True dùng SymPy
     """
 
-    def __init__(self):
-        """Initialize solver với symbol và các cấu hình"""
-        self.x = sp.Symbol('x', real=True)
+    def __init__(self, exact: bool = False):
+        """
+        Initialize solver với các cấu hình
+
+        Args:
+            exact: True để giải bậc 3, 4 bằng SymPy (chậm, cho nghiệm dạng căn thức)
+        """
+        self.exact = exact
         self.tolerance = 1e-10
+        self._x = None
+
+    @property
+    def x(self):
+        """Symbol x của SymPy (chỉ tạo khi dùng chế độ exact)"""
+        if self._x is None:
+            import sympy as sp
+            self._x = sp.Symbol('x', real=True)
+        return self._x
 
     def validate_coefficients(self, coefficients: List[Union[str, float, int]], degree: int) -> List[float]:
         if len(coefficients) != degree + 1:
@@ -52,6 +68,7 @@ class PolynomialSolver:
         """
         Parse biểu thức toán học từ string
         Hỗ trợ: sqrt(), sin(), cos(), tan(), log(), ln(), pi, e, fractions, powers
+        (cùng ngữ pháp với utils.expressions / math_replacements.json)
 
         Args:
             expr_str: String biểu thức (vd: "sqrt(5)", "sin(pi/2)", "1/2")
@@ -60,20 +77,8 @@ class PolynomialSolver:
             float: Giá trị số của biểu thức
         """
         try:
-            # Replace common expressions
-            expr_str = expr_str.replace("^", "**")  # Power notation
-            expr_str = expr_str.replace("ln", "log")  # Natural log
-
-            # Use SymPy to evaluate mathematical expressions safely
-            expr = sp.sympify(expr_str)
-            result = float(expr.evalf())
-
-            if math.isnan(result) or math.isinf(result):
-                raise ValueError("Biểu thức tạo ra giá trị không hợp lệ")
-
-            return result
-
-        except Exception as e:
+            return expressions.evaluate(expr_str)
+        except ValueError as e:
             raise ValueError(f"Không thể parse biểu thức '{expr_str}': {str(e)}")
 
     def solve_quadratic(self, coefficients: List[float]) -> Dict[str, Any]:
@@ -142,7 +147,7 @@ class PolynomialSolver:
     def solve_cubic(self, coefficients: List[float]) -> Dict[str, Any]:
         """
         Giải phương trình bậc 3: ax³ + bx² + cx + d = 0
-        Sử dụng phương pháp Cardano và SymPy
+        Giải số (mặc định) hoặc bằng SymPy khi exact=True
 
         Args:
             coefficients: [a, b, c, d]
@@ -150,78 +155,65 @@ class PolynomialSolver:
         Returns:
             Dict chứa nghiệm và thông tin phân tích
         """
-        a, b, c, d = coefficients
+        if self.exact:
+            return self._solve_symbolic(coefficients, 3)
+        return self._solve_numeric(coefficients, 3)
 
-        # Sử dụng SymPy để giải chính xác
-        polynomial = a * self.x ** 3 + b * self.x ** 2 + c * self.x + d
-        roots_sympy = sp.solve(polynomial, self.x)
+    def solve_quartic(self, coefficients: List[float]) -> Dict[str, Any]:
+        """
+        Giải phương trình bậc 4: ax⁴ + bx³ + cx² + dx + e = 0
+        Giải số (mặc định) hoặc bằng SymPy khi exact=True
+
+        Args:
+            coefficients: [a, b, c, d, e]
 
+        Returns:
+            Dict chứa nghiệm và thông tin phân tích
+        """
+        if self.exact:
+            return self._solve_symbolic(coefficients, 4)
+        return self._solve_numeric(coefficients, 4)
+
+    def _solve_numeric(self, coefficients: List[float], degree: int) -> Dict[str, Any]:
+        """
+        Giải số bậc 3, 4: trị riêng ma trận đồng hành, làm mịn Newton, phát hiện nghiệm bội.
+        Như SymPy, mỗi nghiệm phân biệt xuất hiện một lần; bội nằm trong analysis['multiplicities'].
+        """
         result = {
-            'degree': 3,
+            'degree': degree,
             'coefficients': coefficients,
             'roots': [],
             'root_types': [],
             'analysis': {}
         }
 
-        # Convert SymPy results to numerical values
-        for root in roots_sympy:
-            try:
-                # Try to get numerical value
-                numerical_root = complex(root.evalf())
-
-                if abs(numerical_root.imag) < self.tolerance:
-                    # Real root
-                    result['roots'].append(float(numerical_root.real))
-                    result['root_types'].append('real')
-                else:
-                    # Complex root
-                    result['roots'].append(numerical_root)
-                    result['root_types'].append('complex')
-
-            except Exception:
-                # If numerical evaluation fails, keep symbolic
-                result['roots'].append(root)
-                result['root_types'].append('symbolic')
+        from models.polynomial_roots import find_roots
 
-        # Analysis
-        real_roots = sum(1 for rt in result['root_types'] if rt == 'real')
-        complex_roots = len(result['roots']) - real_roots
-
-        result['analysis'] = {
-            'real_roots_count': real_roots,
-            'complex_roots_count': complex_roots,
-            'type': self._get_cubic_type(real_roots, complex_roots)
-        }
+        multiplicities = []
+        for root, multiplicity in find_roots(coefficients, self.tolerance):
+            result['roots'].append(root)
+            result['root_types'].append('complex' if isinstance(root, complex) else 'real')
+            multiplicities.append(multiplicity)
 
+        self._add_root_analysis(result, multiplicities)
         return result
 
-    def solve_quartic(self, coefficients: List[float]) -> Dict[str, Any]:
-        """
-        Giải phương trình bậc 4: ax⁴ + bx³ + cx² + dx + e = 0
-        Sử dụng phương pháp Ferrari và SymPy
-
-        Args:
-            coefficients: [a, b, c, d, e]
+    def _solve_symbolic(self, coefficients: List[float], degree: int) -> Dict[str, Any]:
+        """Giải chính xác bằng SymPy (chỉ dùng khi exact=True)"""
+        import sympy as sp
 
-        Returns:
-            Dict chứa nghiệm và thông tin phân tích
-        """
-        a, b, c, d, e = coefficients
-
-        # Sử dụng SymPy để giải
-        polynomial = a * self.x ** 4 + b * self.x ** 3 + c * self.x ** 2 + d * self.x + e
+        polynomial = sum(coeff * self.x ** (degree - i) for i, coeff in enumerate(coefficients))
         roots_sympy = sp.solve(polynomial, self.x)
 
         result = {
-            'degree': 4,
+            'degree': degree,
             'coefficients': coefficients,
             'roots': [],
             'root_types': [],
             'analysis': {}
         }
 
-        # Process roots similar to cubic
+        # Convert SymPy results to numerical values
         for root in roots_sympy:
             try:
                 numerical_root = complex(root.evalf())
@@ -234,20 +226,48 @@ class PolynomialSolver:
                     result['root_types'].append('complex')
 
             except Exception:
+                # If numerical evaluation fails, keep symbolic
                 result['roots'].append(root)
                 result['root_types'].append('symbolic')
 
-        # Analysis
+        self._add_root_analysis(result)
+        return result
+
+    def _add_root_analysis(self, result: Dict[str, Any], multiplicities: List[int] = None):
+        """
+        Đếm nghiệm thực/phức (phân biệt) và phân loại phương trình bậc 3, 4.
+        Nếu biết bội của từng nghiệm, phân loại tính cả bội (nghiệm bội ba 1 → "Ba nghiệm thực").
+        """
         real_roots = sum(1 for rt in result['root_types'] if rt == 'real')
         complex_roots = len(result['roots']) - real_roots
 
+        equation_type = self.describe_roots(result['degree'], result['root_types'], multiplicities)
+
         result['analysis'] = {
             'real_roots_count': real_roots,
             'complex_roots_count': complex_roots,
-            'type': self._get_quartic_type(real_roots, complex_roots)
+            'type': equation_type
         }
+        if multiplicities is not None:
+            result['analysis']['multiplicities'] = multiplicities
 
-        return result
+    def describe_roots(self, degree: int, root_types: List[str], multiplicities: List[int] = None) -> str:
+        """
+        Phân loại phương trình theo loại nghiệm phân biệt và bội của chúng
+        (không có bội thì coi mỗi nghiệm là nghiệm đơn)
+        """
+        if multiplicities is None:
+            multiplicities = [1] * len(root_types)
+        real_total = sum(m for rt, m in zip(root_types, multiplicities) if rt == 'real')
+        complex_total = sum(multiplicities) - real_total
+
+        if degree == 2:
+            if real_total == 2:
+                return 'Nghiệm kép thực' if len(root_types) == 1 else 'Hai nghiệm thực phân biệt'
+            return 'Hai nghiệm phức liên hợp'
+        if degree == 3:
+            return self._get_cubic_type(real_total, complex_total)
+        return self._get_quartic_type(real_total, complex_total)
 
     def _get_cubic_type(self, real_count: int, complex_count: int) -> str:
         """Phân loại phương trình bậc 3 theo nghiệm"""
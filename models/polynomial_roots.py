@@ -0,0 +1,202 @@
+"""
+Bộ tìm nghiệm số cho đa thức bậc thấp (không dùng SymPy).
+
+Nghiệm thô là trị riêng của ma trận đồng hành (companion matrix). Nghiệm đơn
+được làm mịn bằng vài bước Newton; các nghiệm thô nằm sát nhau được gộp thành
+nghiệm bội khi khoảng cách của chúng nằm trong sai số làm tròn dự kiến của
+nghiệm bội m (cỡ eps^(1/m)), sau đó làm mịn bằng Newton trên đạo hàm bậc m-1.
+
+Hàm batch_find_roots() xử lý cả mảng đa thức cùng bậc: trị riêng tính theo lô,
+Newton chạy trên toàn mảng; chỉ các dòng có nghiệm sát nhau mới được gộp
+nghiệm bội từng dòng.
+"""
+
+from typing import List, Sequence, Tuple
+import numpy as np
+
+_EPS = np.finfo(float).eps
+
+# Hệ số nới rộng ngưỡng gộp nghiệm bội so với eps^(1/m)
+CLUSTER_FACTOR = 10.0
+NEWTON_STEPS = 6
+
+# Nghiệm phân biệt kèm bội: [(nghiệm, bội), ...]
+RootList = List[Tuple[complex, int]]
+
+
+def companion_matrices(coefficients: np.ndarray) -> np.ndarray:
+    """
+    Ma trận đồng hành cho mảng đa thức cùng bậc.
+
+    Args:
+        coefficients: mảng (N, bậc + 1), hệ số từ bậc cao đến thấp, hệ số đầu khác 0
+
+    Returns:
+        Mảng (N, bậc, bậc)
+    """
+    coefficients = np.asarray(coefficients, dtype=float)
+    count, size = coefficients.shape
+    degree = size - 1
+    matrices = np.zeros((count, degree, degree))
+    matrices[:, 0, :] = -coefficients[:, 1:] / coefficients[:, :1]
+    if degree > 1:
+        idx = np.arange(degree - 1)
+        matrices[:, idx + 1, idx] = 1.0
+    return matrices
+
+
+def batch_companion_roots(coefficients: np.ndarray) -> np.ndarray:
+    """Nghiệm thô (N, bậc) của mảng đa thức cùng bậc, qua trị riêng ma trận đồng hành"""
+    return np.linalg.eigvals(companion_matrices(coefficients))
+
+
+def _polish(coefficients: np.ndarray, root: complex) -> complex:
+    """Newton trên đa thức, chỉ nhận bước làm |p| giảm"""
+    derivative = np.polyder(coefficients)
+    value = abs(np.polyval(coefficients, root))
+    for _ in range(NEWTON_STEPS):
+        slope = np.polyval(derivative, root)
+        if slope == 0 or value == 0:
+            break
+        candidate = root - np.polyval(coefficients, root) / slope
+        candidate_value = abs(np.polyval(coefficients, candidate))
+        if candidate_value >= value:
+            break
+        root, value = candidate, candidate_value
+    return root
+
+
+def _cluster(raw_roots: Sequence[complex]) -> List[List[complex]]:
+    """
+    Gộp các nghiệm thô gần nhau thành nhóm nghiệm bội.
+
+    Nghiệm bội m bị sai số làm tròn tách thành m nghiệm cách nhau cỡ eps^(1/m),
+    nên một nhóm m nghiệm chỉ được nhận khi đường kính nhóm nhỏ hơn ngưỡng đó.
+    """
+    remaining = list(raw_roots)
+    groups = []
+    degree = len(remaining)
+    while remaining:
+        seed = remaining.pop(0)
+        scale = max(1.0, abs(seed))
+        loosest = CLUSTER_FACTOR * _EPS ** (1.0 / max(degree, 2)) * scale
+        group = [seed] + [root for root in remaining if abs(root - seed) <= loosest]
+
+        # Thu nhỏ nhóm tới khi đường kính phù hợp với bội hiện tại
+        while len(group) > 1:
+            center = sum(group) / len(group)
+            limit = CLUSTER_FACTOR * _EPS ** (1.0 / len(group)) * max(1.0, abs(center))
+            diameter = max(abs(a - b) for a in group for b in group)
+            if diameter <= limit:
+                break
+            farthest = max(group[1:], key=lambda root: abs(root - center))
+            group.remove(farthest)
+
+        for root in group[1:]:
+            remaining.remove(root)
+        groups.append(group)
+    return groups
+
+
+def refine_roots(coefficients: Sequence[float], raw_roots: Sequence[complex],
+                 imag_tolerance: float = 1e-10) -> RootList:
+    """
+    Làm mịn nghiệm thô và phát hiện nghiệm bội.
+
+    Returns:
+        Danh sách (nghiệm, bội) - nghiệm thực trả về kiểu float, sắp xếp nghiệm
+        thực tăng dần rồi đến nghiệm phức
+    """
+    coefficients = np.asarray(coefficients, dtype=float)
+    refined = []
+    for group in _cluster([complex(root) for root in raw_roots]):
+        multiplicity = len(group)
+        if multiplicity == 1:
+            root = _polish(coefficients, group[0])
+        else:
+            # Nghiệm bội m là nghiệm đơn của đạo hàm bậc m-1
+            root = _polish(np.polyder(coefficients, multiplicity - 1), sum(group) / multiplicity)
+        root = complex(root)
+        if abs(root.imag) < imag_tolerance * max(1.0, abs(root.real)):
+            refined.append((float(root.real), multiplicity))
+        else:
+            refined.append((root, multiplicity))
+
+    refined.sort(key=lambda item: (isinstance(item[0], complex), item[0].real, -item[0].imag))
+    return refined
+
+
+def find_roots(coefficients: Sequence[float], imag_tolerance: float = 1e-10) -> RootList:
+    """
+    Nghiệm phân biệt (kèm bội) của một đa thức.
+
+    Args:
+        coefficients: hệ số từ bậc cao đến thấp, hệ số đầu khác 0
+    """
+    coefficients = np.asarray(coefficients, dtype=float)
+    raw_roots = batch_companion_roots(coefficients[np.newaxis, :])[0]
+    return refine_roots(coefficients, raw_roots, imag_tolerance)
+
+
+def _batch_polyval(coefficients: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Giá trị đa thức từng dòng tại các điểm của dòng đó (Horner): (N, k) x (N, m) → (N, m)"""
+    value = np.broadcast_to(coefficients[:, :1], points.shape).astype(complex)
+    for j in range(1, coefficients.shape[1]):
+        value = value * points + coefficients[:, j:j + 1]
+    return value
+
+
+def batch_find_roots(coefficients: np.ndarray, imag_tolerance: float = 1e-10) -> List[RootList]:
+    """
+    Nghiệm phân biệt (kèm bội) cho mảng đa thức cùng bậc.
+
+    Args:
+        coefficients: mảng (N, bậc + 1), hệ số từ bậc cao đến thấp, hệ số đầu khác 0
+
+    Returns:
+        Danh sách N phần tử, mỗi phần tử như kết quả find_roots()
+    """
+    coefficients = np.asarray(coefficients, dtype=float)
+    count, size = coefficients.shape
+    degree = size - 1
+    if count == 0:
+        return []
+
+    raw_roots = batch_companion_roots(coefficients).astype(complex)
+
+    # Newton trên toàn mảng, chỉ nhận bước làm |p| giảm
+    derivative = coefficients[:, :-1] * np.arange(degree, 0, -1)
+    roots = raw_roots
+    value = np.abs(_batch_polyval(coefficients, roots))
+    with np.errstate(all='ignore'):
+        for _ in range(NEWTON_STEPS):
+            slope = _batch_polyval(derivative, roots)
+            candidate = roots - _batch_polyval(coefficients, roots) / slope
+            candidate_value = np.abs(_batch_polyval(coefficients, candidate))
+            better = (slope != 0) & np.isfinite(candidate) & (candidate_value < value)
+            if not better.any():
+                break
+            roots = np.where(better, candidate, roots)
+            value = np.where(better, candidate_value, value)
+
+    # Dòng có cặp nghiệm thô nằm trong ngưỡng gộp → xử lý nghiệm bội từng dòng
+    scale = np.maximum(1.0, np.abs(raw_roots))
+    loosest = CLUSTER_FACTOR * _EPS ** (1.0 / max(degree, 2)) * scale
+    distance = np.abs(raw_roots[:, :, None] - raw_roots[:, None, :])
+    upper = np.triu(np.ones((degree, degree), dtype=bool), k=1)
+    clustered = ((distance <= loosest[:, :, None]) & upper).any(axis=(1, 2))
+
+    is_real = np.abs(roots.imag) < imag_tolerance * np.maximum(1.0, np.abs(roots.real))
+    real_parts = roots.real.tolist()
+    roots_list = roots.tolist()
+    is_real_list = is_real.tolist()
+
+    results = []
+    for i in range(count):
+        if clustered[i]:
+            results.append(refine_roots(coefficients[i], raw_roots[i], imag_tolerance))
+            continue
+        row = [(real_parts[i][j], 1) if is_real_list[i][j] else (roots_list[i][j], 1) for j in range(degree)]
+        row.sort(key=lambda item: (isinstance(item[0], complex), item[0].real, -item[0].imag))
+        results.append(row)
+    return results
@@ -0,0 +1,207 @@
+import math
+import os
+import openpyxl
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+# Các style dùng chung khi xuất file, đăng ký một lần cho mỗi workbook
+_THIN = Side(style='thin')
+
+EXPORT_STYLES = {
+    # Tiêu đề mặc định (giống tiêu đề pandas.to_excel)
+    'tl_header': dict(font=Font(bold=True),
+                      border=Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN),
+                      alignment=Alignment(horizontal='center', vertical='top')),
+    # Tiêu đề bảng kết quả hàng loạt
+    'tl_batch_header': dict(font=Font(name='Arial', size=12, bold=True, color='FFFFFF'),
+                            fill=PatternFill(start_color='2E75B6', end_color='2E75B6', fill_type='solid')),
+    'tl_data': dict(font=Font(name='Arial', size=10)),
+    'tl_result': dict(font=Font(name='Arial', size=10, bold=True, color='2E7D32')),
+    'tl_keylog': dict(font=Font(name='Arial', size=10, bold=False, color='000000')),
+}
+
+
+def clean_cell_value(value: Any) -> Any:
+    """Chuyển NaN/NaT thành ô trống như pandas.to_excel"""
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    try:
+        if value != value:  # NaT, numpy.nan
+            return None
+    except (TypeError, ValueError):
+        # pd.NA không so sánh được với chính nó
+        return None
+    return value
+
+
+def _display_length(value: Any) -> int:
+    return len(str(value)) if value is not None else 0
+
+
+class StreamingExcelWriter:
+    """
+    Ghi file Excel từng dòng qua workbook write-only (bộ nhớ không đổi theo số dòng).
+
+    Style được đăng ký một lần dưới dạng named style và gán theo cột, không định
+    dạng lại từng ô sau khi ghi. Độ rộng cột được ước lượng từ tối đa sample_size
+    dòng đầu tiên (các dòng này được giữ tạm trong bộ nhớ rồi ghi ra ngay khi đủ mẫu).
+    """
+
+    def __init__(self,
+                 output_path: str,
+                 header: Sequence[str],
+                 sheet_name: str = 'Sheet1',
+                 header_style: Optional[str] = 'tl_header',
+                 column_styles: Optional[Dict[int, str]] = None,
+                 default_style: Optional[str] = None,
+                 fixed_widths: Optional[Dict[int, float]] = None,
+                 auto_width: bool = False,
+                 sample_size: int = 200,
+                 max_width: int = 50):
+        self.output_path = output_path
+        self.header = list(header)
+        self.rows_written = 0
+        self._width = len(self.header)
+        self._header_style = header_style
+        self._fixed_widths = dict(fixed_widths or {})
+        self._auto_width = auto_width
+        self._sample_size = sample_size
+        self._max_width = max_width
+
+        # Style của từng cột (None = không định dạng)
+        column_styles = column_styles or {}
+        self._column_styles: List[Optional[str]] = [
+            column_styles.get(idx, default_style) for idx in range(self._width)
+        ]
+        self._styled = any(self._column_styles)
+
+        self._wb = openpyxl.Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(sheet_name)
+        used_styles = set(filter(None, self._column_styles))
+        if header_style:
+            used_styles.add(header_style)
+        for name in used_styles:
+            self._wb.add_named_style(NamedStyle(name=name, **EXPORT_STYLES[name]))
+
+        # Dòng mẫu để ước lượng độ rộng cột - chỉ ghi khi đủ mẫu hoặc khi đóng file
+        self._sample: Optional[List[List[Any]]] = [] if (auto_width and sample_size > 0) else None
+        self._started = False
+
+    def _start(self):
+        """Đặt độ rộng cột và ghi dòng tiêu đề (write-only yêu cầu làm trước khi ghi dữ liệu)"""
+        widths = dict(self._fixed_widths)
+        if self._auto_width:
+            rows = self._sample or []
+            for idx in range(self._width):
+                if idx in widths:
+                    continue
+                max_length = _display_length(self.header[idx])
+                for row in rows:
+                    max_length = max(max_length, _display_length(row[idx]))
+                widths[idx] = min(max_length + 2, self._max_width)
+        for idx, width in widths.items():
+            self._ws.column_dimensions[get_column_letter(idx + 1)].width = width
+
+        header_cells = []
+        for name in self.header:
+            cell = WriteOnlyCell(self._ws, value=name)
+            if self._header_style:
+                cell.style = self._header_style
+            header_cells.append(cell)
+        self._ws.append(header_cells)
+        self._started = True
+
+        if self._sample:
+            for row in self._sample:
+                self._append(row)
+        self._sample = None
+
+    def _append(self, row: List[Any]):
+        if self._styled:
+            ws = self._ws
+            for idx, style in enumerate(self._column_styles):
+                if style:
+                    cell = WriteOnlyCell(ws, value=row[idx])
+                    cell.style = style
+                    row[idx] = cell
+        self._ws.append(row)
+
+    def write_row(self, values: Sequence[Any]):
+        """Ghi một dòng (NaN thành ô trống, thiếu cột thì bù ô trống)"""
+        row = [clean_cell_value(value) for value in values[:self._width]]
+        if len(row) < self._width:
+            row.extend([None] * (self._width - len(row)))
+        self.rows_written += 1
+
+        if self._sample is not None:
+            self._sample.append(row)
+            if len(self._sample) >= self._sample_size:
+                self._start()
+            return
+        if not self._started:
+            self._start()
+        self._append(row)
+
+    def write_rows(self, rows: Iterable[Sequence[Any]]):
+        """Ghi nhiều dòng liên tiếp"""
+        for values in rows:
+            self.write_row(values)
+
+    def close(self) -> str:
+        """Lưu file và trả về đường dẫn"""
+        if not self._started:
+            self._start()
+        directory = os.path.dirname(self.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._wb.save(self.output_path)
+        return self.output_path
+
+
+class StreamingResultWriter(StreamingExcelWriter):
+    """
+    Ghi dữ liệu gốc kèm cột kết quả mã hóa, từng dòng một.
+
+    Cột kết quả ghi đè cột 'keylog' sẵn có (không phân biệt hoa thường),
+    nếu không có thì thêm cột 'keylog' ở cuối - giống ExcelProcessor.export_results.
+
+    result_columns: nhiều cột kết quả (vd. một cột keylog cho mỗi phiên bản);
+    khi đó write_row nhận result là danh sách giá trị theo đúng thứ tự cột.
+    """
+
+    def __init__(self, output_path: str, header: Sequence[str], result_column: str = 'keylog',
+                 sheet_name: str = 'Results', result_columns: Optional[Sequence[str]] = None):
+        header = list(header)
+        self.multi_result = result_columns is not None
+        self.result_indices = []
+        for column in (result_columns if self.multi_result else [result_column]):
+            result_index = None
+            for idx, col in enumerate(header):
+                if str(col).strip().lower() == column.lower():
+                    result_index = idx
+                    break
+            if result_index is None:
+                result_index = len(header)
+                header.append(column)
+            self.result_indices.append(result_index)
+        self.result_index = self.result_indices[0]
+
+        super().__init__(output_path, header, sheet_name=sheet_name,
+                         column_styles={idx: 'tl_keylog' for idx in self.result_indices},
+                         fixed_widths={idx: 50 for idx in self.result_indices})
+
+    def write_row(self, values: Sequence[Any], result: Any = None):
+        """Ghi một dòng dữ liệu gốc kèm kết quả mã hóa (nhiều cột: result là danh sách)"""
+        row = list(values[:self._width])
+        if len(row) < self._width:
+            row.extend([None] * (self._width - len(row)))
+        if self.multi_result:
+            for idx, value in zip(self.result_indices, result):
+                row[idx] = value
+        else:
+            row[self.result_index] = result
+        super().write_row(row)
@@ -1,27 +1,43 @@
+import numpy as np
 import pandas as pd
-import json
 import os
-import openpyxl
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional, Sequence
 from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font
-import re
+from config import registry as config_registry
+from processors.excel_exporter import StreamingExcelWriter, StreamingResultWriter
+from processors.extraction_plan import ExtractionPlan
+from utils import expressions
+from utils.stage_timer import StageTimer
 
 
 class ExcelProcessor:
+    # Các cột kết quả thêm vào file xuất hàng loạt (theo thứ tự)
+    BATCH_RESULT_COLUMNS = ['Keylog_Ma_Hoa', 'Nghiem_He_Phuong_Trinh', 'Ket_Qua_Tong', 'Trang_Thai_Xu_Ly', 'Ghi_Chu']
+    # Cột kết quả của Polynomial Mode và khóa tương ứng trong dict kết quả
+    POLYNOMIAL_RESULT_COLUMNS = ['Nghiem_Phuong_Trinh', 'Phan_Loai', 'Trang_Thai_Xu_Ly', 'Ghi_Chu']
+    POLYNOMIAL_RESULT_KEYS = ['ket_qua_nghiem', 'phan_loai', 'trang_thai', 'ghi_chu']
+    POLYNOMIAL_DEGREES = (2, 3, 4)
+
     def __init__(self, mapping_file: str = "config/excel_mapping.json"):
         self.mapping_file = mapping_file
         self.mapping = self._load_mapping()
+        config_registry.subscribe(self.mapping_file, self._on_mapping_changed)
+        # DataFrame file nguồn của lần xử lý hàng loạt gần nhất: ((đường dẫn, mtime, size), df),
+        # để bước xuất kết quả dùng lại thay vì đọc lại workbook
+        self._source_frame = None
 
     def _load_mapping(self) -> Dict:
-        """Load mapping configuration from JSON file"""
+        """Load mapping configuration from JSON file (chỉ-đọc, dùng chung qua registry)"""
         try:
-            with open(self.mapping_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return config_registry.load(self.mapping_file)
         except Exception as e:
             print(f"Không thể load file mapping: {str(e)}")
             return self._get_default_mapping()
 
+    def _on_mapping_changed(self, mapping: Dict):
+        """Reload hook: dùng mapping mới khi excel_mapping.json thay đổi"""
+        self.mapping = mapping
+
     def _get_default_mapping(self) -> Dict:
         """Tạo mapping mặc định nếu không load được file"""
         return {
@@ -50,6 +66,13 @@ class ExcelProcessor:
                         "phuong_trinh_4": {"excel_column": "Phương trình 4"}
                     }
                 }
+            },
+            "polynomial_mapping": {
+                "degree_column": {"excel_column": "Bậc"},
+                "columns": {key: {"excel_column": key} for key in "abcde"},
+                "coefficients_by_degree": {"2": ["a", "b", "c"], "3": ["a", "b", "c", "d"],
+                                           "4": ["a", "b", "c", "d", "e"]},
+                "required_columns": ["a", "b", "c"]
             }
         }
 
@@ -73,16 +96,40 @@ class ExcelProcessor:
 
         return len(missing_columns) == 0, missing_columns
 
-    def read_excel_data(self, file_path: str) -> pd.DataFrame:
-        """Read Excel file and normalize data"""
+    def read_excel_data(self, file_path: str, keep_source: bool = False) -> pd.DataFrame:
+        """
+        Read Excel file and normalize data
+
+        Args:
+            keep_source: giữ lại DataFrame cho lần xuất kết quả tiếp theo của cùng file
+                (xem _read_source_data) - dùng cho bước đọc của xử lý hàng loạt
+        """
         try:
             df = pd.read_excel(file_path)
             # Normalize column names (remove extra spaces)
             df.columns = df.columns.str.strip()
+            if keep_source:
+                self._source_frame = (self._source_key(file_path), df)
             return df
         except Exception as e:
             raise Exception(f"Không thể đọc file Excel: {str(e)}")
 
+    @staticmethod
+    def _source_key(file_path: str) -> Tuple[str, int, int]:
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+    def _read_source_data(self, file_path: str) -> pd.DataFrame:
+        """
+        DataFrame file gốc cho bước xuất: dùng lại bản đã đọc khi xử lý hàng loạt nếu file
+        chưa thay đổi (cùng đường dẫn, mtime, kích thước), ngược lại đọc lại file.
+        Bản giữ lại được giải phóng sau lần dùng này.
+        """
+        source, self._source_frame = self._source_frame, None
+        if source is not None and source[0] == self._source_key(file_path):
+            return source[1]
+        return self.read_excel_data(file_path)
+
     def extract_shape_data(self, row: pd.Series, shape_type: str, group: str) -> Dict:
         """Extract data for specific shape from row"""
         if group == 'A':
@@ -98,6 +145,10 @@ class ExcelProcessor:
 
         return data_dict
 
+    def build_extraction_plan(self, header: List[str], shape_a: str, shape_b: str = None) -> ExtractionPlan:
+        """Lập kế hoạch trích xuất theo vị trí cột cho cặp đối tượng (dùng cho cả file)"""
+        return ExtractionPlan.from_mapping(self.mapping, header, shape_a, shape_b)
+
     def validate_equation_structure_by_phuong_trinh(self, df: pd.DataFrame, so_an: int) -> Tuple[bool, List[str]]:
         """Validate Excel structure for equation mode by phuong trinh"""
         missing_columns = []
@@ -169,81 +220,99 @@ class ExcelProcessor:
 
         columns_config = self.mapping['equation_mapping_by_phuong_trinh'][key]['columns']
         required_cols = self.mapping['equation_mapping_by_phuong_trinh'][key]['required_columns']
-
-        all_rows_data = []
         num_coeff_per_eq = so_an + 1  # Số hệ số mỗi phương trình
+        num_rows = len(df)
 
-        for row_index in range(len(df)):
-            row_data = {
-                'row_index': row_index,
-                'he_so': [],
-                'original_data': {},
-                'has_data': False
-            }
+        # Xử lý theo cột cho toàn bộ sheet: mỗi cột chỉ chuẩn hóa/tách chuỗi một lần
+        text_cache: Dict[str, pd.Series] = {}
 
-            # Lưu dữ liệu gốc
-            for col in required_cols:
-                if col in df.columns:
-                    value = df.iloc[row_index][col]
-                    row_data['original_data'][col] = value if not pd.isna(value) else ""
-
-            # Trích xuất hệ số - SỬA QUAN TRỌNG Ở ĐÂY
-            he_so_list = []
-            for col_config in columns_config.values():
-                excel_column = col_config['excel_column']
-                coefficients = []
-
-                if excel_column in df.columns:
-                    value = df.iloc[row_index][excel_column]
-                    if pd.isna(value):
-                        value = ""
-                    # Tách hệ số và làm sạch
-                    raw_coefficients = [coeff.strip() for coeff in str(value).strip().split(',') if coeff.strip() != ""]
-
-                    # Xử lý từng phương trình RIÊNG BIỆT
-                    coefficients = raw_coefficients.copy()
-
-                    # Bổ sung số 0 cho đủ mỗi phương trình
-                    while len(coefficients) < num_coeff_per_eq:
-                        coefficients.append("0")
-
-                    # Giới hạn đúng số hệ số cần
-                    coefficients = coefficients[:num_coeff_per_eq]
-
-                else:
-                    # Nếu không có cột, tạo danh sách toàn 0
-                    coefficients = ["0"] * num_coeff_per_eq
-
-                # Thêm hệ số của phương trình này vào danh sách
-                he_so_list.extend(coefficients)
-
-            # Kiểm tra xem dòng có dữ liệu không
-            has_valid_data = any(
-                str(row_data['original_data'].get(col, "")).strip() not in ["", "0"]
-                for col in required_cols
-                if col in df.columns
-            )
+        def column_text(col):
+            if col not in text_cache:
+                text_cache[col] = self._equation_cell_text(df[col])
+            return text_cache[col]
+
+        # Hệ số: ma trận (số dòng, tổng số hệ số), mỗi phương trình đủ đúng (so_an + 1) hệ số
+        coefficient_blocks = []
+        for col_config in columns_config.values():
+            excel_column = col_config['excel_column']
+            if excel_column in df.columns:
+                coefficient_blocks.append(
+                    self._split_coefficients(column_text(excel_column), num_coeff_per_eq)
+                )
+            else:
+                # Nếu không có cột, tạo danh sách toàn 0
+                coefficient_blocks.append(np.full((num_rows, num_coeff_per_eq), "0", dtype=object))
+        if coefficient_blocks:
+            he_so_rows = np.hstack(coefficient_blocks).tolist()
+        else:
+            he_so_rows = [[] for _ in range(num_rows)]
+
+        # Dữ liệu gốc (ô trống → "") và cờ có dữ liệu (có ô khác "" và "0")
+        present_cols = [col for col in required_cols if col in df.columns]
+        original_values = {}
+        has_data = np.zeros(num_rows, dtype=bool)
+        for col in present_cols:
+            series = df[col].astype(object)
+            original_values[col] = series.where(series.notna(), "").tolist()
+            text = column_text(col)
+            has_data |= ~text.isin(["", "0"]).to_numpy()
 
-            row_data['he_so'] = he_so_list
-            row_data['has_data'] = has_valid_data
-            all_rows_data.append(row_data)
+        all_rows_data = []
+        original_columns = [original_values[col] for col in present_cols]
+        for row_index in range(num_rows):
+            all_rows_data.append({
+                'row_index': row_index,
+                'he_so': he_so_rows[row_index],
+                'original_data': {col: values[row_index] for col, values in zip(present_cols, original_columns)},
+                'has_data': bool(has_data[row_index])
+            })
 
         return all_rows_data
 
-    def process_equation_batch(self, file_path: str, so_an: int) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _equation_cell_text(series: pd.Series) -> pd.Series:
+        """Chuỗi đã strip của từng ô (ô trống/NaN → ""), tương đương str(value).strip()"""
+        series = series.astype(object)
+        return series.where(series.notna(), "").astype(str).str.strip()
+
+    @staticmethod
+    def _split_coefficients(text: pd.Series, num_coeff: int) -> np.ndarray:
+        """
+        Tách chuỗi hệ số 'a, b, c' của cả cột thành ma trận (số dòng, num_coeff).
+        Bỏ phần tử rỗng, thiếu thì bù "0", thừa thì cắt bớt - giống xử lý từng ô trước đây.
+        """
+        if len(text) == 0:
+            return np.empty((0, num_coeff), dtype=object)
+
+        # Gộp các dấu phẩy liên tiếp (kể cả khoảng trắng quanh chúng) để không còn phần tử rỗng
+        cleaned = text.str.replace(r"\s*(?:,\s*)+", ",", regex=True).str.strip(",")
+        parts = cleaned.str.split(",", n=num_coeff, expand=True)
+        parts = parts.reindex(columns=range(num_coeff))
+        values = parts.to_numpy(dtype=object)
+        missing = pd.isna(values) | (values == "")
+        values[missing] = "0"
+        return values
+
+    def process_equation_batch(self, file_path: str, so_an: int,
+                               timer: Optional[StageTimer] = None) -> List[Dict[str, Any]]:
         """
         Xử lý hàng loạt các hệ phương trình từ Excel file
 
         Args:
             file_path: Đường dẫn đến file Excel
             so_an: Số ẩn của hệ phương trình
+            timer: Đo thời gian giai đoạn read/extract (tùy chọn)
 
         Returns:
             Danh sách các dictionary chứa dữ liệu từng dòng
         """
         try:
+            timer = timer or StageTimer('equation')
+
             # Đọc file Excel
-            df = self.read_excel_data(file_path)
+            with timer.stage('read'):
+                df = self.read_excel_data(file_path, keep_source=True)
+            timer.add_rows('read', len(df))
 
             # Validate cấu trúc
             is_valid, missing_cols = self.validate_equation_structure_by_phuong_trinh(df, so_an)
@@ -251,7 +320,8 @@ class ExcelProcessor:
                 raise Exception(f"File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
 
             # Trích xuất tất cả các dòng
-            all_rows = self.extract_all_equation_rows(df, so_an)
+            with timer.stage('extract', len(df)):
+                all_rows = self.extract_all_equation_rows(df, so_an)
 
             # Lọc các dòng có dữ liệu hợp lệ
             valid_rows = [row for row in all_rows if row['has_data']]
@@ -268,7 +338,9 @@ class ExcelProcessor:
                              original_file_path: str,
                              results: List[Dict[str, Any]],
                              output_file_path: str,
-                             so_an: int) -> str:
+                             so_an: int,
+                             timer: Optional[StageTimer] = None,
+                             versions: Optional[Sequence[str]] = None) -> str:
         """
         Xuất kết quả xử lý hàng loạt ra file Excel mới
 
@@ -277,105 +349,98 @@ class ExcelProcessor:
             results: Danh sách kết quả xử lý
             output_file_path: Đường dẫn file output
             so_an: Số ẩn
+            timer: Đo thời gian giai đoạn read/write (tùy chọn)
+            versions: Kết quả nhiều phiên bản - cột Ket_Qua_Tong được thay bằng
+                Ket_Qua_Tong_<phiên bản> (lấy từ 'ket_qua_tong_theo_phien_ban')
 
         Returns:
             Đường dẫn file đã xuất
         """
         try:
-            # Đọc file gốc
-            original_df = self.read_excel_data(original_file_path)
+            if versions:
+                versions = list(versions)
+                columns = ['Keylog_Ma_Hoa', 'Nghiem_He_Phuong_Trinh']
+                columns += [f"Ket_Qua_Tong_{version}" for version in versions]
+                columns += ['Trang_Thai_Xu_Ly', 'Ghi_Chu']
+
+                def result_values(result):
+                    totals = result.get('ket_qua_tong_theo_phien_ban') or {}
+                    return (
+                        [result.get('ket_qua_ma_hoa', ''), result.get('ket_qua_nghiem', '')]
+                        + [totals.get(version, '') for version in versions]
+                        + [result.get('trang_thai', 'Thành công'), result.get('ghi_chu', '')]
+                    )
+            else:
+                columns = self.BATCH_RESULT_COLUMNS
+
+                def result_values(result):
+                    return (
+                        result.get('ket_qua_ma_hoa', ''),
+                        result.get('ket_qua_nghiem', ''),
+                        result.get('ket_qua_tong', ''),
+                        result.get('trang_thai', 'Thành công'),
+                        result.get('ghi_chu', '')
+                    )
+
+            return self._export_result_columns(
+                original_file_path, results, output_file_path, columns, result_values, timer
+            )
+        except Exception as e:
+            raise Exception(f"Không thể xuất file kết quả: {str(e)}")
+
+    def _export_result_columns(self, original_file_path: str, results: List[Dict[str, Any]],
+                               output_file_path: str, result_columns: List[str], result_values,
+                               timer: Optional[StageTimer] = None) -> str:
+        """
+        Ghi dữ liệu gốc của từng dòng kết quả kèm các cột kết quả (ghi đè cột trùng tên,
+        còn lại thêm vào cuối), dạng streaming.
+
+        Args:
+            result_values: hàm nhận dict kết quả, trả về giá trị theo thứ tự result_columns
+            timer: Đo thời gian đọc file gốc (read) và ghi file kết quả (write)
+        """
+        timer = timer or StageTimer('export')
+
+        # Đọc file gốc
+        with timer.stage('read'):
+            original_df = self._read_source_data(original_file_path)
+            original_columns = [str(col) for col in original_df.columns]
+            original_rows = list(original_df.itertuples(index=False, name=None))
+
+        # Cột kết quả trùng tên cột gốc thì ghi đè tại chỗ, còn lại thêm vào cuối
+        header = list(original_columns)
+        result_positions = []
+        for col in result_columns:
+            if col in header:
+                result_positions.append(header.index(col))
+            else:
+                result_positions.append(len(header))
+                header.append(col)
 
-            # Tạo DataFrame mới từ kết quả
-            output_data = []
+        column_styles = {
+            idx: 'tl_result' if any(keyword in col for keyword in ['Keylog', 'Nghiem', 'Ket_Qua']) else 'tl_data'
+            for idx, col in enumerate(header)
+        }
 
+        with timer.stage('write', len(results)):
+            writer = StreamingExcelWriter(output_file_path, header,
+                                          sheet_name='Kết Quả Xử Lý Hàng Loạt',
+                                          header_style='tl_batch_header',
+                                          column_styles=column_styles,
+                                          auto_width=True)
+            padding = [None] * (len(header) - len(original_columns))
             for result in results:
                 row_index = result['row_index']
-                if row_index >= len(original_df):
+                if row_index >= len(original_rows):
                     continue
 
-                # Lấy dòng gốc
-                original_row = original_df.iloc[row_index].to_dict()
-
-                # Thêm kết quả xử lý
-                output_row = {
-                    **original_row,
-                    'Keylog_Ma_Hoa': result.get('ket_qua_ma_hoa', ''),
-                    'Nghiem_He_Phuong_Trinh': result.get('ket_qua_nghiem', ''),
-                    'Ket_Qua_Tong': result.get('ket_qua_tong', ''),
-                    'Trang_Thai_Xu_Ly': result.get('trang_thai', 'Thành công'),
-                    'Ghi_Chu': result.get('ghi_chu', '')
-                }
-
-                output_data.append(output_row)
-
-            # Tạo DataFrame output
-            output_df = pd.DataFrame(output_data)
-
-            # Đảm bảo thư mục tồn tại
-            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-
-            # Xuất file Excel với định dạng
-            with pd.ExcelWriter(output_file_path, engine='openpyxl') as writer:
-                output_df.to_excel(writer, index=False, sheet_name='Kết Quả Xử Lý Hàng Loạt')
-
-                # Định dạng worksheet
-                worksheet = writer.sheets['Kết Quả Xử Lý Hàng Loạt']
-                self._format_batch_results_worksheet(worksheet, output_df)
+                row = list(original_rows[row_index]) + padding
+                for position, value in zip(result_positions, result_values(result)):
+                    row[position] = value
+                writer.write_row(row)
 
-            return output_file_path
-
-        except Exception as e:
-            raise Exception(f"Không thể xuất file kết quả: {str(e)}")
-
-    def _format_batch_results_worksheet(self, worksheet, df):
-        """Định dạng worksheet cho kết quả hàng loạt"""
-        try:
-            # Định dạng font cho tiêu đề
-            header_font = Font(name='Arial', size=12, bold=True, color='FFFFFF')
-            header_fill = openpyxl.styles.PatternFill(start_color='2E75B6', end_color='2E75B6', fill_type='solid')
-
-            # Định dạng font cho dữ liệu
-            data_font = Font(name='Arial', size=10)
-
-            # Định dạng cột kết quả
-            result_font = Font(name='Arial', size=10, bold=True, color='2E7D32')
-
-            # Áp dụng định dạng cho tiêu đề
-            for col in range(1, len(df.columns) + 1):
-                cell = worksheet.cell(row=1, column=col)
-                cell.font = header_font
-                cell.fill = header_fill
-
-            # Áp dụng định dạng cho dữ liệu
-            for row in range(2, len(df) + 2):
-                for col in range(1, len(df.columns) + 1):
-                    cell = worksheet.cell(row=row, column=col)
-                    cell.font = data_font
-
-                    # Định dạng đặc biệt cho cột kết quả
-                    col_letter = get_column_letter(col)
-                    col_name = df.columns[col - 1] if col - 1 < len(df.columns) else ""
-
-                    if any(keyword in col_name for keyword in ['Keylog', 'Nghiem', 'Ket_Qua']):
-                        cell.font = result_font
-
-            # Tự động điều chỉnh độ rộng cột
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-
-        except Exception as e:
-            print(f"Lỗi định dạng worksheet: {e}")
+            output_file = writer.close()
+        return output_file
 
     def get_file_info(self, file_path: str) -> Dict[str, Any]:
         """
@@ -430,60 +495,69 @@ class ExcelProcessor:
         if not quality_info['valid']:
             return quality_info
 
-        # Kiểm tra từng dòng
-        for row_index in range(len(df)):
-            has_data = False
-            has_issue = False
+        # Kiểm tra theo cột cho toàn bộ sheet, chỉ lặp Python trên các dòng có lỗi
+        expected_coeffs = so_an + 1  # Số hệ số mong đợi
+        num_rows = len(df)
+        has_data = np.zeros(num_rows, dtype=bool)
+        has_issue = np.zeros(num_rows, dtype=bool)
+        column_checks = []
+        valid_cache: Dict[str, bool] = {}
+
+        for col in required_cols:
+            text = self._equation_cell_text(df[col])
+            empty = (text == "").to_numpy()
+            counts = (text.str.count(",") + 1).to_numpy()
+
+            # Các hệ số cần kiểm tra (chỉ expected_coeffs phần tử đầu, đã strip)
+            # Phần tử không tồn tại coi như rỗng (không cần kiểm tra)
+            parts = text.str.split(",", n=expected_coeffs, expand=True).reindex(columns=range(expected_coeffs))
+            parts = parts.fillna("").astype(str)
+            coeffs = np.empty((num_rows, expected_coeffs), dtype=object)
+            invalid = np.zeros((num_rows, expected_coeffs), dtype=bool)
+            for j in range(expected_coeffs):
+                stripped = parts[j].str.strip()
+                for value in stripped.unique():
+                    if value not in valid_cache:
+                        valid_cache[value] = (not value) or self._is_valid_coefficient(value)
+                invalid[:, j] = ~stripped.map(valid_cache).to_numpy(dtype=bool)
+                coeffs[:, j] = stripped.to_numpy(dtype=object)
+            invalid &= ~empty[:, None]
+
+            wrong_count = ~empty & (counts != expected_coeffs)
+            has_data |= ~empty
+            has_issue |= empty | wrong_count | invalid.any(axis=1)
+            column_checks.append((col, empty, counts, coeffs, invalid))
+
+        quality_info['rows_with_data'] = int(has_data.sum())
+        quality_info['rows_with_errors'] = int(has_issue.sum())
+
+        for row_index in np.flatnonzero(has_issue):
             issues = []
+            for col, empty, counts, coeffs, invalid in column_checks:
+                if empty[row_index]:
+                    issues.append(f"Cột '{col}' trống")
+                    continue
 
-            for col in required_cols:
-                value = df.iloc[row_index][col]
+                count = int(counts[row_index])
+                if count < expected_coeffs:
+                    issues.append(f"Cột '{col}' thiếu hệ số (cần {expected_coeffs}, có {count})")
+                elif count > expected_coeffs:
+                    issues.append(f"Cột '{col}' thừa hệ số (cần {expected_coeffs}, có {count})")
 
-                if pd.isna(value) or str(value).strip() == "":
-                    issues.append(f"Cột '{col}' trống")
-                    has_issue = True
-                else:
-                    # Kiểm tra định dạng hệ số
-                    try:
-                        coefficients = str(value).strip().split(',')
-                        expected_coeffs = so_an + 1  # Số hệ số mong đợi
-
-                        if len(coefficients) < expected_coeffs:
-                            issues.append(f"Cột '{col}' thiếu hệ số (cần {expected_coeffs}, có {len(coefficients)})")
-                            has_issue = True
-                        elif len(coefficients) > expected_coeffs:
-                            issues.append(f"Cột '{col}' thừa hệ số (cần {expected_coeffs}, có {len(coefficients)})")
-                            has_issue = True
-
-                        # Kiểm tra hệ số hợp lệ
-                        for coeff in coefficients[:expected_coeffs]:
-                            coeff = coeff.strip()
-                            if coeff and not self._is_valid_coefficient(coeff):
-                                issues.append(f"Hệ số không hợp lệ: '{coeff}' trong cột '{col}'")
-                                has_issue = True
-
-                    except Exception as e:
-                        issues.append(f"Lỗi xử lý dữ liệu cột '{col}': {str(e)}")
-                        has_issue = True
-
-                    has_data = True
-
-            if has_data:
-                quality_info['rows_with_data'] += 1
-
-            if has_issue:
-                quality_info['rows_with_errors'] += 1
-                quality_info['data_issues'].append({
-                    'row': row_index + 2,  # +2 vì Excel bắt đầu từ 1 và có header
-                    'issues': issues
-                })
+                for j in np.flatnonzero(invalid[row_index]):
+                    issues.append(f"Hệ số không hợp lệ: '{coeffs[row_index, j]}' trong cột '{col}'")
+
+            quality_info['data_issues'].append({
+                'row': int(row_index) + 2,  # +2 vì Excel bắt đầu từ 1 và có header
+                'issues': issues
+            })
 
         return quality_info
 
     def _is_valid_coefficient(self, coeff: str) -> bool:
         """
         Kiểm tra hệ số có hợp lệ không
-        Hỗ trợ: số, phân số, biểu thức toán học cơ bản
+        Hỗ trợ: số, phân số, biểu thức toán học (cùng ngữ pháp với bộ giải - utils.expressions)
         """
         coeff = coeff.strip()
 
@@ -491,39 +565,178 @@ class ExcelProcessor:
         if not coeff:
             return True
 
-        # Kiểm tra số
+        return expressions.validate(coeff)
+
+    # ========== POLYNOMIAL MODE ==========
+    def _polynomial_mapping(self) -> Dict[str, Any]:
+        if 'polynomial_mapping' not in self.mapping:
+            raise Exception("Không tìm thấy cấu hình polynomial_mapping trong excel_mapping.json")
+        return self.mapping['polynomial_mapping']
+
+    def polynomial_coefficient_columns(self, degree: int) -> List[str]:
+        """Tên cột Excel của các hệ số (từ bậc cao đến hằng số) cho một bậc"""
+        config = self._polynomial_mapping()
+        keys = config['coefficients_by_degree'].get(str(degree))
+        if not keys:
+            raise Exception(f"Không hỗ trợ phương trình bậc {degree}")
+        return [config['columns'][key]['excel_column'] for key in keys]
+
+    def extract_polynomial_degrees(self, df: pd.DataFrame, default_degree: int) -> np.ndarray:
+        """
+        Bậc của từng dòng: lấy từ cột 'Bậc' nếu có (ô trống → bậc mặc định).
+        Bậc không hợp lệ được đánh dấu 0.
+        """
+        degree_column = self._polynomial_mapping().get('degree_column', {}).get('excel_column')
+        num_rows = len(df)
+        if not degree_column or degree_column not in df.columns:
+            return np.full(num_rows, int(default_degree), dtype=int)
+
+        values = pd.to_numeric(df[degree_column], errors='coerce').to_numpy(dtype=float, copy=True)
+        blank = self._equation_cell_text(df[degree_column]).eq("").to_numpy()
+        values[blank] = default_degree
+        valid = np.isin(values, self.POLYNOMIAL_DEGREES)
+        return np.where(valid, np.nan_to_num(values), 0).astype(int)
+
+    def validate_polynomial_structure(self, df: pd.DataFrame, default_degree: int) -> Tuple[bool, List[str]]:
+        """Kiểm tra file có đủ cột hệ số cho mọi bậc xuất hiện trong file"""
         try:
-            # Thử chuyển thành số
-            if '/' in coeff:
-                # Xử lý phân số
-                parts = coeff.split('/')
-                if len(parts) == 2:
-                    float(parts[0]) / float(parts[1])
-                    return True
+            degrees = self.extract_polynomial_degrees(df, default_degree)
+            present = sorted(set(np.unique(degrees).tolist()) - {0}) or [int(default_degree)]
+            required = self._polynomial_mapping().get('required_columns', [])
+            for degree in present:
+                for col in self.polynomial_coefficient_columns(degree):
+                    if col not in required:
+                        required = required + [col]
+        except Exception as e:
+            return False, [str(e)]
+
+        missing_columns = [col for col in required if col not in df.columns]
+        return len(missing_columns) == 0, missing_columns
+
+    def extract_polynomial_rows(self, df: pd.DataFrame, default_degree: int) -> Dict[str, np.ndarray]:
+        """
+        Trích xuất hệ số đa thức cho toàn bộ sheet (xử lý theo cột).
+
+        Returns:
+            Dict gồm:
+            - 'degrees': bậc của từng dòng (0 = bậc không hợp lệ)
+            - 'coefficients': ma trận chuỗi (số dòng, 5) từ bậc cao đến hằng số,
+              căn trái theo bậc của dòng; ô trống hoặc ngoài bậc → ""
+            - 'has_data': dòng có ít nhất một ô hệ số khác rỗng
+        """
+        degrees = self.extract_polynomial_degrees(df, default_degree)
+        max_degree = max(self.POLYNOMIAL_DEGREES)
+        num_rows = len(df)
+        coefficients = np.full((num_rows, max_degree + 1), "", dtype=object)
+        has_data = np.zeros(num_rows, dtype=bool)
+
+        text_cache: Dict[str, np.ndarray] = {}
+        for degree in self.POLYNOMIAL_DEGREES:
+            rows = degrees == degree
+            if not rows.any():
+                continue
+            for j, col in enumerate(self.polynomial_coefficient_columns(degree)):
+                if col not in df.columns:
+                    continue
+                if col not in text_cache:
+                    text_cache[col] = self._equation_cell_text(df[col]).to_numpy(dtype=object)
+                coefficients[rows, j] = text_cache[col][rows]
+
+        # Dòng có dữ liệu: có ô hệ số bất kỳ khác rỗng (kể cả dòng bậc không hợp lệ)
+        for col_config in self._polynomial_mapping()['columns'].values():
+            excel_column = col_config['excel_column']
+            if excel_column in df.columns:
+                if excel_column not in text_cache:
+                    text_cache[excel_column] = self._equation_cell_text(df[excel_column]).to_numpy(dtype=object)
+                has_data |= text_cache[excel_column] != ""
+
+        return {'degrees': degrees, 'coefficients': coefficients, 'has_data': has_data}
+
+    def validate_polynomial_data_quality(self, df: pd.DataFrame, default_degree: int) -> Dict[str, Any]:
+        """
+        Kiểm tra chất lượng dữ liệu đa thức (cùng ngữ pháp hệ số với bộ giải)
+
+        Returns:
+            Dictionary chứa thông tin chất lượng dữ liệu
+        """
+        quality_info = {
+            'valid': True,
+            'total_rows': len(df),
+            'rows_with_data': 0,
+            'rows_with_errors': 0,
+            'missing_columns': [],
+            'data_issues': [],
+            'degree_counts': {}
+        }
+
+        is_valid, missing_cols = self.validate_polynomial_structure(df, default_degree)
+        if not is_valid:
+            quality_info['valid'] = False
+            quality_info['missing_columns'] = missing_cols
+            return quality_info
+
+        extracted = self.extract_polynomial_rows(df, default_degree)
+        degrees = extracted['degrees']
+        coefficients = extracted['coefficients']
+        has_data = extracted['has_data']
+
+        valid_cache: Dict[str, bool] = {}
+        invalid = np.zeros(coefficients.shape, dtype=bool)
+        for j in range(coefficients.shape[1]):
+            column = coefficients[:, j]
+            for value in pd.unique(column):
+                if value not in valid_cache:
+                    valid_cache[value] = (not value) or self._is_valid_coefficient(value)
+            invalid[:, j] = ~np.fromiter((valid_cache[value] for value in column), dtype=bool, count=len(column))
+
+        bad_degree = has_data & (degrees == 0)
+        missing_leading = has_data & (degrees > 0) & (coefficients[:, 0] == "")
+        has_issue = bad_degree | missing_leading | (has_data[:, None] & invalid).any(axis=1)
+
+        quality_info['rows_with_data'] = int(has_data.sum())
+        quality_info['rows_with_errors'] = int(has_issue.sum())
+        for degree in self.POLYNOMIAL_DEGREES:
+            count = int((has_data & (degrees == degree)).sum())
+            if count:
+                quality_info['degree_counts'][degree] = count
+
+        for row_index in np.flatnonzero(has_issue):
+            issues = []
+            degree = int(degrees[row_index])
+            if degree == 0:
+                issues.append("Bậc không hợp lệ (chỉ hỗ trợ 2, 3, 4)")
             else:
-                float(coeff)
-                return True
-        except:
-            pass
-
-        # Kiểm tra biểu thức toán học cơ bản
-        math_patterns = [
-            r'^[0-9+\-*/().\s]+$',  # Biểu thức số học cơ bản
-            r'sqrt\([^)]+\)',  # Căn bậc hai
-            r'sin\([^)]+\)',  # Sin
-            r'cos\([^)]+\)',  # Cos
-            r'tan\([^)]+\)',  # Tan
-            r'pi',  # Số pi
-            r'e',  # Số e
-            r'log\([^)]+\)',  # Logarit
-            r'ln\([^)]+\)',  # Logarit tự nhiên
-        ]
-
-        for pattern in math_patterns:
-            if re.search(pattern, coeff, re.IGNORECASE):
-                return True
-
-        return False
+                columns = self.polynomial_coefficient_columns(degree)
+                if missing_leading[row_index]:
+                    issues.append(f"Thiếu hệ số bậc cao nhất (cột '{columns[0]}')")
+                for j in np.flatnonzero(invalid[row_index]):
+                    issues.append(f"Hệ số không hợp lệ: '{coefficients[row_index, j]}' trong cột '{columns[j]}'")
+
+            quality_info['data_issues'].append({
+                'row': int(row_index) + 2,  # +2 vì Excel bắt đầu từ 1 và có header
+                'issues': issues
+            })
+
+        return quality_info
+
+    def export_polynomial_results(self, original_file_path: str, results: List[Dict[str, Any]],
+                                  output_file_path: str, timer: Optional[StageTimer] = None) -> str:
+        """
+        Xuất kết quả giải đa thức hàng loạt (dữ liệu gốc + cột nghiệm, phân loại, trạng thái)
+
+        Returns:
+            Đường dẫn file đã xuất
+        """
+        try:
+            keys = self.POLYNOMIAL_RESULT_KEYS
+            return self._export_result_columns(
+                original_file_path, results, output_file_path,
+                self.POLYNOMIAL_RESULT_COLUMNS,
+                lambda result: [result.get(key, '') for key in keys],
+                timer
+            )
+        except Exception as e:
+            raise Exception(f"Không thể xuất file kết quả: {str(e)}")
 
     def create_equation_template(self, so_an: int, output_path: str) -> str:
         """
@@ -584,74 +797,16 @@ class ExcelProcessor:
             raise Exception(f"Không thể tạo template: {str(e)}")
 
     def export_results(self, original_df: pd.DataFrame, encoded_results: List[str], output_path: str) -> str:
-        """Export results với định dạng font cho cột keylog"""
+        """Export results với định dạng font cho cột keylog (ghi từng dòng, bộ nhớ không đổi)"""
         try:
-            result_df = original_df.copy()
-
-            # Tìm cột keylog
-            keylog_column = None
-            for col in result_df.columns:
-                if col.strip().lower() == 'keylog':
-                    keylog_column = col
-                    break
-
-            # Ghi kết quả
-            if keylog_column:
-                result_df[keylog_column] = encoded_results
-            else:
-                result_df['keylog'] = encoded_results
-
-            # Đảm bảo thư mục tồn tại
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-            # Ghi file Excel với định dạng
-            with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-                result_df.to_excel(writer, index=False, sheet_name='Results')
-
-                # Định dạng cột keylog
-                worksheet = writer.sheets['Results']
-                self._format_keylog_column(worksheet, result_df, keylog_column)
-
-            return output_path
+            writer = StreamingResultWriter(output_path, [str(col) for col in original_df.columns])
+            for values, encoded in zip(original_df.itertuples(index=False, name=None), encoded_results):
+                writer.write_row(values, encoded)
+            return writer.close()
 
         except Exception as e:
             raise Exception(f"Không thể xuất file kết quả: {str(e)}")
 
-    def _format_keylog_column(self, worksheet, df, keylog_column=None):
-        """Định dạng font chữ cho cột keylog"""
-        try:
-            # Xác định tên cột keylog
-            keylog_col_name = keylog_column if keylog_column else 'keylog'
-
-            # Tìm vị trí cột
-            keylog_col_idx = None
-            for idx, col_name in enumerate(df.columns):
-                if col_name == keylog_col_name:
-                    keylog_col_idx = idx
-                    break
-
-            if keylog_col_idx is not None:
-                col_letter = get_column_letter(keylog_col_idx + 1)
-
-                # Font cho cột keylog
-                keylog_font = Font(
-                    name='Arial',
-                    size=10,
-                    bold=False,
-                    color='000000'
-                )
-
-                # Áp dụng font cho dữ liệu
-                for row in range(2, len(df) + 2):
-                    cell = worksheet[f"{col_letter}{row}"]
-                    cell.font = keylog_font
-
-                # Điều chỉnh độ rộng cột
-                worksheet.column_dimensions[col_letter].width = 50
-
-        except Exception as e:
-            print(f"Lỗi định dạng cột keylog: {e}")
-
     def read_excel_data_chunked(self, file_path: str, chunksize: int = 1000):
         """Đọc file Excel theo từng chunk để xử lý file lớn"""
         try:
@@ -0,0 +1,84 @@
+import math
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import pandas as pd
+
+# (tên trường dữ liệu, vị trí cột trong dòng)
+FieldSpec = Tuple[Tuple[str, int], ...]
+
+
+def _cell_text(value: Any) -> str:
+    """Giá trị ô → chuỗi giống str(row[col]).strip() trên dòng pandas (ô trống → 'nan')"""
+    if value is None:
+        return "nan"
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, float) and math.isnan(value):
+        return "nan"
+    return str(value).strip()
+
+
+class ExtractionPlan:
+    """
+    Kế hoạch trích xuất dữ liệu hình học cho một cặp (shape_a, shape_b) trên một file.
+
+    Các cột trong excel_mapping.json được đổi sang vị trí cột đúng một lần khi
+    lập kế hoạch, nên mỗi dòng chỉ còn là truy cập tuple theo chỉ số - không tra
+    cứu mapping, không tạo Series cho từng dòng.
+    """
+
+    def __init__(self, fields_a: FieldSpec, fields_b: FieldSpec):
+        self.fields_a = fields_a
+        self.fields_b = fields_b
+
+    @classmethod
+    def from_mapping(cls, mapping: Dict, header: Sequence[str], shape_a: str,
+                     shape_b: Optional[str] = None) -> "ExtractionPlan":
+        """Lập kế hoạch từ excel_mapping và dòng tiêu đề của file"""
+        positions: Dict[str, int] = {}
+        for idx, col in enumerate(header):
+            positions.setdefault(str(col), idx)
+
+        def resolve(group_key: str, shape: Optional[str]) -> FieldSpec:
+            if not shape:
+                return ()
+            shape_mapping = mapping.get(group_key, {}).get(shape, {})
+            fields = []
+            for field, config in shape_mapping.get('columns', {}).items():
+                excel_column = config.get('excel_column')
+                if excel_column and excel_column in positions:
+                    fields.append((field, positions[excel_column]))
+            return tuple(fields)
+
+        return cls(resolve('group_a_mapping', shape_a), resolve('group_b_mapping', shape_b))
+
+    @property
+    def used_indices(self) -> List[int]:
+        """Các vị trí cột thực sự được đọc (tăng dần, không trùng)"""
+        return sorted({idx for _, idx in self.fields_a + self.fields_b})
+
+    @property
+    def field_names(self) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """Tên trường của nhóm A và nhóm B theo thứ tự trích xuất"""
+        return tuple(field for field, _ in self.fields_a), tuple(field for field, _ in self.fields_b)
+
+    def texts(self, values: Sequence[Any]) -> Tuple[str, ...]:
+        """Dữ liệu đã chuẩn hóa của một dòng (nhóm A rồi nhóm B, cùng thứ tự field_names)"""
+        return tuple(_cell_text(values[idx]) for _, idx in self.fields_a + self.fields_b)
+
+    def extract(self, values: Sequence[Any]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Trích xuất (data_a, data_b) từ một dòng dạng tuple"""
+        data_a = {field: _cell_text(values[idx]) for field, idx in self.fields_a}
+        data_b = {field: _cell_text(values[idx]) for field, idx in self.fields_b}
+        return data_a, data_b
+
+    def iter_dataframe(self, df: pd.DataFrame) -> Iterator[Tuple[Dict[str, str], Dict[str, str]]]:
+        """Trích xuất từng dòng của DataFrame, chỉ duyệt các cột cần thiết bằng itertuples"""
+        used = self.used_indices
+        remap = {idx: position for position, idx in enumerate(used)}
+        narrow_plan = ExtractionPlan(
+            tuple((field, remap[idx]) for field, idx in self.fields_a),
+            tuple((field, remap[idx]) for field, idx in self.fields_b)
+        )
+        extract = narrow_plan.extract
+        for values in df.iloc[:, used].itertuples(index=False, name=None):
+            yield extract(values)
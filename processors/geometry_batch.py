@@ -0,0 +1,290 @@
+"""
+Mã hóa các dòng Excel hình học theo lô, tuần tự hoặc song song nhiều process.
+
+Mỗi process worker chỉ nạp mapping.json / excel_mapping.json một lần trong
+initializer; sau đó chỉ nhận danh sách dòng và trả về keylog theo đúng thứ tự.
+"""
+
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+from models.geometry_encoder import GeometryEncoder, KeylogTemplate
+from models.mapping_manager import MappingManager
+from utils.checkpoint import BatchCheckpoint
+from utils.result_cache import ResultCache, row_key
+from processors.excel_processor import ExcelProcessor
+from processors.extraction_plan import ExtractionPlan
+
+# Kết quả một chunk: (danh sách keylog, số dòng thành công, số dòng lỗi,
+# thời gian theo giai đoạn {'extract': giây, 'encode': giây}).
+# Khi mã hóa nhiều phiên bản, mỗi phần tử keylog là danh sách keylog theo phiên bản.
+ChunkResult = Tuple[List[Any], int, int, Dict[str, float]]
+
+
+def resolve_worker_count(workers: Optional[int]) -> int:
+    """Số process worker: None/0 = số CPU, tối thiểu 1"""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def encode_rows(encoder: GeometryEncoder, plan: ExtractionPlan, rows: Iterable[Sequence[Any]],
+                shape_a: str, shape_b: Optional[str], operation: str,
+                dims: Tuple[str, str], version: Any, start_row: int = 0,
+                prefixes: Optional[Sequence[str]] = None) -> ChunkResult:
+    """
+    Mã hóa một chunk dòng Excel; dòng lỗi được ghi thành 'LỖI: ...' và không dừng cả chunk.
+
+    Phần tĩnh của keylog (prefix, mã đối tượng, mã phép toán, T-code) được dựng một lần
+    cho cả chunk; mỗi dòng chỉ tách và mã hóa giá trị, keylog được ghép theo cột ở cuối chunk.
+
+    Args:
+        start_row: Số thứ tự (0-based) của dòng đầu chunk, dùng cho log lỗi
+        prefixes: Prefix của nhiều phiên bản - mỗi dòng chỉ mã hóa một lần và trả về
+            danh sách keylog theo thứ tự prefixes (version bị bỏ qua)
+    """
+    try:
+        template = encoder.keylog_template(shape_a, shape_b, operation, dims,
+                                           "" if prefixes is not None else encoder.resolve_prefix(version))
+    except Exception:
+        # Kích thước không hợp lệ...: để đường từng dòng ghi lỗi cho từng dòng như cũ
+        template = None
+    if template is not None:
+        return _encode_rows_columnar(encoder, template, plan, rows, shape_a, shape_b, operation,
+                                     dims, start_row, prefixes)
+
+    if prefixes is not None:
+        prefixes = list(prefixes)
+
+        def encode(shape_a, shape_b, operation, dims, data_a, data_b, version):
+            return encoder.encode_versions(shape_a, shape_b, operation, dims, data_a, data_b, prefixes)
+    else:
+        encode = encoder.encode
+    extract = plan.extract
+    clock = time.perf_counter
+    results = []
+    processed_count = 0
+    error_count = 0
+    extract_seconds = 0.0
+    encode_seconds = 0.0
+
+    for offset, values in enumerate(rows):
+        started = clock()
+        try:
+            data_a, data_b = extract(values)
+            extracted = clock()
+            extract_seconds += extracted - started
+            started = extracted
+            result = encode(shape_a, shape_b, operation, dims, data_a, data_b, version)
+            processed_count += 1
+        except Exception as e:
+            result = f"LỖI: {str(e)}"
+            if prefixes is not None:
+                result = [result] * len(prefixes)
+            error_count += 1
+            print(f"Lỗi dòng {start_row + offset + 1}: {str(e)}")
+        encode_seconds += clock() - started
+        results.append(result)
+
+    return results, processed_count, error_count, {'extract': extract_seconds, 'encode': encode_seconds}
+
+
+def _encode_rows_columnar(encoder: GeometryEncoder, template: KeylogTemplate, plan: ExtractionPlan,
+                          rows: Iterable[Sequence[Any]], shape_a: str, shape_b: Optional[str], operation: str,
+                          dims: Tuple[str, str], start_row: int,
+                          prefixes: Optional[Sequence[str]]) -> ChunkResult:
+    """encode_rows với template cố định: mã hóa giá trị từng dòng, ghép keylog theo cột"""
+    encode_values = encoder.encode_row_values
+    extract = plan.extract
+    clock = time.perf_counter
+    results: List[Any] = []
+    encoded_rows = []
+    slots = []
+    error_count = 0
+    extract_seconds = 0.0
+    encode_seconds = 0.0
+
+    for offset, values in enumerate(rows):
+        started = clock()
+        try:
+            data_a, data_b = extract(values)
+            extracted = clock()
+            extract_seconds += extracted - started
+            started = extracted
+            encoded_rows.append(encode_values(shape_a, shape_b, operation, dims, data_a, data_b))
+            slots.append(offset)
+            result = None
+        except Exception as e:
+            result = f"LỖI: {str(e)}"
+            if prefixes is not None:
+                result = [result] * len(prefixes)
+            error_count += 1
+            print(f"Lỗi dòng {start_row + offset + 1}: {str(e)}")
+        encode_seconds += clock() - started
+        results.append(result)
+
+    started = clock()
+    keylogs = template.assemble(list(zip(*encoded_rows)), len(encoded_rows))
+    if prefixes is not None:
+        by_version = [[prefix + keylog for keylog in keylogs] for prefix in prefixes]
+        keylogs = [list(row) for row in zip(*by_version)]
+    for offset, keylog in zip(slots, keylogs):
+        results[offset] = keylog
+    encode_seconds += clock() - started
+
+    return results, len(slots), error_count, {'extract': extract_seconds, 'encode': encode_seconds}
+
+
+# ========== CACHE KẾT QUẢ ==========
+def _is_error(result: Any) -> bool:
+    first = result[0] if isinstance(result, list) and result else result
+    return isinstance(first, str) and first.startswith("LỖI: ")
+
+
+def iter_cached_results(chunks: Iterable[List[tuple]],
+                        encode_chunks: Callable[[Iterable[List[tuple]]], Iterator[Tuple[List[tuple], ChunkResult]]],
+                        cache: ResultCache, scope: str, plan: ExtractionPlan
+                        ) -> Iterator[Tuple[List[tuple], ChunkResult]]:
+    """
+    Bọc một nguồn kết quả theo chunk bằng cache kết quả trên đĩa.
+
+    Mỗi chunk được tra cache trước; encode_chunks (tuần tự hoặc song song) chỉ nhận các
+    dòng chưa có trong cache. Kết quả được ghép lại đúng thứ tự dòng, các keylog mới
+    được lưu vào cache. Thời gian tra/ghi cache nằm trong timings['cache'].
+    """
+    clock = time.perf_counter
+    # (chunk gốc, khóa từng dòng, kết quả tìm thấy, thời gian tra cứu) theo thứ tự gửi đi
+    pending: deque = deque()
+
+    def missing_chunks() -> Iterator[List[tuple]]:
+        texts = plan.texts
+        for rows in chunks:
+            started = clock()
+            keys = [row_key(scope, texts(values)) for values in rows]
+            found = cache.get_many(keys)
+            missing = [values for values, key in zip(rows, keys) if key not in found]
+            pending.append((rows, keys, found, clock() - started))
+            yield missing
+
+    for _, (encoded, processed_count, error_count, timings) in encode_chunks(missing_chunks()):
+        rows, keys, found, cache_seconds = pending.popleft()
+        started = clock()
+        results = []
+        new_items = []
+        encoded_iter = iter(encoded)
+        for key in keys:
+            if key in found:
+                results.append(found[key])
+                continue
+            result = next(encoded_iter)
+            if not _is_error(result):
+                new_items.append((key, result))
+            results.append(result)
+        cache.put_many('geometry', new_items)
+        timings = dict(timings, cache=cache_seconds + clock() - started)
+        yield rows, (results, processed_count + len(rows) - len(encoded), error_count, timings)
+
+
+# ========== CHECKPOINT ==========
+def iter_checkpointed_results(chunks: Iterable[List[tuple]],
+                              encode_chunks: Callable[[Iterable[List[tuple]]], Iterator[Tuple[List[tuple], ChunkResult]]],
+                              checkpoint: BatchCheckpoint
+                              ) -> Iterator[Tuple[List[tuple], ChunkResult]]:
+    """
+    Bọc một nguồn kết quả theo chunk bằng checkpoint (đã begin()).
+
+    Các dòng đã có trong checkpoint lấy lại kết quả đã lưu, không gửi sang encode_chunks;
+    kết quả mới của mỗi chunk được ghi thành một đoạn checkpoint trước khi trả về.
+    Thời gian ghi checkpoint nằm trong timings['checkpoint'].
+    """
+    clock = time.perf_counter
+    saved = checkpoint.results[:checkpoint.resumed_rows]
+    # (chunk gốc, vị trí dòng đầu, số dòng đầu đã có trong checkpoint) theo thứ tự gửi đi
+    pending: deque = deque()
+
+    def remaining_chunks() -> Iterator[List[tuple]]:
+        position = 0
+        for rows in chunks:
+            skip = min(len(rows), max(0, len(saved) - position))
+            pending.append((rows, position, skip))
+            position += len(rows)
+            yield rows[skip:] if skip else rows
+
+    for _, (encoded, processed_count, error_count, timings) in encode_chunks(remaining_chunks()):
+        rows, position, skip = pending.popleft()
+        started = clock()
+        restored = saved[position:position + skip]
+        restored_errors = sum(1 for result in restored if _is_error(result))
+        checkpoint.append(position + skip, encoded)
+        timings = dict(timings, checkpoint=clock() - started)
+        yield rows, (restored + list(encoded), processed_count + skip - restored_errors,
+                     error_count + restored_errors, timings)
+
+
+# ========== PROCESS WORKER ==========
+# Trạng thái riêng của từng process worker (không chia sẻ giữa các process)
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(mapping_file: str, excel_mapping_file: str, header: Sequence[str],
+                 shape_a: str, shape_b: Optional[str], operation: str,
+                 dims: Tuple[str, str], version_config: Mapping[str, Any],
+                 prefixes: Optional[Sequence[str]] = None):
+    """Khởi tạo worker: nạp rule mapping và cấu hình batch đúng một lần"""
+    _worker_state['encoder'] = GeometryEncoder(MappingManager(mapping_file), version_mapping={})
+    _worker_state['plan'] = ExcelProcessor(excel_mapping_file).build_extraction_plan(list(header), shape_a, shape_b)
+    _worker_state['params'] = (shape_a, shape_b, operation, tuple(dims), dict(version_config))
+    _worker_state['prefixes'] = prefixes
+
+
+def _encode_chunk_in_worker(start_row: int, rows: List[tuple]) -> ChunkResult:
+    shape_a, shape_b, operation, dims, version = _worker_state['params']
+    return encode_rows(_worker_state['encoder'], _worker_state['plan'], rows,
+                       shape_a, shape_b, operation, dims, version, start_row, _worker_state['prefixes'])
+
+
+def iter_parallel_results(chunks: Iterable[List[tuple]], workers: int,
+                          mapping_file: str, excel_mapping_file: str, header: Sequence[str],
+                          shape_a: str, shape_b: Optional[str], operation: str,
+                          dims: Tuple[str, str], version_config: Mapping[str, Any],
+                          should_stop: Optional[Callable[[], bool]] = None,
+                          prefixes: Optional[Sequence[str]] = None
+                          ) -> Iterator[Tuple[List[tuple], ChunkResult]]:
+    """
+    Gửi từng chunk sang ProcessPoolExecutor và trả kết quả đúng thứ tự chunk đầu vào.
+    prefixes: mã hóa nhiều phiên bản trong một lượt (xem encode_rows).
+
+    Chỉ giữ tối đa 2 * workers chunk đang xử lý để bộ nhớ không tăng theo kích thước file.
+
+    Yields:
+        (rows của chunk, (keylog, số dòng thành công, số dòng lỗi, thời gian theo giai đoạn))
+    """
+    max_pending = workers * 2
+    pending = deque()
+    start_row = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(mapping_file, excel_mapping_file, list(header), shape_a, shape_b,
+                                       operation, tuple(dims), dict(version_config),
+                                       list(prefixes) if prefixes is not None else None)) as executor:
+        try:
+            for rows in chunks:
+                if should_stop and should_stop():
+                    break
+                pending.append((rows, executor.submit(_encode_chunk_in_worker, start_row, rows)))
+                start_row += len(rows)
+
+                if len(pending) >= max_pending:
+                    rows_done, future = pending.popleft()
+                    yield rows_done, future.result()
+
+            while pending:
+                if should_stop and should_stop():
+                    break
+                rows_done, future = pending.popleft()
+                yield rows_done, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
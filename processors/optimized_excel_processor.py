@@ -0,0 +1,150 @@
+import math
+import openpyxl
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from processors.excel_exporter import StreamingResultWriter
+from processors.excel_processor import ExcelProcessor
+
+
+def _normalize_header(raw_header: Sequence) -> List[str]:
+    """Chuẩn hóa tên cột giống pd.read_excel (strip, Unnamed: i, trùng tên thêm .1, .2...)"""
+    header = []
+    seen: Dict[str, int] = {}
+    for idx, value in enumerate(raw_header):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            name = f"Unnamed: {idx}"
+        else:
+            name = str(value).strip()
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+
+class ExcelRowStream:
+    """
+    Luồng đọc sheet đầu tiên của file Excel theo chunk, mở workbook đúng một lần.
+
+    header và total_rows (lấy từ metadata kích thước sheet) có sẵn ngay sau khi mở,
+    trước khi đọc dữ liệu. Các dòng trống ở cuối sheet bị bỏ qua giống pd.read_excel.
+    """
+
+    def __init__(self, file_path: str, chunksize: int = 1000):
+        self.file_path = file_path
+        self.chunksize = chunksize
+        try:
+            self._wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        except Exception as e:
+            raise Exception(f"Không thể đọc file Excel: {str(e)}")
+
+        ws = self._wb.worksheets[0]
+        max_row = ws.max_row
+        self.total_rows = max(max_row - 1, 0) if max_row else 0
+        self._rows_iter = ws.iter_rows(values_only=True)
+        raw_header = next(self._rows_iter, None)
+        self.header = _normalize_header(raw_header) if raw_header is not None else []
+
+    def __iter__(self) -> Iterator[List[tuple]]:
+        width = len(self.header)
+        if not width:
+            return
+        padding = (None,) * width
+        chunksize = self.chunksize
+
+        chunk = []
+        pending_empty = []
+        for raw_row in self._rows_iter:
+            row = tuple(raw_row[:width]) if len(raw_row) >= width else tuple(raw_row) + padding[len(raw_row):]
+            if all(value is None for value in row):
+                # Chỉ giữ dòng trống nếu phía sau còn dữ liệu
+                pending_empty.append(row)
+                continue
+            if pending_empty:
+                chunk.extend(pending_empty)
+                pending_empty = []
+            chunk.append(row)
+            if len(chunk) >= chunksize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def close(self):
+        self._wb.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class OptimizedExcelProcessor(ExcelProcessor):
+    """
+    ExcelProcessor đọc file theo kiểu streaming (openpyxl read-only).
+
+    Dữ liệu được đọc từng chunk với bộ nhớ giới hạn thay vì nạp toàn bộ sheet,
+    nên file vài trăm nghìn dòng vẫn chạy với bộ nhớ gần như không đổi.
+    Giữ nguyên API validate/trích xuất cột của ExcelProcessor.
+    """
+
+    def __init__(self, mapping_file: str = "config/excel_mapping.json", chunksize: int = 1000):
+        super().__init__(mapping_file)
+        self.chunksize = chunksize
+
+    def open_stream(self, file_path: str, chunksize: Optional[int] = None) -> ExcelRowStream:
+        """Mở luồng đọc file theo chunk (dùng với with ...)"""
+        return ExcelRowStream(file_path, chunksize or self.chunksize)
+
+    def open_result_writer(self, output_path: str, header: Sequence[str],
+                           result_columns: Optional[Sequence[str]] = None) -> StreamingResultWriter:
+        """Mở writer ghi kết quả từng dòng ra file Excel (result_columns: nhiều cột kết quả)"""
+        return StreamingResultWriter(output_path, header, result_columns=result_columns)
+
+    def read_header(self, file_path: str) -> List[str]:
+        """Chỉ đọc dòng tiêu đề (dòng đầu tiên) của sheet đầu tiên"""
+        with self.open_stream(file_path) as stream:
+            return stream.header
+
+    def get_total_rows(self, file_path: str) -> int:
+        """Lấy số dòng dữ liệu từ metadata kích thước sheet (không đọc toàn bộ file)"""
+        try:
+            with self.open_stream(file_path) as stream:
+                return stream.total_rows
+        except Exception:
+            return 0
+
+    def validate_header(self, header: Sequence[str], shape_a: str, shape_b: str = None) -> Tuple[bool, List[str]]:
+        """Validate cấu trúc dựa trên danh sách tên cột"""
+        return self.validate_excel_structure(pd.DataFrame(columns=list(header)), shape_a, shape_b)
+
+    def validate_excel_file(self, file_path: str, shape_a: str, shape_b: str = None) -> Tuple[bool, List[str]]:
+        """Validate cấu trúc file chỉ dựa trên dòng tiêu đề"""
+        return self.validate_header(self.read_header(file_path), shape_a, shape_b)
+
+    def iter_row_chunks(self, file_path: str, chunksize: Optional[int] = None) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        Đọc file theo từng chunk dạng tuple.
+
+        Yields:
+            (header, rows) - rows là list các tuple đã được cắt/bù cho đúng số cột.
+        """
+        with self.open_stream(file_path, chunksize) as stream:
+            for rows in stream:
+                yield stream.header, rows
+
+    def read_excel_data_chunked(self, file_path: str, chunksize: int = 1000) -> Iterator[pd.DataFrame]:
+        """Đọc file Excel theo từng chunk DataFrame (index liên tục giữa các chunk)"""
+        try:
+            start = 0
+            for header, rows in self.iter_row_chunks(file_path, chunksize):
+                # Ô trống → NaN như pd.read_excel
+                rows = [tuple(math.nan if value is None else value for value in row) for row in rows]
+                chunk_df = pd.DataFrame(rows, columns=header, index=range(start, start + len(rows)))
+                start += len(rows)
+                yield chunk_df
+        except Exception as e:
+            raise Exception(f"Không thể đọc file Excel theo chunk: {str(e)}")
@@ -0,0 +1,162 @@
+"""
+Checkpoint cho batch dài: kết quả được ghi dần ra file phụ để chạy tiếp được
+sau khi chương trình bị tắt / lỗi giữa chừng.
+
+File phụ nằm cạnh file kết quả (<tên file kết quả>.checkpoint.jsonl) hoặc cạnh
+file đầu vào (<tên file đầu vào>.<chế độ>.checkpoint.jsonl, xem checkpoint_path),
+chỉ ghi nối thêm, mỗi dòng một JSON:
+
+    {"type": "header", "mode": ..., "input_fingerprint": ..., "params": {...}}
+    {"type": "segment", "start": 0, "end": 1000, "results": [...]}
+    {"type": "segment", "start": 1000, "end": 2000, "results": [...]}
+
+Khi chạy lại với cùng file đầu vào (cùng SHA-1 nội dung) và cùng tham số, các
+đoạn liên tiếp từ dòng 0 được nạp lại; batch chỉ xử lý phần còn lại rồi ghép
+kết quả của các đoạn đã lưu vào workbook cuối. Dòng cuối bị ghi dở (chương
+trình chết khi đang ghi) được cắt bỏ. File phụ bị xóa khi workbook cuối đã ghi xong.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+CHECKPOINT_FORMAT = 1
+# Số dòng mỗi đoạn checkpoint của batch hệ phương trình / đa thức
+# (batch hình học ghi mỗi chunk một đoạn)
+DEFAULT_INTERVAL = 5000
+
+
+def file_fingerprint(path: str, block_size: int = 1024 * 1024) -> str:
+    """SHA-1 nội dung file đầu vào"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BatchCheckpoint:
+    """
+    Checkpoint của một lần chạy batch.
+
+    Args:
+        path: đường dẫn file phụ (xem checkpoint_path)
+        interval: số dòng mỗi đoạn với batch xử lý theo khối (hệ phương trình, đa thức)
+
+    Ví dụ:
+        checkpoint = BatchCheckpoint(BatchCheckpoint.checkpoint_path(output_file))
+        resume_rows = checkpoint.begin('equation', input_file, {'so_an': 2})
+        results = checkpoint.results          # kết quả của resume_rows dòng đầu
+        checkpoint.append(resume_rows, new_results)
+        ...                                   # ghi workbook cuối
+        checkpoint.complete()
+    """
+
+    def __init__(self, path: str, interval: int = DEFAULT_INTERVAL):
+        if interval <= 0:
+            raise ValueError("interval phải lớn hơn 0")
+        self.path = path
+        self.interval = interval
+        # Kết quả đã lưu theo thứ tự dòng (nạp khi begin, nối thêm khi append)
+        self.results: List[Any] = []
+        self.resumed_rows = 0
+        self._file = None
+
+    @staticmethod
+    def checkpoint_path(file_path: str, tag: str = "") -> str:
+        """
+        Đường dẫn file checkpoint cạnh file_path: <tên file>[.<tag>].checkpoint.jsonl
+
+        file_path thường là file kết quả; khi tên file kết quả thay đổi theo mỗi lần chạy
+        (có thời gian) thì dùng file đầu vào và tag = chế độ để chạy lại tìm được checkpoint.
+        """
+        suffix = f".{tag}" if tag else ""
+        return os.path.splitext(file_path)[0] + suffix + ".checkpoint.jsonl"
+
+    def begin(self, mode: str, input_file: str, params: Mapping[str, Any]) -> int:
+        """
+        Mở checkpoint cho lần chạy; trả về số dòng đầu đã có kết quả (0 nếu chạy mới).
+
+        Checkpoint cũ của file đầu vào khác / tham số khác bị bỏ và ghi lại từ đầu.
+        """
+        header = {
+            'type': 'header',
+            'format': CHECKPOINT_FORMAT,
+            'mode': mode,
+            'input': os.path.abspath(input_file),
+            'input_fingerprint': file_fingerprint(input_file),
+            'params': json.loads(json.dumps(dict(params), ensure_ascii=False, default=str)),
+        }
+        self.close()
+        self.results = []
+        valid_bytes = self._load(header) if os.path.exists(self.path) else 0
+        self.resumed_rows = len(self.results)
+
+        if valid_bytes:
+            # Cắt phần ghi dở/không hợp lệ rồi ghi tiếp
+            self._file = open(self.path, 'r+b')
+            self._file.truncate(valid_bytes)
+            self._file.seek(valid_bytes)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, 'wb')
+            header['created'] = datetime.now().isoformat(timespec='seconds')
+            self._write(header)
+        return self.resumed_rows
+
+    def _load(self, header: Dict[str, Any]) -> int:
+        """Nạp các đoạn liên tiếp của checkpoint cũ; trả về số byte hợp lệ (0 = không dùng được)"""
+        valid_bytes = 0
+        try:
+            with open(self.path, 'rb') as f:
+                first = f.readline()
+                saved = json.loads(first.decode('utf-8'))
+                if any(saved.get(key) != header[key]
+                       for key in ('type', 'format', 'mode', 'input_fingerprint', 'params')):
+                    return 0
+                valid_bytes = len(first)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    segment = json.loads(line.decode('utf-8'))
+                    results = segment.get('results')
+                    if (segment.get('type') != 'segment' or segment.get('start') != len(self.results)
+                            or not isinstance(results, list) or segment.get('end') != segment['start'] + len(results)):
+                        break
+                    self.results.extend(results)
+                    valid_bytes += len(line)
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Cảnh báo: bỏ qua phần checkpoint không đọc được {self.path}: {e}")
+        return valid_bytes
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, start: int, results: Sequence[Any]):
+        """Ghi một đoạn kết quả (start = vị trí dòng đầu đoạn, phải nối tiếp đoạn trước)"""
+        if self._file is None:
+            raise RuntimeError("Chưa gọi begin() cho checkpoint")
+        if not results:
+            return
+        if start != len(self.results):
+            raise ValueError(f"Đoạn checkpoint không liên tiếp: bắt đầu {start}, đã có {len(self.results)} dòng")
+        results = list(results)
+        self._write({'type': 'segment', 'start': start, 'end': start + len(results), 'results': results})
+        self.results.extend(results)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def complete(self):
+        """Workbook cuối đã ghi xong: xóa file checkpoint"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
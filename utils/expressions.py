@@ -0,0 +1,399 @@
+"""
+Phân tích, kiểm tra và đánh giá biểu thức hệ số (số, phân số LaTeX, hàm và
+hằng toán học) theo một ngữ pháp duy nhất cho toàn ứng dụng.
+
+Mọi bảng tra (toán tử, hàm, hằng, ký hiệu LaTeX, builtin được phép) được dựng
+một lần từ config/math_replacements.json. Mỗi biểu thức được chuyển sang cú
+pháp Python, phân tích thành AST, kiểm tra theo danh sách trắng rồi biên dịch
+thành cây closure - không dùng eval. Kết quả biên dịch (kể cả lỗi cú pháp)
+được cache theo chuỗi nguồn trong một LRUCache giới hạn dùng chung.
+
+Dùng các hàm cấp module parse() / validate() / evaluate(); giải hệ phương
+trình, giải đa thức và kiểm tra dữ liệu Excel đều đi qua đây.
+"""
+
+import ast
+import builtins
+import math
+import operator
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import registry as config_registry
+from utils.latex_parser import encode_latex
+from utils.lru_cache import LRUCache
+
+# Biểu thức đã biên dịch: hàm không tham số trả về giá trị số
+CompiledExpression = Callable[[], Any]
+
+# Số mũ nguyên lớn hơn ngưỡng này được tính bằng số thực (tránh số nguyên khổng lồ)
+_MAX_INT_EXPONENT = 64
+
+_LATEX_COMMAND = re.compile(r"\\([A-Za-z]+)")
+
+MATH_CONFIG_FILE = 'config/math_replacements.json'
+# Số biểu thức đã biên dịch giữ trong cache dùng chung
+SHARED_CACHE_SIZE = 16384
+
+# Cấu hình dự phòng khi không đọc được math_replacements.json
+DEFAULT_MATH_CONFIG: Dict[str, Any] = {
+    "math_function_replacements": {
+        "operators": {
+            "^": {"python_equivalent": "**"}
+        },
+        "functions": {
+            "sqrt": {"python_equivalent": "math.sqrt"},
+            "sin": {"python_equivalent": "math.sin"},
+            "cos": {"python_equivalent": "math.cos"},
+            "tan": {"python_equivalent": "math.tan"},
+            "log": {"python_equivalent": "math.log10"},
+            "ln": {"python_equivalent": "math.log"},
+            "abs": {"python_equivalent": "abs"},
+            "exp": {"python_equivalent": "math.exp"}
+        },
+        "constants": {
+            "pi": {"python_equivalent": "math.pi"},
+            "e": {"python_equivalent": "math.e"}
+        }
+    },
+    "latex_symbol_replacements": {
+        "mathematical_operators": {
+            r'\\pi': {"python_equivalent": "math.pi"},
+            r'\\cdot': {"python_equivalent": "*"},
+            r'\\times': {"python_equivalent": "*"},
+            r'\\div': {"python_equivalent": "/"}
+        },
+        "delimiters": {
+            r'\\left\(': {"python_equivalent": "("},
+            r'\\right\)': {"python_equivalent": ")"},
+            r'\\left\{': {"python_equivalent": "("},
+            r'\\right\}': {"python_equivalent": ")"}
+        },
+        "whitespace": {
+            r'\\ ': {"python_equivalent": " "},
+            r'\ ': {"python_equivalent": " "}
+        }
+    },
+    "safe_evaluation_environment": {
+        "allowed_modules": {
+            "math": {"description": "Python math module"}
+        },
+        "allowed_builtins": {
+            "abs": {"safe": True},
+            "round": {"safe": True},
+            "min": {"safe": True},
+            "max": {"safe": True}
+        }
+    }
+}
+
+
+class _CompileFailure:
+    """Lỗi biên dịch được cache để chuỗi sai lặp lại không phải phân tích lại"""
+    __slots__ = ('message',)
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def _power(base, exponent):
+    """Lũy thừa có giới hạn: số mũ nguyên lớn chuyển sang số thực (tràn số → OverflowError)"""
+    if isinstance(base, int) and isinstance(exponent, int) and abs(exponent) <= _MAX_INT_EXPONENT:
+        return base ** exponent
+    return float(base) ** exponent
+
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Mod: operator.mod,
+    ast.Pow: _power,
+}
+
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+class SafeExpressionEvaluator:
+    """
+    Bộ đánh giá biểu thức hệ số theo danh sách trắng.
+
+    Ngữ pháp chấp nhận: số nguyên/thực, + - * / % ^ (hoặc **), ngoặc tròn,
+    \\frac{tử}{mẫu}, ngoặc nhọn dùng như ngoặc tròn, các hàm/hằng khai báo trong
+    math_function_replacements (sqrt, sin, ln, pi...), có thể viết kèm '\\' như
+    \\sqrt{2}, \\pi, và các ký hiệu trong latex_symbol_replacements.
+    """
+
+    def __init__(self, math_config: Dict[str, Any], cache: Optional[LRUCache] = None,
+                 cache_size: int = 8192):
+        self._cache = cache if cache is not None else LRUCache(cache_size)
+
+        function_config = math_config.get('math_function_replacements', {})
+        latex_config = math_config.get('latex_symbol_replacements', {})
+        safe_config = math_config.get('safe_evaluation_environment', {})
+
+        # Đối tượng Python được phép: math.<tên> và builtin an toàn
+        math_module = safe_config.get('allowed_modules', {}).get('math')
+        if math_module is not None:
+            allowed_math = math_module.get('functions') or [name for name in dir(math) if not name.startswith('_')]
+            self._math_names = {name: getattr(math, name) for name in allowed_math if hasattr(math, name)}
+        else:
+            self._math_names = {}
+        self._builtin_names = {
+            name: getattr(builtins, name)
+            for name, config in safe_config.get('allowed_builtins', {}).items()
+            if config.get('safe') and hasattr(builtins, name)
+        }
+
+        # Tên người dùng nhập (sqrt, ln, pi...) → đối tượng đã phân giải sẵn
+        self._names: Dict[str, Any] = dict(self._builtin_names)
+        for section in ('functions', 'constants'):
+            for name, config in function_config.get(section, {}).items():
+                self._names[name] = self._resolve_python_name(config['python_equivalent'])
+
+        # Toán tử ký hiệu (^ → **), thay thế chuỗi trực tiếp
+        self._operator_replacements: List[Tuple[str, str]] = [
+            (key, config['python_equivalent'])
+            for key, config in function_config.get('operators', {}).items()
+        ]
+
+        # Ký hiệu LaTeX (khóa là regex), biên dịch một lần
+        self._latex_replacements: List[Tuple[re.Pattern, str]] = [
+            (re.compile(pattern), config['python_equivalent'])
+            for section in ('mathematical_operators', 'delimiters', 'whitespace')
+            for pattern, config in latex_config.get(section, {}).items()
+        ]
+
+        # Dạng ghép phân số, vd. "({numerator})/({denominator})"
+        template = math_config.get('fraction_patterns', {}).get('replacement_pattern',
+                                                                '({numerator})/({denominator})')
+        frac_open, rest = template.split('{numerator}', 1)
+        frac_middle, frac_close = rest.split('{denominator}', 1)
+        self._frac_parts = (frac_open, frac_middle, frac_close)
+
+    def _resolve_python_name(self, python_name: str) -> Any:
+        """Phân giải 'math.sqrt' / 'abs' thành đối tượng thật (chỉ trong danh sách trắng)"""
+        if python_name.startswith('math.') and python_name[5:] in self._math_names:
+            return self._math_names[python_name[5:]]
+        if python_name in self._builtin_names:
+            return self._builtin_names[python_name]
+        raise ValueError(f"Tên không được phép trong cấu hình: '{python_name}'")
+
+    @property
+    def names(self) -> Dict[str, Any]:
+        """Các tên hàm/hằng được chấp nhận trong biểu thức"""
+        return dict(self._names)
+
+    # ========== CHUYỂN ĐỔI CÚ PHÁP ==========
+    def to_python(self, source: str) -> str:
+        """Chuyển chuỗi nhập (LaTeX/ký hiệu toán) sang cú pháp biểu thức Python"""
+        expr = source.strip().replace(' ', '')
+        expr = encode_latex(expr, lambda text: text, self._frac_parts)
+
+        for pattern, replacement in self._latex_replacements:
+            expr = pattern.sub(replacement, expr)
+
+        # \sqrt, \sin, ... → tên hàm; ngoặc nhọn còn lại là ngoặc nhóm
+        expr = _LATEX_COMMAND.sub(
+            lambda match: match.group(1) if match.group(1) in self._names else match.group(0), expr
+        )
+        expr = expr.replace('{', '(').replace('}', ')')
+
+        for old, new in self._operator_replacements:
+            expr = expr.replace(old, new)
+        return expr
+
+    # ========== BIÊN DỊCH ==========
+    def compile(self, source: str) -> CompiledExpression:
+        """
+        Biên dịch biểu thức (có cache theo chuỗi nguồn).
+
+        Raises:
+            ValueError: cú pháp sai hoặc dùng tên/phép toán ngoài danh sách trắng
+        """
+        compiled = self._cache.get(source)
+        if compiled is None:
+            try:
+                compiled = self._compile_source(source)
+            except ValueError as e:
+                compiled = _CompileFailure(str(e))
+            self._cache.put(source, compiled)
+        if isinstance(compiled, _CompileFailure):
+            raise ValueError(compiled.message)
+        return compiled
+
+    def _compile_source(self, source: str) -> CompiledExpression:
+        try:
+            expr = self.to_python(source)
+        except Exception:
+            raise ValueError(f"Không thể đánh giá: '{source}'")
+        try:
+            tree = ast.parse(expr, mode='eval')
+            return self._compile_node(tree.body)
+        except (SyntaxError, ValueError, RecursionError):
+            raise ValueError(f"Không thể đánh giá: '{expr}'")
+
+    def _compile_node(self, node: ast.AST) -> CompiledExpression:
+        """Biên dịch một nút AST thành closure; nút ngoài danh sách trắng → ValueError"""
+        if isinstance(node, ast.Constant):
+            value = node.value
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError("Hằng số không hợp lệ")
+            return lambda: value
+
+        if isinstance(node, ast.BinOp):
+            op = _BINARY_OPERATORS.get(type(node.op))
+            if op is None:
+                raise ValueError("Phép toán không được hỗ trợ")
+            left = self._compile_node(node.left)
+            right = self._compile_node(node.right)
+            return lambda: op(left(), right())
+
+        if isinstance(node, ast.UnaryOp):
+            op = _UNARY_OPERATORS.get(type(node.op))
+            if op is None:
+                raise ValueError("Phép toán không được hỗ trợ")
+            operand = self._compile_node(node.operand)
+            return lambda: op(operand())
+
+        if isinstance(node, ast.Call):
+            func = self._lookup(node.func)
+            if not callable(func) or node.keywords:
+                raise ValueError("Lời gọi hàm không hợp lệ")
+            args = [self._compile_node(arg) for arg in node.args]
+            if any(isinstance(arg, ast.Starred) for arg in node.args):
+                raise ValueError("Lời gọi hàm không hợp lệ")
+            if len(args) == 1:
+                arg = args[0]
+                return lambda: func(arg())
+            return lambda: func(*[arg() for arg in args])
+
+        value = self._lookup(node)
+        if callable(value):
+            raise ValueError("Hàm thiếu đối số")
+        return lambda: value
+
+    def _lookup(self, node: ast.AST) -> Any:
+        """Tên hàm/hằng: tên người dùng (sqrt, pi...) hoặc math.<tên> sinh từ bảng LaTeX"""
+        if isinstance(node, ast.Name) and node.id in self._names:
+            return self._names[node.id]
+        if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name)
+                and node.value.id == 'math' and node.attr in self._math_names):
+            return self._math_names[node.attr]
+        raise ValueError("Tên không được phép")
+
+    # ========== ĐÁNH GIÁ ==========
+    def evaluate(self, source: str) -> float:
+        """
+        Đánh giá biểu thức thành số thực.
+
+        Raises:
+            ValueError: biểu thức không hợp lệ, không tính được (chia 0, ngoài miền...)
+                hoặc cho kết quả không hữu hạn
+        """
+        compiled = self.compile(source)
+        try:
+            value = float(compiled())
+        except Exception:
+            raise ValueError(f"Không thể đánh giá: '{self.to_python(source)}'")
+        if math.isnan(value) or math.isinf(value):
+            raise ValueError("Biểu thức tạo ra giá trị không hợp lệ")
+        return value
+
+    def validate(self, source: str) -> bool:
+        """Biểu thức có đúng ngữ pháp và tính được thành số hữu hạn không"""
+        try:
+            self.evaluate(source)
+            return True
+        except ValueError:
+            return False
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Thống kê cache biểu thức đã biên dịch"""
+        return self._cache.stats()
+
+
+# ========== BỘ ĐÁNH GIÁ DÙNG CHUNG ==========
+_shared_cache = LRUCache(SHARED_CACHE_SIZE)
+_default_evaluator: Optional[SafeExpressionEvaluator] = None
+_default_lock = threading.Lock()
+
+
+def load_math_config(path: str = MATH_CONFIG_FILE) -> Dict[str, Any]:
+    """Đọc math_replacements.json qua registry cấu hình (lỗi → cấu hình dự phòng)"""
+    try:
+        return config_registry.load(path)
+    except Exception as e:
+        print(f"Lỗi load math config: {e}")
+        return DEFAULT_MATH_CONFIG
+
+
+def _rebuild_evaluator(math_config: Dict[str, Any]) -> SafeExpressionEvaluator:
+    """Dựng lại bộ đánh giá dùng chung và xóa cache biểu thức đã biên dịch"""
+    global _default_evaluator
+    with _default_lock:
+        _shared_cache.clear()
+        _default_evaluator = SafeExpressionEvaluator(math_config, cache=_shared_cache)
+        return _default_evaluator
+
+
+def get_evaluator() -> SafeExpressionEvaluator:
+    """Bộ đánh giá dùng chung, dựng từ math_replacements.json ở lần gọi đầu"""
+    global _default_evaluator
+    evaluator = _default_evaluator
+    if evaluator is None:
+        with _default_lock:
+            if _default_evaluator is None:
+                _default_evaluator = SafeExpressionEvaluator(load_math_config(), cache=_shared_cache)
+                # Dựng lại khi registry phát hiện math_replacements.json thay đổi
+                config_registry.subscribe(MATH_CONFIG_FILE, _rebuild_evaluator)
+            evaluator = _default_evaluator
+    return evaluator
+
+
+def reload_math_config() -> SafeExpressionEvaluator:
+    """Đọc lại math_replacements.json và xóa cache biểu thức đã biên dịch"""
+    get_evaluator()
+    if config_registry.reload(MATH_CONFIG_FILE):
+        # Reload hook đã dựng lại bộ đánh giá
+        return _default_evaluator
+    return _rebuild_evaluator(load_math_config())
+
+
+def to_python(source: str) -> str:
+    """Dạng biểu thức Python tương ứng của chuỗi nhập"""
+    return get_evaluator().to_python(source)
+
+
+def parse(source: str) -> CompiledExpression:
+    """
+    Phân tích và biên dịch biểu thức (có cache).
+
+    Raises:
+        ValueError: cú pháp sai hoặc dùng tên/phép toán ngoài danh sách trắng
+    """
+    return get_evaluator().compile(source)
+
+
+def validate(source: str) -> bool:
+    """Biểu thức có hợp lệ và tính được thành số hữu hạn không"""
+    return get_evaluator().validate(source)
+
+
+def evaluate(source: str) -> float:
+    """
+    Đánh giá biểu thức thành số thực hữu hạn.
+
+    Raises:
+        ValueError: biểu thức không hợp lệ hoặc không tính được
+    """
+    return get_evaluator().evaluate(source)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Thống kê cache biểu thức dùng chung"""
+    return _shared_cache.stats()
@@ -1,6 +1,7 @@
 import json
 import os
 from typing import List, Dict, Any
+from config import registry as config_registry
 
 
 class FileUtils:
@@ -11,9 +12,8 @@ class FileUtils:
             raise FileNotFoundError(f"File not found: {file_path}")
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data.get("modes", [])
+            data = config_registry.load(file_path)
+            return list(data.get("modes", []))
         except Exception as e:
             raise Exception(f"Error reading JSON: {e}")
 
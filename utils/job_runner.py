@@ -0,0 +1,182 @@
+"""
+Chạy tác vụ batch trên worker thread, trả tiến độ/kết quả về thread giao diện.
+
+Worker thread không bao giờ chạm vào widget: mọi sự kiện (tiến độ, kết quả,
+lỗi, đã hủy) được đưa vào một queue và được thread Tk lấy ra bằng after().
+Việc hủy là hợp tác: tác vụ nhận một CancellationToken và tự kiểm tra token
+ở ranh giới chunk/dòng, nên file đang ghi luôn được đóng đúng cách.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class JobCancelled(Exception):
+    """Tác vụ dừng vì người dùng yêu cầu hủy"""
+
+
+class CancellationToken:
+    """Cờ hủy dùng chung giữa thread giao diện và worker thread"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def is_cancelled(self) -> bool:
+        """Dạng hàm, dùng làm should_stop cho các vòng lặp batch"""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise JobCancelled("Đã hủy xử lý")
+
+
+class ThroughputTracker:
+    """
+    Tốc độ xử lý (dòng/giây) và thời gian còn lại.
+
+    Tốc độ được làm mượt bằng trung bình trượt hàm mũ (EWMA) trên từng đoạn cập nhật,
+    để ETA không nhảy theo các chunk nhanh/chậm bất thường.
+    """
+
+    def __init__(self, smoothing: float = 0.3):
+        self.smoothing = smoothing
+        self.started = time.perf_counter()
+        self._last_time = self.started
+        self._last_done = 0
+        self.rate = 0.0
+
+    def update(self, done: int, total: Optional[int]) -> Dict[str, Any]:
+        now = time.perf_counter()
+        interval = now - self._last_time
+        if interval > 0 and done > self._last_done:
+            instant = (done - self._last_done) / interval
+            self.rate = instant if self.rate == 0 else self.smoothing * instant + (1 - self.smoothing) * self.rate
+            self._last_time, self._last_done = now, done
+
+        eta = None
+        if total and self.rate > 0:
+            eta = max(0.0, (total - done) / self.rate)
+        return {'done': done, 'total': total, 'rate': self.rate, 'eta_seconds': eta,
+                'elapsed_seconds': now - self.started}
+
+    @staticmethod
+    def format_eta(seconds: Optional[float]) -> str:
+        """Định dạng ETA: mm:ss hoặc h:mm:ss ('--:--' nếu chưa ước lượng được)"""
+        if seconds is None:
+            return "--:--"
+        seconds = int(round(seconds))
+        hours, rest = divmod(seconds, 3600)
+        minutes, secs = divmod(rest, 60)
+        return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+
+# Hàm tác vụ nhận (token, report); report(done, total, **thông tin thêm)
+ReportFn = Callable[..., None]
+JobFn = Callable[[CancellationToken, ReportFn], Any]
+
+
+class JobRunner:
+    """
+    Chạy một tác vụ trên worker thread và gọi các callback trên thread Tk.
+
+    Args:
+        widget: Widget Tk bất kỳ (dùng after() để poll queue)
+        poll_interval_ms: Chu kỳ poll queue
+
+    Callback (đều chạy trên thread Tk):
+        on_progress(info): info gồm done, total, rate, eta_seconds, elapsed_seconds và các khóa thêm
+        on_done(result), on_error(exception), on_cancelled(result hoặc None)
+    """
+
+    def __init__(self, widget, poll_interval_ms: int = 100):
+        self.widget = widget
+        self.poll_interval_ms = poll_interval_ms
+        self.token: Optional[CancellationToken] = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._callbacks: Dict[str, Optional[Callable]] = {}
+        self._tracker: Optional[ThroughputTracker] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, job: JobFn, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+              on_done: Optional[Callable[[Any], None]] = None,
+              on_error: Optional[Callable[[Exception], None]] = None,
+              on_cancelled: Optional[Callable[[Any], None]] = None) -> CancellationToken:
+        """Bắt đầu tác vụ; trả về token để hủy"""
+        if self.running:
+            raise RuntimeError("Đang có tác vụ khác chạy")
+
+        self.token = CancellationToken()
+        self._queue = queue.Queue()
+        self._tracker = ThroughputTracker()
+        self._callbacks = {'progress': on_progress, 'done': on_done,
+                           'error': on_error, 'cancelled': on_cancelled}
+        self._thread = threading.Thread(target=self._run, args=(job, self.token, self._queue), daemon=True)
+        self._thread.start()
+        self.widget.after(self.poll_interval_ms, self._poll)
+        return self.token
+
+    def cancel(self):
+        """Yêu cầu hủy tác vụ đang chạy (tác vụ tự dừng ở lần kiểm tra token kế tiếp)"""
+        if self.token is not None:
+            self.token.cancel()
+
+    @staticmethod
+    def _run(job: JobFn, token: CancellationToken, events: "queue.Queue"):
+        def report(done: int, total: Optional[int] = None, **extra: Any):
+            events.put(('progress', (done, total, extra)))
+
+        try:
+            result = job(token, report)
+            events.put(('cancelled' if token.cancelled else 'done', result))
+        except JobCancelled:
+            events.put(('cancelled', None))
+        except Exception as e:
+            events.put(('cancelled', None) if token.cancelled else ('error', e))
+
+    def _poll(self):
+        """Lấy sự kiện từ queue (chỉ xử lý tiến độ mới nhất của mỗi lượt poll)"""
+        latest_progress = None
+        final_event = None
+        try:
+            while True:
+                kind, payload = self._queue.get_nowait()
+                if kind == 'progress':
+                    latest_progress = payload
+                else:
+                    final_event = (kind, payload)
+                    break
+        except queue.Empty:
+            pass
+
+        try:
+            if latest_progress is not None and self._callbacks.get('progress'):
+                done, total, extra = latest_progress
+                info = self._tracker.update(done, total)
+                info.update(extra)
+                self._callbacks['progress'](info)
+
+            if final_event is not None:
+                kind, payload = final_event
+                callback = self._callbacks.get(kind)
+                if callback:
+                    callback(payload)
+                return
+
+            self.widget.after(self.poll_interval_ms, self._poll)
+        except Exception as e:
+            # Cửa sổ đã bị đóng (TclError...) - dừng tác vụ nền
+            print(f"Lỗi cập nhật tiến độ: {e}")
+            self.cancel()
@@ -0,0 +1,167 @@
+"""
+Tokenizer và parser một lượt cho tập con LaTeX được chấp nhận ở ô nhập liệu
+(\\frac, \\sqrt, ngoặc nhọn, toán tử, hàm).
+
+Parser không dùng regex quay lui và không đệ quy: mỗi token được xử lý đúng
+một lần bằng ngăn xếp tường minh, nên thời gian chạy tuyến tính theo độ dài
+chuỗi kể cả với đầu vào lồng sâu hoặc sai cú pháp.
+"""
+
+import re
+from typing import Callable, List, Tuple, Union
+
+FRAC = "FRAC"
+LBRACE = "LBRACE"
+RBRACE = "RBRACE"
+TEXT = "TEXT"
+
+# Các nhánh rời nhau nên regex không bao giờ quay lui
+_TOKEN_PATTERN = re.compile(r"\\frac|\{|\}|(?:[^\\{}]|\\(?!frac))+")
+
+# Phần tử đầu ra: chuỗi đã mã hóa hoặc phân số (tử, mẫu) chưa ghép
+Piece = Union[str, Tuple[list, list]]
+
+
+class LatexSyntaxError(ValueError):
+    """Lỗi cú pháp LaTeX (ngoặc không cân bằng, \\frac thiếu tử/mẫu...)"""
+
+    def __init__(self, message: str, position: int, source: str):
+        self.position = position
+        self.source = source
+        shown = source if len(source) <= 60 else source[:57] + "..."
+        super().__init__(f"{message} (vị trí {position} trong '{shown}')")
+
+
+def tokenize(source: str) -> List[Tuple[str, str, int]]:
+    """Tách chuỗi thành các token (loại, giá trị, vị trí)"""
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(source):
+        value = match.group()
+        if value == "\\frac":
+            kind = FRAC
+        elif value == "{":
+            kind = LBRACE
+        elif value == "}":
+            kind = RBRACE
+        else:
+            kind = TEXT
+        tokens.append((kind, value, match.start()))
+    return tokens
+
+
+def _finalize(parts: list, encode_text: Callable[[str], str]) -> List[Piece]:
+    """Gộp các đoạn text liền kề rồi mã hóa mỗi đoạn đúng một lần"""
+    finalized = []
+    raw = []
+    for part in parts:
+        if isinstance(part, str):
+            raw.append(part)
+        else:
+            if raw:
+                finalized.append(encode_text("".join(raw)))
+                raw = []
+            finalized.append(part)
+    if raw:
+        finalized.append(encode_text("".join(raw)))
+    return finalized
+
+
+def _flatten(pieces: List[Piece], frac_parts: Tuple[str, str, str] = ("", "a", "")) -> str:
+    """Ghép cây phân số thành chuỗi (không đệ quy); phân số ghép theo frac_parts (mở, giữa, đóng)"""
+    frac_open, frac_middle, frac_close = frac_parts
+    output = []
+    stack = [iter(pieces)]
+    while stack:
+        for piece in stack[-1]:
+            if isinstance(piece, str):
+                output.append(piece)
+            else:
+                numerator, denominator = piece
+                stack.append(iter([frac_close]))
+                stack.append(iter(denominator))
+                stack.append(iter([frac_middle]))
+                stack.append(iter(numerator))
+                output.append(frac_open)
+                break
+        else:
+            stack.pop()
+    return "".join(output)
+
+
+def encode_latex(source: str, encode_text: Callable[[str], str],
+                 frac_parts: Tuple[str, str, str] = ("", "a", "")) -> str:
+    """
+    Phân tích chuỗi LaTeX và sinh phím bấm trong một lượt.
+
+    \\frac{tử}{mẫu} được chuyển thành "<tử>a<mẫu>" (hỗ trợ lồng nhau); như TeX, tử/mẫu
+    không có ngoặc là một ký tự (\\frac12 = \\frac{1}{2}, \\frac{x}2, \\frac1{2}). Các đoạn
+    văn bản còn lại - kể cả ngoặc nhọn không thuộc phân số như \\sqrt{...} - được
+    chuyển qua encode_text (các rule trong mapping.json) đúng một lần.
+
+    frac_parts cho phép ghép phân số theo dạng khác, vd. ("(", ")/(", ")") để
+    sinh biểu thức Python "(tử)/(mẫu)".
+
+    Raises:
+        LatexSyntaxError: ngoặc nhọn không cân bằng hoặc \\frac thiếu tử/mẫu (vd. \\frac, \\frac1)
+    """
+    tokens = tokenize(source)
+    root: list = []
+    # Mỗi frame: (loại, danh sách đầu ra, vị trí mở, tử số đã xong - chỉ với mẫu số)
+    stack = [("root", root, 0, None)]
+    # (vị trí \frac, tử số) khi token kế tiếp phải là '{' hoặc tham số một ký tự
+    pending_frac = None
+
+    for kind, value, position in tokens:
+        if pending_frac is not None and kind == TEXT:
+            # Viết tắt kiểu TeX: tham số là một ký tự (\frac12, \frac{1}2, \frac1{2})
+            offset = len(value) - len(value.lstrip())
+            while pending_frac is not None and offset < len(value):
+                frac_position, numerator = pending_frac
+                argument = _finalize([value[offset]], encode_text)
+                offset += 1
+                if numerator is None:
+                    pending_frac = (frac_position, argument)
+                    offset += len(value[offset:]) - len(value[offset:].lstrip())
+                else:
+                    pending_frac = None
+                    stack[-1][1].append((numerator, argument))
+            if offset >= len(value):
+                continue
+            value, position = value[offset:], position + offset
+
+        if pending_frac is not None:
+            if kind != LBRACE:
+                raise LatexSyntaxError("\\frac phải có dạng \\frac{tử}{mẫu} hoặc \\frac12", position, source)
+            frac_position, numerator = pending_frac
+            pending_frac = None
+            frame_kind = "numerator" if numerator is None else "denominator"
+            stack.append((frame_kind, [], frac_position, numerator))
+            continue
+
+        parts = stack[-1][1]
+        if kind == TEXT:
+            parts.append(value)
+        elif kind == FRAC:
+            pending_frac = (position, None)
+        elif kind == LBRACE:
+            # Nhóm ngoặc thường dùng chung danh sách đầu ra với frame cha
+            parts.append("{")
+            stack.append(("group", parts, position, None))
+        else:
+            frame_kind, parts, frame_position, numerator = stack[-1]
+            if frame_kind == "root":
+                raise LatexSyntaxError("Thừa dấu '}'", position, source)
+            stack.pop()
+            if frame_kind == "group":
+                parts.append("}")
+            elif frame_kind == "numerator":
+                pending_frac = (frame_position, _finalize(parts, encode_text))
+            else:
+                stack[-1][1].append((numerator, _finalize(parts, encode_text)))
+
+    if pending_frac is not None:
+        raise LatexSyntaxError("\\frac phải có dạng \\frac{tử}{mẫu} hoặc \\frac12", pending_frac[0], source)
+    if len(stack) > 1:
+        raise LatexSyntaxError("Thiếu dấu '}'", stack[-1][2], source)
+
+    return _flatten(_finalize(root, encode_text), frac_parts)
@@ -0,0 +1,270 @@
+"""
+Cache kết quả batch trên đĩa (SQLite), dùng chung cho hình học, hệ phương trình
+và phương trình bậc cao.
+
+Mỗi dòng được tra theo khóa = SHA-1 của (phạm vi, dữ liệu đã chuẩn hóa của dòng).
+Phạm vi gồm chế độ, các tham số cố định của batch (đối tượng, phép toán, số ẩn,
+prefix...) và fingerprint nội dung các file quy tắc (mapping.json,
+equation_prefixes.json, cấu hình phiên bản...). Sửa file quy tắc làm đổi phạm vi
+nên kết quả cũ tự động không còn được dùng; chúng bị loại dần theo LRU.
+
+Chỉ kết quả thành công được lưu. Lỗi SQLite không làm hỏng batch: cache in cảnh
+báo và tự tắt cho phần còn lại của lần chạy.
+
+Đường dẫn mặc định: biến môi trường TL_RESULT_CACHE, nếu không có thì
+~/.tl_cache/results.sqlite3
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from config import registry as config_registry
+
+# Tăng khi đổi thuật toán mã hóa/giải hoặc định dạng kết quả để bỏ toàn bộ kết quả cũ
+CACHE_SCHEMA = 2
+DEFAULT_MAX_ENTRIES = 1000000
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Khi vượt giới hạn, loại bớt đến tỉ lệ này của giới hạn để không phải dọn sau mỗi chunk
+EVICTION_TARGET = 0.9
+# Chỉ cập nhật thời điểm dùng khi đã cũ hơn khoảng này (giây) - chạy lại liên tục không phải ghi đĩa
+TOUCH_INTERVAL = 3600
+# Số tham số tối đa trong một câu lệnh IN (...)
+_BATCH = 500
+
+
+def default_cache_path() -> str:
+    return os.environ.get("TL_RESULT_CACHE") or os.path.join(os.path.expanduser("~"), ".tl_cache",
+                                                             "results.sqlite3")
+
+
+def rules_fingerprint(*paths: str) -> str:
+    """Fingerprint gộp của các file quy tắc (file không tồn tại/không đọc được → 'missing')"""
+    parts = [f"schema={CACHE_SCHEMA}"]
+    for path in paths:
+        try:
+            parts.append(config_registry.fingerprint(path))
+        except (OSError, ValueError):
+            parts.append("missing")
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+
+
+def make_scope(mode: str, rules: str, **context: Any) -> str:
+    """Phạm vi khóa của một batch: chế độ + fingerprint quy tắc + tham số cố định"""
+    payload = json.dumps([mode, rules, context], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def row_key(scope: str, inputs: Sequence[Any]) -> str:
+    """Khóa của một dòng trong phạm vi scope (inputs: các giá trị đã chuẩn hóa của dòng)"""
+    payload = "\x1f".join(map(str, inputs))
+    return hashlib.sha1(f"{scope}\x00{payload}".encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache kết quả từng dòng, giới hạn số mục và dung lượng, loại bỏ theo LRU.
+
+    An toàn khi dùng chung giữa nhiều thread (một kết nối, khóa bằng lock).
+    Đếm số lần hit/miss/eviction giống utils.lru_cache.LRUCache.
+
+    Ví dụ:
+        cache = ResultCache()
+        scope = make_scope('equation', rules_fingerprint('config/mapping.json'), so_an=2)
+        keys = [row_key(scope, row) for row in rows]
+        found = cache.get_many(keys)
+        ...
+        cache.put_many('equation', new_items)
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        if max_entries <= 0 or max_bytes <= 0:
+            raise ValueError("max_entries và max_bytes phải lớn hơn 0")
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # (số mục, số byte) ước lượng - chỉ đếm lại chính xác khi ước lượng vượt giới hạn
+        self._usage: Optional[Tuple[int, int]] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ========== KẾT NỐI ==========
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, mode TEXT NOT NULL, value TEXT NOT NULL,"
+                " size INTEGER NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _disable(self, error: Exception):
+        print(f"Cảnh báo: tắt cache kết quả {self.path}: {error}")
+        self.enabled = False
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ========== TRA CỨU / GHI ==========
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """
+        Các kết quả đã có {khóa: giá trị}; đánh dấu là vừa được dùng
+        (thứ tự LRU chính xác đến TOUCH_INTERVAL).
+        """
+        if not self.enabled or not keys:
+            self.misses += len(keys)
+            return {}
+        unique_keys = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        try:
+            with self._lock:
+                conn = self._connect()
+                now = time.time()
+                stale = []
+                for start in range(0, len(unique_keys), _BATCH):
+                    batch = unique_keys[start:start + _BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    for key, value, last_used in conn.execute(
+                            f"SELECT key, value, last_used FROM results WHERE key IN ({placeholders})", batch):
+                        found[key] = json.loads(value)
+                        if now - last_used > TOUCH_INTERVAL:
+                            stale.append((now, key))
+                if stale:
+                    conn.executemany("UPDATE results SET last_used = ? WHERE key = ?", stale)
+                    conn.commit()
+        except sqlite3.Error as e:
+            self._disable(e)
+            found = {}
+        hit_count = sum(1 for key in keys if key in found)
+        self.hits += hit_count
+        self.misses += len(keys) - hit_count
+        return found
+
+    def put_many(self, mode: str, items: Iterable[Tuple[str, Any]]):
+        """Lưu các kết quả (khóa, giá trị JSON được) rồi loại bỏ theo LRU nếu vượt giới hạn"""
+        if not self.enabled:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items:
+            text = json.dumps(value, ensure_ascii=False)
+            rows.append((key, mode, text, len(text.encode('utf-8')), now, now))
+        if not rows:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany("INSERT OR REPLACE INTO results (key, mode, value, size, created, last_used)"
+                                 " VALUES (?, ?, ?, ?, ?, ?)", rows)
+                conn.commit()
+                if self._usage is None:
+                    self._usage = self._count(conn)
+                else:
+                    # INSERT OR REPLACE có thể ghi đè mục cũ nên đây là ước lượng trên
+                    self._usage = (self._usage[0] + len(rows), self._usage[1] + sum(row[3] for row in rows))
+                if self._usage[0] > self.max_entries or self._usage[1] > self.max_bytes:
+                    self._evict(conn)
+        except sqlite3.Error as e:
+            self._disable(e)
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection) -> Tuple[int, int]:
+        entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return entries, total_bytes
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Loại các mục ít dùng nhất cho đến khi dưới EVICTION_TARGET của giới hạn"""
+        entries, total_bytes = self._usage = self._count(conn)
+        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        remove_entries = max(0, entries - int(self.max_entries * EVICTION_TARGET))
+        remove_bytes = max(0, total_bytes - int(self.max_bytes * EVICTION_TARGET))
+        doomed: List[str] = []
+        freed = 0
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_used"):
+            if len(doomed) >= remove_entries and freed >= remove_bytes:
+                break
+            doomed.append(key)
+            freed += size
+        for start in range(0, len(doomed), _BATCH):
+            batch = doomed[start:start + _BATCH]
+            conn.execute(f"DELETE FROM results WHERE key IN ({','.join('?' * len(batch))})", batch)
+        conn.commit()
+        self.evictions += len(doomed)
+        self._usage = (entries - len(doomed), total_bytes - freed)
+
+    # ========== QUẢN LÝ ==========
+    def purge(self, mode: Optional[str] = None, older_than_days: Optional[float] = None) -> int:
+        """Xóa kết quả (theo chế độ / chưa dùng trong older_than_days ngày); trả về số mục đã xóa"""
+        conditions, params = [], []
+        if mode:
+            conditions.append("mode = ?")
+            params.append(mode)
+        if older_than_days is not None:
+            conditions.append("last_used < ?")
+            params.append(time.time() - older_than_days * 86400)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            conn = self._connect()
+            removed = conn.execute(f"DELETE FROM results{where}", params).rowcount
+            conn.commit()
+            self._usage = None
+            # Trả dung lượng trống lại cho hệ điều hành
+            conn.execute("VACUUM")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Thống kê nội dung cache (theo chế độ) và hit/miss của phiên hiện tại"""
+        by_mode: Dict[str, Dict[str, Any]] = {}
+        # Xem thống kê không tạo file cache mới
+        if self._conn is not None or os.path.exists(self.path):
+            with self._lock:
+                conn = self._connect()
+                for mode, entries, size, last_used in conn.execute(
+                        "SELECT mode, COUNT(*), COALESCE(SUM(size), 0), MAX(last_used) FROM results GROUP BY mode"):
+                    by_mode[mode] = {
+                        'entries': entries,
+                        'bytes': size,
+                        'last_used': datetime.fromtimestamp(last_used).isoformat(timespec='seconds'),
+                    }
+        total = self.hits + self.misses
+        return {
+            'path': os.path.abspath(self.path),
+            'file_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            'entries': sum(info['entries'] for info in by_mode.values()),
+            'bytes': sum(info['bytes'] for info in by_mode.values()),
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'modes': by_mode,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / total) if total else None,
+        }
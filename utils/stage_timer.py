@@ -0,0 +1,203 @@
+"""
+Đo thời gian và đếm số lượng theo từng giai đoạn của pipeline batch.
+
+Dùng chung cho batch hình học, hệ phương trình và phương trình bậc cao. Tên
+giai đoạn thống nhất giữa các chế độ để báo cáo so sánh được với nhau:
+
+    open     mở file, đọc header, đếm dòng
+    read     đọc dữ liệu Excel (pd.read_excel / stream openpyxl)
+    extract  tách dữ liệu từng dòng (hệ số, tọa độ...)
+    encode   mã hóa keylog
+    solve    giải hệ / tìm nghiệm
+    build    dựng dòng/bảng kết quả
+    write    ghi workbook kết quả (kể cả định dạng và lưu file)
+    cache    tra cứu / lưu cache kết quả trên đĩa (utils.result_cache)
+    checkpoint  ghi / nạp checkpoint để chạy tiếp batch bị dừng (utils.checkpoint)
+
+Khi mã hóa song song nhiều process, thời gian extract/encode là tổng thời gian
+CPU của các worker (có thể lớn hơn thời gian thực của cả batch).
+
+Báo cáo JSON được ghi cạnh file kết quả: <tên file kết quả>.run.json
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar('T')
+
+STAGE_LABELS = {
+    'open': 'Mở file',
+    'read': 'Đọc',
+    'extract': 'Tách dữ liệu',
+    'encode': 'Mã hóa',
+    'solve': 'Giải',
+    'build': 'Dựng kết quả',
+    'write': 'Ghi',
+    'cache': 'Cache',
+    'checkpoint': 'Checkpoint',
+}
+
+
+class _Stage:
+    __slots__ = ('seconds', 'calls', 'rows')
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.rows = 0
+
+
+class StageTimer:
+    """
+    Bộ đo thời gian theo giai đoạn và bộ đếm cho một lần chạy batch.
+
+    Args:
+        mode: 'geometry', 'equation' hoặc 'polynomial'
+        **context: thông tin thêm ghi vào báo cáo (file đầu vào, phiên bản, số worker...)
+
+    Ví dụ:
+        timer = StageTimer('equation', input=file_path)
+        with timer.stage('read'):
+            df = pd.read_excel(file_path)
+        timer.count('rows_ok', 120)
+        timer.write_report(output_file)
+    """
+
+    def __init__(self, mode: str, **context: Any):
+        self.mode = mode
+        self.context: Dict[str, Any] = dict(context)
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+        self._stages: Dict[str, _Stage] = {}
+        self.counters: Dict[str, int] = {}
+        # Đường dẫn báo cáo đã ghi gần nhất (write_report)
+        self.report_file: Optional[str] = None
+
+    def _get(self, name: str) -> _Stage:
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = _Stage()
+        return stage
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        """Đo thời gian khối lệnh và cộng vào giai đoạn name"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started, rows)
+
+    def add(self, name: str, seconds: float, rows: int = 0, calls: int = 1):
+        """Cộng thời gian đã đo ở nơi khác (ví dụ trong process worker)"""
+        stage = self._get(name)
+        stage.seconds += seconds
+        stage.calls += calls
+        stage.rows += rows
+
+    def add_rows(self, name: str, rows: int):
+        """Cộng số dòng cho giai đoạn mà không tính thêm thời gian"""
+        self._get(name).rows += rows
+
+    def iterate(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Bọc một iterator: thời gian lấy từng phần tử được tính vào giai đoạn name
+        (dùng cho stream đọc Excel theo chunk).
+        """
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - started)
+                return
+            self.add(name, time.perf_counter() - started, len(item) if hasattr(item, '__len__') else 1)
+            yield item
+
+    def count(self, name: str, value: int = 1):
+        """Tăng bộ đếm (rows_ok, rows_error, chunks...)"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        """Chốt thời gian kết thúc (report() tự gọi nếu chưa chốt)"""
+        if self._finished is None:
+            self._finished = time.perf_counter()
+
+    @property
+    def elapsed_seconds(self) -> float:
+        end = self._finished if self._finished is not None else time.perf_counter()
+        return end - self._started
+
+    def report(self, **extra: Any) -> Dict[str, Any]:
+        """Báo cáo dạng dict (có thể ghi thẳng ra JSON)"""
+        self.finish()
+        wall = self.elapsed_seconds
+        stages = {}
+        for name, stage in self._stages.items():
+            stages[name] = {
+                'seconds': round(stage.seconds, 6),
+                'calls': stage.calls,
+                'rows': stage.rows,
+                'rows_per_second': round(stage.rows / stage.seconds, 1) if stage.rows and stage.seconds > 0 else None,
+                'share': round(stage.seconds / wall, 4) if wall > 0 else None,
+            }
+
+        tracked = sum(stage.seconds for stage in self._stages.values())
+        rows = self.counters.get('rows_ok', 0) + self.counters.get('rows_error', 0)
+        report = {
+            'mode': self.mode,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'wall_seconds': round(wall, 6),
+            'untracked_seconds': round(max(0.0, wall - tracked), 6),
+            'rows_per_second': round(rows / wall, 1) if rows and wall > 0 else None,
+            'stages': stages,
+            'counters': dict(self.counters),
+            'context': dict(self.context),
+        }
+        memory_mb = _process_memory_mb()
+        if memory_mb is not None:
+            report['memory_mb'] = round(memory_mb, 1)
+        report.update(extra)
+        return report
+
+    @staticmethod
+    def report_path(output_file: str) -> str:
+        """Đường dẫn báo cáo cạnh file kết quả"""
+        return os.path.splitext(output_file)[0] + ".run.json"
+
+    def write_report(self, output_file: str, **extra: Any) -> Optional[str]:
+        """
+        Ghi báo cáo JSON cạnh file kết quả; trả về đường dẫn báo cáo.
+        Lỗi ghi báo cáo không làm hỏng batch (chỉ in cảnh báo, trả về None).
+        """
+        path = self.report_path(output_file)
+        try:
+            report = self.report(output=os.path.abspath(output_file), **extra)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.report_file = path
+            return path
+        except Exception as e:
+            print(f"Cảnh báo: không ghi được báo cáo thời gian {path}: {e}")
+            return None
+
+    def summary_text(self, limit: int = 3) -> str:
+        """Tóm tắt ngắn cho thanh trạng thái: tổng thời gian và các giai đoạn lâu nhất"""
+        slowest = sorted(self._stages.items(), key=lambda item: item[1].seconds, reverse=True)[:limit]
+        parts = [f"{STAGE_LABELS.get(name, name)} {stage.seconds:.2f}s" for name, stage in slowest]
+        return f"⏱ {self.elapsed_seconds:.2f}s" + (f" ({' | '.join(parts)})" if parts else "")
+
+
+def _process_memory_mb() -> Optional[float]:
+    """RSS của process hiện tại (MB) nếu có psutil"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 1024 / 1024
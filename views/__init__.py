@@ -1,3 +1,11 @@
-from .equation_actions import EquationActions
+# EquationActions được nạp ở lần truy cập đầu tiên (PEP 562) để việc import
+# package views (main_view) không kéo theo các service của chế độ phương trình.
+from importlib import import_module
 
-__all__ = ['EquationActions']
\ No newline at end of file
+__all__ = ['EquationActions']
+
+
+def __getattr__(name):
+    if name == 'EquationActions':
+        return getattr(import_module('.equation_actions', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,15 @@
 # services/equation_services/__init__.py
-from .equation_solver_service import EquationSolverService
-from .batch_processing_service import BatchProcessingService
-from .file_import_export_service import FileImportExportService
-from .data_validation_service import DataValidationService
-from .equation_encoding_service import EquationEncodingService
+# Các service được nạp ở lần truy cập đầu tiên (PEP 562): service batch/import
+# kéo theo pandas, openpyxl nên không được nạp khi chỉ mở giao diện.
+from importlib import import_module
+
+_SERVICE_MODULES = {
+    'EquationSolverService': '.equation_solver_service',
+    'BatchProcessingService': '.batch_processing_service',
+    'FileImportExportService': '.file_import_export_service',
+    'DataValidationService': '.data_validation_service',
+    'EquationEncodingService': '.equation_encoding_service'
+}
 
 __all__ = [
     'EquationSolverService',
@@ -11,4 +17,10 @@ __all__ = [
     'FileImportExportService',
     'DataValidationService',
     'EquationEncodingService'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name in _SERVICE_MODULES:
+        return getattr(import_module(_SERVICE_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
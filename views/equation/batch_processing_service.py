@@ -1,6 +1,13 @@
 # services/batch_processing_service.py
-from typing import List, Dict, Any
+import os
+import time
+from typing import List, Dict, Any, Optional, Sequence
 from processors.excel_processor import ExcelProcessor
+from utils import expressions
+from utils.checkpoint import BatchCheckpoint
+from utils.job_runner import CancellationToken, JobCancelled
+from utils.result_cache import ResultCache, make_scope, row_key, rules_fingerprint
+from utils.stage_timer import StageTimer
 from .equation_solver_service import EquationSolverService
 
 class BatchProcessingService:
@@ -9,38 +16,160 @@ class BatchProcessingService:
         self.excel_processor = excel_processor
         self.solver = EquationSolverService()
 
-    def process_batch_file(self, file_path: str, so_an: int, phien_ban: str) -> List[Dict[str, Any]]:
-        """Xử lý hàng loạt file Excel"""
+    # Số dòng giữa hai lần báo tiến độ / kiểm tra hủy
+    PROGRESS_INTERVAL = 100
+
+    def process_batch_file(self, file_path: str, so_an: int, phien_ban: str, progress_callback=None,
+                           cancel_token: Optional[CancellationToken] = None,
+                           timer: Optional[StageTimer] = None,
+                           versions: Optional[Sequence[str]] = None,
+                           cache: Optional[ResultCache] = None,
+                           checkpoint: Optional[BatchCheckpoint] = None) -> List[Dict[str, Any]]:
+        """
+        Xử lý hàng loạt file Excel (mã hóa từng dòng, giải nghiệm cả file trong một lần)
+
+        Args:
+            progress_callback: progress_callback(phần trăm, số dòng đã xử lý, tổng số dòng, thành công, lỗi)
+            cancel_token: kiểm tra sau mỗi PROGRESS_INTERVAL dòng; bị hủy → JobCancelled
+            timer: đo thời gian các giai đoạn read/extract/encode/solve (tùy chọn)
+            versions: mã hóa cho nhiều phiên bản trong một lượt - hệ số chỉ mã hóa một lần,
+                'ket_qua_tong_theo_phien_ban' chứa chuỗi tổng của từng phiên bản
+                ('ket_qua_tong' vẫn là của phien_ban)
+            cache: cache kết quả trên đĩa - dòng có cùng hệ số, cùng mapping.json /
+                equation_prefixes.json với lần chạy trước không phải mã hóa và giải lại
+            checkpoint: mã hóa + giải theo từng khối checkpoint.interval dòng, mỗi khối xong được
+                ghi vào file checkpoint; nếu checkpoint đã có các khối đầu (cùng file đầu vào,
+                cùng tham số) thì chỉ xử lý phần còn lại. Người gọi xóa checkpoint
+                (checkpoint.complete()) sau khi đã ghi file kết quả
+        """
         try:
-            all_rows_data = self.excel_processor.process_equation_batch(file_path, so_an)
+            timer = timer or StageTimer('equation')
+            timer.context.update(input=os.path.abspath(file_path), so_an=so_an,
+                                 phien_ban=list(versions) if versions else phien_ban)
+            all_rows_data = self.excel_processor.process_equation_batch(file_path, so_an, timer)
+            total_rows = len(all_rows_data)
             results = []
+            error_count = 0
+
+            self.controller.set_so_an(so_an)
+            self.controller.set_phien_ban(phien_ban)
 
-            for row_data in all_rows_data:
-                try:
-                    result = self._process_single_row(row_data, so_an, phien_ban)
+            # Bảng prefix tra một lần cho cả batch; phiên bản chính luôn đứng đầu
+            versions = list(versions) if versions else []
+            prefix_table = {phien_ban: self.controller.get_equation_prefix(so_an, phien_ban)}
+            for version in versions:
+                prefix_table[version] = self.controller.get_equation_prefix(so_an, version)
+
+            rules = rules_fingerprint(self.controller.mapping_manager.mapping_file,
+                                      self.controller.prefixes_file, expressions.MATH_CONFIG_FILE)
+            start_row = 0
+            if checkpoint is not None:
+                with timer.stage('checkpoint'):
+                    start_row = checkpoint.begin('equation', file_path, {
+                        'so_an': so_an, 'phien_ban': phien_ban, 'versions': versions, 'rules': rules
+                    })
+                results.extend(checkpoint.results)
+                error_count = sum(1 for result in results if result.get('trang_thai') == 'Lỗi')
+                timer.context['resumed_rows'] = start_row
+
+            keys: List[str] = []
+            found: Dict[str, Any] = {}
+            if cache is not None:
+                with timer.stage('cache', total_rows - start_row):
+                    scope = make_scope('equation', rules, so_an=so_an, prefixes=prefix_table, versions=versions)
+                    keys = [row_key(scope, row_data['he_so']) for row_data in all_rows_data[start_row:]]
+                    found = cache.get_many(keys)
+                misses = sum(1 for key in keys if key not in found)
+                timer.count('cache_hits', len(keys) - misses)
+                timer.count('cache_misses', misses)
+
+            # Có checkpoint: mã hóa + giải theo từng khối checkpoint.interval dòng rồi ghi khối đó
+            block_size = checkpoint.interval if checkpoint is not None else max(total_rows, 1)
+            for block_start in range(start_row, total_rows, block_size):
+                block_end = min(block_start + block_size, total_rows)
+                pending_solve = []
+                encode_started = time.perf_counter()
+                for done in range(block_start, block_end):
+                    row_data = all_rows_data[done]
+                    if done % self.PROGRESS_INTERVAL == 0:
+                        if cancel_token:
+                            cancel_token.raise_if_cancelled()
+                        if progress_callback and done:
+                            progress_callback(done / total_rows * 100, done, total_rows,
+                                              done - error_count, error_count)
+                    key = keys[done - start_row] if keys else None
+                    if key in found:
+                        results.append(dict(found[key], row_index=row_data['row_index']))
+                        continue
+                    try:
+                        result = self._process_single_row(row_data, so_an, phien_ban, prefix_table)
+                    except Exception as e:
+                        result = {
+                            'row_index': row_data['row_index'],
+                            'trang_thai': 'Lỗi',
+                            'ghi_chu': f"Lỗi xử lý: {str(e)}",
+                            'ket_qua_ma_hoa': '',
+                            'ket_qua_nghiem': f"❌ Lỗi: {str(e)}",
+                            'ket_qua_tong': ''
+                        }
+                    totals = result.pop('ket_qua_tong_theo_phien_ban', {})
+                    if versions:
+                        result['ket_qua_tong_theo_phien_ban'] = {version: totals.get(version, '')
+                                                                  for version in versions}
+                    if 'he_so_dieu_chinh' in result:
+                        pending_solve.append((key, result))
+                    elif result.get('trang_thai') == 'Lỗi':
+                        error_count += 1
                     results.append(result)
-                except Exception as e:
-                    error_result = {
-                        'row_index': row_data['row_index'],
-                        'trang_thai': 'Lỗi',
-                        'ghi_chu': f"Lỗi xử lý: {str(e)}",
-                        'ket_qua_ma_hoa': '',
-                        'ket_qua_nghiem': f"❌ Lỗi: {str(e)}",
-                        'ket_qua_tong': ''
-                    }
-                    results.append(error_result)
+                timer.add('encode', time.perf_counter() - encode_started, block_end - block_start)
+
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
 
+                # Giải tất cả các hệ hợp lệ của khối cùng lúc
+                with timer.stage('solve', len(pending_solve)):
+                    nghiem_list = self.solver.solve_equation_systems(
+                        [result['he_so_dieu_chinh'] for _, result in pending_solve], so_an
+                    )
+                for (_, result), ket_qua_nghiem in zip(pending_solve, nghiem_list):
+                    result['ket_qua_nghiem'] = ket_qua_nghiem
+
+                if cache is not None:
+                    # Khóa theo nội dung hệ số của dòng (row_key), không theo vị trí dòng trong file.
+                    # Chỉ lưu dòng đã mã hóa và giải được; dòng 'Lỗi' (kể cả LaTeX sai) không vào
+                    # pending_solve, dòng có kết quả ❌ (hệ số lỗi, vô nghiệm...) được tính lại ở lần chạy sau
+                    with timer.stage('cache', len(pending_solve)):
+                        cache.put_many('equation', [
+                            (key, {name: value for name, value in result.items() if name != 'row_index'})
+                            for key, result in pending_solve
+                            if not result['ket_qua_nghiem'].startswith('❌')
+                        ])
+
+                if checkpoint is not None:
+                    with timer.stage('checkpoint', block_end - block_start):
+                        checkpoint.append(block_start, results[block_start:block_end])
+
+            timer.count('rows_ok', total_rows - error_count)
+            timer.count('rows_error', error_count)
+            if progress_callback:
+                progress_callback(100.0, total_rows, total_rows, total_rows - error_count, error_count)
             return results
 
+        except JobCancelled:
+            raise
         except Exception as e:
             raise Exception(f"Lỗi xử lý hàng loạt: {str(e)}")
 
-    def _process_single_row(self, row_data: Dict[str, Any], so_an: int, phien_ban: str) -> Dict[str, Any]:
-        """Xử lý một dòng dữ liệu trong chế độ hàng loạt"""
+    def _process_single_row(self, row_data: Dict[str, Any], so_an: int, phien_ban: str,
+                            prefix_table: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Xử lý một dòng dữ liệu trong chế độ hàng loạt (điều chỉnh hệ số và mã hóa).
+        'ket_qua_nghiem' được điền sau bởi solver batch trong process_batch_file.
+
+        prefix_table: {phiên bản: prefix} đã tra sẵn, phien_ban đứng đầu; None → chỉ phiên bản phien_ban
+        """
         try:
             he_so_list = row_data['he_so']
-            required_per_equation = so_an + 1
-            total_required = so_an * required_per_equation
 
             # Xử lý điều chỉnh hệ số
             adjustment_result = self._adjust_coefficients(he_so_list, so_an)
@@ -59,13 +188,17 @@ class BatchProcessingService:
                 }
 
             # Cập nhật controller và xử lý
-            self.controller.set_so_an(so_an)
-            self.controller.set_phien_ban(phien_ban)
             self.controller.set_he_so(danh_sach_he_so_dieu_chinh)
 
             ket_qua_ma_hoa = self.controller.xu_ly_ma_hoa()
-            ket_qua_nghiem = self.solver.solve_equation_system(danh_sach_he_so_dieu_chinh, so_an)
-            ket_qua_tong = self._create_total_result_string(ket_qua_ma_hoa, so_an)
+            if not ket_qua_ma_hoa:
+                raise ValueError("Không mã hóa được hệ số")
+            if prefix_table is None:
+                prefix_table = {phien_ban: self.controller.get_equation_prefix(so_an, phien_ban)}
+            versions = list(prefix_table)
+            ket_qua_tong_list = self._create_total_result_strings(
+                ket_qua_ma_hoa, so_an, [prefix_table[version] for version in versions]
+            )
 
             # Tạo ghi chú điều chỉnh
             ghi_chu_dieu_chinh = ""
@@ -77,8 +210,9 @@ class BatchProcessingService:
                 'trang_thai': 'Thành công',
                 'ghi_chu': ghi_chu_dieu_chinh,
                 'ket_qua_ma_hoa': "=".join(ket_qua_ma_hoa) + "=",
-                'ket_qua_nghiem': ket_qua_nghiem,
-                'ket_qua_tong': ket_qua_tong,
+                'ket_qua_nghiem': '',
+                'ket_qua_tong': ket_qua_tong_list[0],
+                'ket_qua_tong_theo_phien_ban': dict(zip(versions, ket_qua_tong_list)),
                 'he_so_goc': he_so_list,
                 'he_so_dieu_chinh': danh_sach_he_so_dieu_chinh
             }
@@ -151,10 +285,17 @@ class BatchProcessingService:
             'messages': adjustment_messages
         }
 
-    def _create_total_result_string(self, ket_qua_ma_hoa: List[str], so_an: int) -> str:
-        """Tạo chuỗi kết quả tổng với định dạng theo số ẩn"""
-        try:
+    def _create_total_result_string(self, ket_qua_ma_hoa: List[str], so_an: int,
+                                    prefix: Optional[str] = None) -> str:
+        """Tạo chuỗi kết quả tổng với định dạng theo số ẩn (prefix None → phiên bản hiện tại)"""
+        if prefix is None:
             prefix = self.controller.get_equation_prefix(so_an)
+        return self._create_total_result_strings(ket_qua_ma_hoa, so_an, [prefix])[0]
+
+    def _create_total_result_strings(self, ket_qua_ma_hoa: List[str], so_an: int,
+                                     prefixes: Sequence[str]) -> List[str]:
+        """Chuỗi kết quả tổng cho từng prefix; phần hệ số chỉ ghép một lần"""
+        try:
             required_counts = {2: 6, 3: 12, 4: 20}
 
             if so_an in required_counts:
@@ -169,9 +310,10 @@ class BatchProcessingService:
                         3: "== = =",
                         4: "== = = ="
                     }
-                    return f"{prefix}{chuoi_he_so}{ending_map.get(so_an, '=')}"
+                    body = f"{chuoi_he_so}{ending_map.get(so_an, '=')}"
+                    return [f"{prefix}{body}" for prefix in prefixes]
 
-            return "=".join(ket_qua_ma_hoa) + "="
+            return ["=".join(ket_qua_ma_hoa) + "="] * len(prefixes)
 
         except Exception as e:
-            return "=".join(ket_qua_ma_hoa) + "="
\ No newline at end of file
+            return ["=".join(ket_qua_ma_hoa) + "="] * len(prefixes)
\ No newline at end of file
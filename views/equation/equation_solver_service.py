@@ -1,134 +1,24 @@
 import math
-import re
-import json
-from typing import List, Tuple
+from itertools import chain
+from typing import TYPE_CHECKING, List, Tuple
+from utils import expressions
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 class EquationSolverService:
     def __init__(self):
         self.eps = 1e-10
-        self.math_config = self._load_math_replacements()
-
-    def _load_math_replacements(self):
-        """Load math replacements từ JSON config"""
-        try:
-            with open('config/math_replacements.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Lỗi load math config: {e}")
-            return self._get_default_replacements()
-
-    def _get_default_replacements(self):
-        """Fallback config nếu JSON không load được"""
-        return {
-            "math_function_replacements": {
-                "operators": {
-                    "^": {"python_equivalent": "**"}
-                },
-                "functions": {
-                    "sqrt": {"python_equivalent": "math.sqrt"},
-                    "sin": {"python_equivalent": "math.sin"},
-                    "cos": {"python_equivalent": "math.cos"},
-                    "tan": {"python_equivalent": "math.tan"},
-                    "log": {"python_equivalent": "math.log10"},
-                    "ln": {"python_equivalent": "math.log"},
-                    "abs": {"python_equivalent": "abs"},
-                    "exp": {"python_equivalent": "math.exp"}
-                },
-                "constants": {
-                    "pi": {"python_equivalent": "math.pi"},
-                    "e": {"python_equivalent": "math.e"}
-                }
-            },
-            "latex_symbol_replacements": {
-                "mathematical_operators": {
-                    r'\\pi': {"python_equivalent": "math.pi"},
-                    r'\\cdot': {"python_equivalent": "*"},
-                    r'\\times': {"python_equivalent": "*"},
-                    r'\\div': {"python_equivalent": "/"}
-                },
-                "delimiters": {
-                    r'\\left\(': {"python_equivalent": "("},
-                    r'\\right\)': {"python_equivalent": ")"},
-                    r'\\left\{': {"python_equivalent": "("},
-                    r'\\right\}': {"python_equivalent": ")"}
-                },
-                "whitespace": {
-                    r'\\ ': {"python_equivalent": " "},
-                    r'\ ': {"python_equivalent": " "}
-                }
-            },
-            "safe_evaluation_environment": {
-                "allowed_modules": {
-                    "math": {"description": "Python math module"}
-                },
-                "allowed_builtins": {
-                    "abs": {"safe": True},
-                    "round": {"safe": True},
-                    "min": {"safe": True},
-                    "max": {"safe": True}
-                }
-            }
-        }
-
-    def _get_replacements_dict(self):
-        """Tạo dict replacements từ JSON config"""
-        config = self.math_config
-        replacements = {}
-
-        # Load operators  
-        operators = config['math_function_replacements']['operators']
-        for key, value in operators.items():
-            replacements[key] = value['python_equivalent']
-
-        # Load functions
-        functions = config['math_function_replacements']['functions']
-        for key, value in functions.items():
-            replacements[key] = value['python_equivalent']
-
-        # Load constants
-        constants = config['math_function_replacements']['constants']
-        for key, value in constants.items():
-            replacements[key] = value['python_equivalent']
-
-        return replacements
-
-    def _get_safe_dict(self):
-        """Tạo safe evaluation environment từ JSON"""
-        config = self.math_config['safe_evaluation_environment']
-
-        safe_dict = {'__builtins__': {}}
-
-        # Add math module
-        if 'math' in config['allowed_modules']:
-            safe_dict['math'] = math
-
-        # Add allowed builtins
-        allowed_builtins = config['allowed_builtins']
-        for func_name, func_config in allowed_builtins.items():
-            if func_config['safe']:
-                safe_dict[func_name] = eval(func_name)
-
-        return safe_dict
 
-    def _get_latex_replacements(self):
-        """Load LaTeX replacements từ JSON"""
-        config = self.math_config['latex_symbol_replacements']
-        latex_replacements = {}
+    @property
+    def evaluator(self) -> expressions.SafeExpressionEvaluator:
+        """Bộ đánh giá dùng chung (tự dựng lại khi math_replacements.json thay đổi)"""
+        return expressions.get_evaluator()
 
-        # Mathematical operators
-        math_ops = config['mathematical_operators']
-        latex_replacements.update({k: v['python_equivalent'] for k, v in math_ops.items()})
-
-        # Delimiters  
-        delims = config['delimiters']
-        latex_replacements.update({k: v['python_equivalent'] for k, v in delims.items()})
-
-        # Whitespace
-        whitespace = config['whitespace']
-        latex_replacements.update({k: v['python_equivalent'] for k, v in whitespace.items()})
-
-        return latex_replacements
+    @property
+    def math_config(self) -> dict:
+        return expressions.load_math_config()
 
     def solve_equation_system(self, danh_sach_he_so: List[str], so_an: int) -> str:
         """Giải hệ phương trình từ danh sách hệ số"""
@@ -157,53 +47,160 @@ class EquationSolverService:
         except Exception as e:
             return f"❌ Lỗi tính nghiệm: {str(e)}"
 
-    def _eval_math_expression(self, expr: str) -> float:
-        """Đánh giá biểu thức toán học"""
-        expr = expr.strip().replace(' ', '')
-        expr = self._convert_latex_to_python(expr)
-
-        # Sử dụng config từ JSON thay vì hardcode
-        replacements = self._get_replacements_dict()
+    def solve_equation_systems(self, danh_sach_he_so_rows: List[List[str]], so_an: int) -> List[str]:
+        """
+        Giải hàng loạt hệ phương trình cùng số ẩn (chế độ batch).
 
-        for old, new in replacements.items():
-            expr = expr.replace(old, new)
-
-        # Sử dụng safe dict từ JSON config
-        safe_dict = self._get_safe_dict()
+        Các hệ được xếp thành mảng (N, n, n+1) và khử Gauss-Jordan cùng lúc bằng numpy
+        (_giai_he_hang_loat); kết quả giống hệt giải từng hệ bằng solve_equation_system.
 
+        Returns:
+            Chuỗi kết quả cho từng hệ, cùng định dạng với solve_equation_system
+        """
         try:
-            result = eval(expr, safe_dict)
-            return float(result)
+            so_an = int(so_an)
         except Exception as e:
-            raise ValueError(f"Không thể đánh giá: '{expr}'")
-
-    def _convert_latex_to_python(self, expr: str) -> str:
-        """Chuyển đổi biểu thức LaTeX sang Python"""
-        expr = self._convert_latex_fractions(expr)
-
-        # Sử dụng LaTeX replacements từ JSON config
-        latex_replacements = self._get_latex_replacements()
-
-        for latex, python in latex_replacements.items():
-            expr = re.sub(latex, python, expr)
+            return [f"❌ Lỗi tính nghiệm: {str(e)}" for _ in danh_sach_he_so_rows]
+
+        required_count = so_an * (so_an + 1)
+        ket_qua: List[str] = [""] * len(danh_sach_he_so_rows)
+
+        # Mỗi biểu thức chỉ được tính một lần cho cả batch
+        values = {}
+        errors = {}
+        for hs in set(chain.from_iterable(danh_sach_he_so_rows)):
+            try:
+                values[hs] = self._eval_math_expression(hs)
+            except Exception as e:
+                errors[hs] = f"❌ Lỗi hệ số '{hs}': {str(e)}"
+
+        matrices = []
+        matrix_rows = []
+        for row_index, danh_sach_he_so in enumerate(danh_sach_he_so_rows):
+            if len(danh_sach_he_so) < required_count:
+                ket_qua[row_index] = f"❌ Thiếu hệ số: cần {required_count}, hiện có {len(danh_sach_he_so)}"
+            elif errors and not errors.keys().isdisjoint(danh_sach_he_so):
+                # Báo lỗi ở hệ số lỗi đầu tiên như khi giải từng hệ
+                ket_qua[row_index] = next(errors[hs] for hs in danh_sach_he_so if hs in errors)
+            else:
+                matrices.append([values[hs] for hs in danh_sach_he_so[:required_count]])
+                matrix_rows.append(row_index)
+
+        if matrices:
+            import numpy as np
+            augmented = np.asarray(matrices, dtype=float).reshape(len(matrices), so_an, so_an + 1)
+            for row_index, text in zip(matrix_rows, self._giai_he_hang_loat(augmented, so_an)):
+                ket_qua[row_index] = text
+
+        return ket_qua
+
+    def _giai_he_hang_loat(self, augmented: 'np.ndarray', so_an: int) -> List[str]:
+        """
+        Giải mảng ma trận mở rộng (N, n, n+1), trả về chuỗi kết quả cho từng hệ.
+
+        Gauss-Jordan vector hóa trên cả batch: từng phép chọn pivot, chia, trừ được thực hiện
+        theo đúng thứ tự và ngưỡng eps của _gauss_jordan (phép toán float64 của numpy và
+        Python làm tròn như nhau) nên nghiệm, phân loại và cảnh báo sai số giống hệt giải từng hệ.
+        """
+        import numpy as np
 
-        return expr
+        n = so_an
+        eps = self.eps
+        mat = augmented.copy()
+        batch = np.arange(len(mat))
+        ket_qua: List[str] = [""] * len(mat)
+        # Hệ còn đang khử; hệ có inf/nan (ban đầu hoặc tràn số khi khử) được giải lại từng hệ
+        active = np.isfinite(mat).all(axis=(1, 2))
+        fallback = ~active
+
+        with np.errstate(all='ignore'):
+            for i in range(n):
+                # Chọn pivot: hàng đầu tiên có |a_ki| lớn nhất (như vòng lặp trong _gauss_jordan)
+                max_row = i + np.argmax(np.abs(mat[:, i:, i]), axis=1)
+                swap = np.flatnonzero(max_row != i)
+                if len(swap):
+                    hang_i = mat[swap, i].copy()
+                    mat[swap, i] = mat[swap, max_row[swap]]
+                    mat[swap, max_row[swap]] = hang_i
+
+                pivot = mat[:, i, i]
+                suy_bien = active & (np.abs(pivot) < eps)
+                for idx in np.flatnonzero(suy_bien):
+                    ket_qua[idx] = "❌ Hệ vô nghiệm" if abs(mat[idx, i, n]) > eps else "🔶 Hệ vô số nghiệm"
+                active &= ~suy_bien
+
+                # Chuẩn hóa hàng
+                mat[:, i, i:] /= np.where(active, pivot, 1.0)[:, None]
+
+                # Khử các hàng khác (chỉ khi |hệ số| > eps)
+                for k in range(n):
+                    if k == i:
+                        continue
+                    factor = mat[:, k, i].copy()
+                    khu = active & (np.abs(factor) > eps)
+                    mat[:, k, i:] = np.where(khu[:, None], mat[:, k, i:] - factor[:, None] * mat[:, i, i:],
+                                             mat[:, k, i:])
+
+                tran_so = active & ~np.isfinite(mat).all(axis=(1, 2))
+                fallback |= tran_so
+                active &= ~tran_so
+
+        # Trích xuất nghiệm như _gauss_jordan (round của Python, np.round không làm tròn đúng)
+        solved = batch[active]
+        nghiem = np.array([round(value, 8) for value in mat[solved, :, n].ravel().tolist()],
+                          dtype=float).reshape(len(solved), n)
+        nghiem[np.abs(nghiem) < eps] = 0.0
+
+        # Sai số từng phương trình, cộng dồn theo đúng thứ tự của _kiem_tra_va_dinh_dang_nghiem
+        with np.errstate(all='ignore'):
+            original = augmented[solved]
+            tong = np.zeros((len(solved), n))
+            for j in range(n):
+                tong = tong + original[:, :, j] * nghiem[:, None, j]
+            sai_so = np.abs(tong - original[:, :, n])
+        # max() của Python bỏ qua nan còn numpy thì không: hệ có sai số không hữu hạn tính lại từng hệ
+        hop_le = np.isfinite(sai_so).all(axis=1)
+        fallback[solved[~hop_le]] = True
+        solved, nghiem, sai_so = solved[hop_le], nghiem[hop_le], sai_so[hop_le]
+        for idx, text in zip(solved, self._dinh_dang_ket_qua_hang_loat(nghiem, sai_so.max(axis=1), n)):
+            ket_qua[idx] = text
+
+        for idx in batch[fallback]:
+            try:
+                ket_qua[idx] = self._gauss_jordan(augmented[idx].tolist(), n)
+            except Exception as e:
+                ket_qua[idx] = f"❌ Lỗi tính nghiệm: {str(e)}"
+
+        return ket_qua
+
+    def _dinh_dang_ket_qua_hang_loat(self, nghiem: 'np.ndarray', max_sai_so: 'np.ndarray',
+                                     so_an: int) -> List[str]:
+        """Định dạng nghiệm cho cả batch (cùng định dạng với _kiem_tra_va_dinh_dang_nghiem)"""
+        import numpy as np
 
-    def _convert_latex_fractions(self, expr: str) -> str:
-        """Chuyển đổi phân số LaTeX"""
-        fraction_pattern = r'\\frac\{([^{}]+)\}\{([^{}]+)\}'
+        if so_an == 2:
+            template = "✅ x = %.6g, y = %.6g"
+        elif so_an == 3:
+            template = "✅ x = %.6g, y = %.6g, z = %.6g"
+        elif so_an == 4:
+            template = "✅ x₁ = %.6g, x₂ = %.6g, x₃ = %.6g, x₄ = %.6g"
+        else:
+            template = "✅ " + ", ".join(f"x_{i + 1} = %.6g" for i in range(so_an))
 
-        def replace_fraction(match):
-            numerator = match.group(1)
-            denominator = match.group(2)
-            numerator = self._convert_latex_fractions(numerator)
-            denominator = self._convert_latex_fractions(denominator)
-            return f'({numerator})/({denominator})'
+        tam_thuong = (np.abs(nghiem) < 1e-10).all(axis=1)
+        gan_dung = max_sai_so > 1e-6
 
-        while re.search(fraction_pattern, expr):
-            expr = re.sub(fraction_pattern, replace_fraction, expr)
+        ket_qua = []
+        for values, is_trivial, is_approx, sai_so in zip(nghiem.tolist(), tam_thuong, gan_dung, max_sai_so):
+            text = "✅ Nghiệm tầm thường: Tất cả ẩn = 0" if is_trivial else template % tuple(values)
+            if is_approx:
+                text = f"⚠️ Nghiệm gần đúng (sai số: {sai_so:.2e})\n" + text
+            ket_qua.append(text)
+        return ket_qua
 
-        return expr
+    def _eval_math_expression(self, expr: str) -> float:
+        """Đánh giá biểu thức toán học (biên dịch một lần, cache theo chuỗi nguồn)"""
+        return self.evaluator.evaluate(expr)
 
     def _tao_ma_tran_mo_rong(self, he_so: List[float], so_an: int) -> List[List[float]]:
         """Tạo ma trận mở rộng"""
@@ -297,7 +294,7 @@ class EquationSolverService:
     def reload_math_config(self):
         """Reload lại math configuration (hữu ích cho development)"""
         try:
-            self.math_config = self._load_math_replacements()
+            expressions.reload_math_config()
             return True
         except Exception as e:
             print(f"Lỗi khi reload math config: {e}")
@@ -319,13 +316,9 @@ class EquationSolverService:
     def validate_expression(self, expr: str) -> dict:
         """Validate biểu thức trước khi eval"""
         try:
-            # Test conversion
-            converted = self._convert_latex_to_python(expr)
-
-            # Test replacements
-            replacements = self._get_replacements_dict()
-            for old, new in replacements.items():
-                converted = converted.replace(old, new)
+            converted = self.evaluator.to_python(expr)
+            # Kiểm tra cú pháp và danh sách trắng
+            self.evaluator.compile(expr)
 
             return {
                 'valid': True,
@@ -1,9 +1,8 @@
 # services/file_import_export_service.py
-import os
-import pandas as pd
-from tkinter import filedialog, messagebox
 from datetime import datetime
+from typing import Optional, Sequence
 from processors.excel_processor import ExcelProcessor
+from utils.stage_timer import StageTimer
 
 
 class FileImportExportService:
@@ -36,18 +35,32 @@ class FileImportExportService:
                 'error': str(e)
             }
 
-    def export_batch_results(self, original_file_path: str, results: list, so_an: int) -> str:
-        """Xuất kết quả xử lý hàng loạt ra file Excel mới"""
+    @staticmethod
+    def default_output_filename(so_an: int) -> str:
+        """Tên file kết quả mặc định"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"equation_batch_results_{so_an}an_{timestamp}.xlsx"
+
+    def export_batch_results(self, original_file_path: str, results: list, so_an: int,
+                             output_path: Optional[str] = None, timer: Optional[StageTimer] = None,
+                             versions: Optional[Sequence[str]] = None) -> str:
+        """
+        Xuất kết quả xử lý hàng loạt ra file Excel mới.
+
+        Args:
+            output_path: Đường dẫn file kết quả; None → hỏi người dùng bằng hộp thoại lưu file
+            timer: StageTimer của lần chạy; nếu có, báo cáo thời gian (.run.json) được ghi cạnh file kết quả
+            versions: xuất một cột Ket_Qua_Tong_<phiên bản> cho mỗi phiên bản (xem process_batch_file)
+        """
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_filename = f"equation_batch_results_{so_an}an_{timestamp}.xlsx"
-
-            output_path = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                filetypes=[("Excel files", "*.xlsx")],
-                title="Lưu kết quả xử lý hàng loạt",
-                initialfile=output_filename
-            )
+            if output_path is None:
+                from tkinter import filedialog
+                output_path = filedialog.asksaveasfilename(
+                    defaultextension=".xlsx",
+                    filetypes=[("Excel files", "*.xlsx")],
+                    title="Lưu kết quả xử lý hàng loạt",
+                    initialfile=self.default_output_filename(so_an)
+                )
 
             if not output_path:
                 raise Exception("Chưa chọn nơi lưu file kết quả")
@@ -56,23 +69,29 @@ class FileImportExportService:
                 original_file_path,
                 results,
                 output_path,
-                so_an
+                so_an,
+                timer,
+                versions
             )
 
+            if timer is not None:
+                timer.write_report(output_file)
             return output_file
 
         except Exception as e:
             raise Exception(f"Lỗi xuất kết quả: {str(e)}")
 
-    def create_excel_template(self, so_an: int) -> str:
-        """Tạo file Excel template cho equation mode"""
+    def create_excel_template(self, so_an: int, template_path: Optional[str] = None) -> str:
+        """Tạo file Excel template cho equation mode (template_path None → hỏi bằng hộp thoại)"""
         try:
-            template_path = filedialog.asksaveasfilename(
-                defaultextension=".xlsx",
-                filetypes=[("Excel files", "*.xlsx")],
-                title="Lưu template Excel",
-                initialfile=f"equation_template_{so_an}an.xlsx"
-            )
+            if template_path is None:
+                from tkinter import filedialog
+                template_path = filedialog.asksaveasfilename(
+                    defaultextension=".xlsx",
+                    filetypes=[("Excel files", "*.xlsx")],
+                    title="Lưu template Excel",
+                    initialfile=f"equation_template_{so_an}an.xlsx"
+                )
 
             if template_path:
                 output_path = self.excel_processor.create_equation_template(so_an, template_path)
@@ -4,28 +4,27 @@ from tkinter import messagebox, filedialog
 import os
 from datetime import datetime
 
-from processors.excel_processor import ExcelProcessor
-
 # IMPORT TỪ THƯ MỤC equation_services
-from .equation import (
-    EquationSolverService,
-    BatchProcessingService,
-    FileImportExportService,
-    DataValidationService,
-    EquationEncodingService
-)
+# (service batch/import dùng pandas, openpyxl được nạp khi import file lần đầu)
+from .equation.equation_solver_service import EquationSolverService
+from .equation.data_validation_service import DataValidationService
+from .equation.equation_encoding_service import EquationEncodingService
+from .progress_dialog import ProgressDialog
+from utils.job_runner import JobRunner
+from utils.stage_timer import StageTimer
 
 
 class EquationActions:
     def __init__(self, view, controller):
         self.view = view
         self.controller = controller
-        self.excel_processor = ExcelProcessor()
+        self._excel_processor = None
+        self._batch_processor = None
+        self._file_service = None
+        self._job_runner = None
 
         # Khởi tạo các service từ equation_services
         self.solver = EquationSolverService()
-        self.batch_processor = BatchProcessingService(controller, self.excel_processor)
-        self.file_service = FileImportExportService(self.excel_processor)
         self.validation_service = DataValidationService()
         self.encoding_service = EquationEncodingService(controller)
 
@@ -33,6 +32,35 @@ class EquationActions:
         self.imported_file_path = None
         self.imported_file_info = None
 
+    @property
+    def excel_processor(self):
+        """ExcelProcessor dùng chung cho batch/import, khởi tạo ở lần dùng đầu tiên"""
+        if self._excel_processor is None:
+            from processors.excel_processor import ExcelProcessor
+            self._excel_processor = ExcelProcessor()
+        return self._excel_processor
+
+    @property
+    def batch_processor(self):
+        if self._batch_processor is None:
+            from .equation.batch_processing_service import BatchProcessingService
+            self._batch_processor = BatchProcessingService(self.controller, self.excel_processor)
+        return self._batch_processor
+
+    @property
+    def file_service(self):
+        if self._file_service is None:
+            from .equation.file_import_export_service import FileImportExportService
+            self._file_service = FileImportExportService(self.excel_processor)
+        return self._file_service
+
+    @property
+    def job_runner(self) -> JobRunner:
+        """Chạy batch trên worker thread, cập nhật giao diện qua after()"""
+        if self._job_runner is None:
+            self._job_runner = JobRunner(self.view.window)
+        return self._job_runner
+
     def _xu_ly_du_lieu(self):
 
         try:
@@ -86,55 +114,99 @@ class EquationActions:
             raise Exception(f"Lỗi xử lý thủ công: {str(e)}")
 
     def _xu_ly_file_import(self):
-        """Xử lý hàng loạt file Excel đã import"""
+        """Xử lý hàng loạt file Excel đã import (chạy nền, giao diện không bị treo)"""
         try:
             if not self.imported_file_path:
                 messagebox.showerror("Lỗi", "Không tìm thấy file import!")
                 return
 
+            if self.job_runner.running:
+                messagebox.showwarning("Đang xử lý", "Đang có file khác được xử lý, vui lòng đợi hoặc hủy!")
+                return
+
+            file_path = self.imported_file_path
             so_an = int(self.view.so_an_var.get())
-            file_name = os.path.basename(self.imported_file_path)
+            phien_ban = self.view.phien_ban_var.get()
+            file_name = os.path.basename(file_path)
+            batch_processor = self.batch_processor
+            file_service = self.file_service
+
+            # Chọn nơi lưu trước khi chạy nền (hộp thoại phải mở trên thread giao diện)
+            output_path = filedialog.asksaveasfilename(
+                defaultextension=".xlsx",
+                filetypes=[("Excel files", "*.xlsx")],
+                title="Lưu kết quả xử lý hàng loạt",
+                initialfile=file_service.default_output_filename(so_an)
+            )
+            if not output_path:
+                self.view.status_label.config(text="❌ Chưa chọn nơi lưu file kết quả")
+                return
 
             self.view.status_label.config(text=f"⏳ Đang xử lý hàng loạt file: {file_name}...")
-            self.view.window.update()
+            dialog = ProgressDialog(self.view.window, message=f"Đang xử lý hàng loạt: {file_name}",
+                                    on_cancel=self.job_runner.cancel)
 
-            # Xử lý hàng loạt
-            results = self.batch_processor.process_batch_file(
-                self.imported_file_path,
-                so_an,
-                self.view.phien_ban_var.get()
-            )
+            timer = StageTimer('equation')
 
-            if not results:
-                messagebox.showerror("Lỗi", "Không có dữ liệu hợp lệ để xử lý!")
-                return
+            def job(token, report):
+                results = batch_processor.process_batch_file(
+                    file_path, so_an, phien_ban,
+                    progress_callback=lambda progress, done, total, success, errors:
+                        report(done, total, success=success, errors=errors),
+                    cancel_token=token, timer=timer
+                )
+                if not results:
+                    return results, None, timer
+                token.raise_if_cancelled()
+                return results, file_service.export_batch_results(file_path, results, so_an, output_path, timer), timer
 
-            # Xuất kết quả
-            output_file = self.file_service.export_batch_results(
-                self.imported_file_path, results, so_an
-            )
+            def on_done(payload):
+                dialog.close()
+                self._hoan_tat_xu_ly_file_import(*payload)
 
-            # Hiển thị kết quả tổng quan
-            self._display_batch_results(results, output_file)
+            def on_error(error):
+                dialog.close()
+                error_msg = f"Lỗi xử lý hàng loạt: {str(error)}"
+                messagebox.showerror("Lỗi", error_msg)
+                self.view.status_label.config(text=f"❌ {error_msg}")
 
-            # Hiển thị thông báo thành công
-            success_count = sum(1 for r in results if r.get('trang_thai') == 'Thành công')
-            error_count = sum(1 for r in results if r.get('trang_thai') == 'Lỗi')
-            total_rows = len(results)
+            def on_cancelled(_):
+                dialog.close()
+                self.view.status_label.config(text="⏹ Đã hủy xử lý hàng loạt")
 
-            messagebox.showinfo(
-                "Xử lý hàng loạt hoàn tất",
-                f"Đã xử lý {total_rows} dòng dữ liệu:\n"
-                f"- Thành công: {success_count} dòng\n"
-                f"- Lỗi: {error_count} dòng\n\n"
-                f"Kết quả đã được lưu vào file:\n{output_file}"
-            )
+            self.job_runner.start(job, on_progress=dialog.update, on_done=on_done,
+                                  on_error=on_error, on_cancelled=on_cancelled)
 
         except Exception as e:
             error_msg = f"Lỗi xử lý hàng loạt: {str(e)}"
             messagebox.showerror("Lỗi", error_msg)
             self.view.status_label.config(text=f"❌ {error_msg}")
 
+    def _hoan_tat_xu_ly_file_import(self, results, output_file, timer=None):
+        """Hiển thị kết quả sau khi batch chạy nền hoàn tất"""
+        if not results:
+            messagebox.showerror("Lỗi", "Không có dữ liệu hợp lệ để xử lý!")
+            return
+
+        # Hiển thị kết quả tổng quan
+        self._display_batch_results(results, output_file)
+        if timer is not None:
+            # Thời gian theo giai đoạn (chi tiết trong file .run.json cạnh file kết quả)
+            self.view.status_label.config(text=f"✅ Hoàn tất {len(results)} dòng - {timer.summary_text()}")
+
+        # Hiển thị thông báo thành công
+        success_count = sum(1 for r in results if r.get('trang_thai') == 'Thành công')
+        error_count = sum(1 for r in results if r.get('trang_thai') == 'Lỗi')
+        total_rows = len(results)
+
+        messagebox.showinfo(
+            "Xử lý hàng loạt hoàn tất",
+            f"Đã xử lý {total_rows} dòng dữ liệu:\n"
+            f"- Thành công: {success_count} dòng\n"
+            f"- Lỗi: {error_count} dòng\n\n"
+            f"Kết quả đã được lưu vào file:\n{output_file}"
+        )
+
     def _import_excel(self):
         """Import từ Excel"""
         try:
@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
-import json
 import os
+from config import registry as config_registry
 from controllers.equation_controller import EquationController
 from .equation_actions import EquationActions
 
@@ -43,9 +43,9 @@ class EquationView:
             if not os.path.exists(file_path):
                 return ["fx799", "fx800", "fx801", "fx802", "fx803"]
 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("versions", ["fx799", "fx800", "fx801", "fx802", "fx803"])
+            # Danh sách phiên bản dùng chung qua registry cấu hình (chỉ đọc lại khi file thay đổi)
+            data = config_registry.load(file_path)
+            return list(data.get("versions", ["fx799", "fx800", "fx801", "fx802", "fx803"]))
         except Exception as e:
             print(f"Lỗi khi đọc file versions.json: {e}")
             return ["fx799", "fx800", "fx801", "fx802", "fx803"]
@@ -1,15 +1,26 @@
 # geometry_actions.py
 import tkinter as tk
 from shlex import shlex
-from tkinter import messagebox, filedialog, ttk
+from tkinter import messagebox, filedialog
 import os
 from datetime import datetime
+from utils.job_runner import JobRunner
+from utils.stage_timer import StageTimer
+from .progress_dialog import ProgressDialog
 
 
 class GeometryActions:
     def __init__(self, view, controller):
         self.view = view
         self.controller = controller
+        self._job_runner = None
+
+    @property
+    def job_runner(self) -> JobRunner:
+        """Chạy batch trên worker thread, cập nhật giao diện qua after()"""
+        if self._job_runner is None:
+            self._job_runner = JobRunner(self.view.window)
+        return self._job_runner
 
     # === XỬ LÝ NHÓM A ===
     def _thuc_thi_A(self):
@@ -210,62 +221,105 @@ class GeometryActions:
             if not file_path:  # Người dùng hủy
                 return
             start_time = datetime.now()
-            print("start time: " +start_time.strftime("%Y-%m-%d %H:%M:%S"))
 
             # Hiển thị thông báo đang xử lý
             self.view.update_final_result_display("🔄 Đang xử lý file Excel...")
-            self.view.window.update()
-
-            # Lấy thông tin từ UI
-            shape_a = self.view.dropdown1_var.get()
-            shape_b = self.view.dropdown2_var.get() if self.view.pheptoan_var.get() not in ["Diện tích", "Thể tích"] else None
-            operation = self.view.pheptoan_var.get()
-            dimension_a = self.view.kich_thuoc_A_var.get()
-            dimension_b = self.view.kich_thuoc_B_var.get()
-
-            # Gọi controller xử lý batch
-            results, output_file, success_count, error_count = self.controller.process_excel_batch(
-                self.view.imported_file_path, shape_a, shape_b, operation,
-                dimension_a, dimension_b, output_path=file_path  # Truyền output_path
-            )
-            end_time = datetime.now()
-            print("end time:" +end_time.strftime("%Y-%m-%d %H:%M:%S"))
-            processing_time = end_time - start_time
-            processing_seconds = processing_time.total_seconds()
-            print(processing_seconds);
-
-            # Hiển thị kết quả
-            result_text = f"✅ Đã xử lý: {success_count} dòng thành công, {error_count} dòng lỗi"
-            self.view.update_final_result_display(result_text)
-
-            # Thông báo kết quả
-            if error_count == 0:
-                messagebox.showinfo(
-                    "Thành công",
-                    f"✅ ĐÃ XỬ LÝ THÀNH CÔNG!\n\n"
-                    f"• Số dòng: {success_count} dòng\n"
-                    f"• Thời gian bắt đầu: {start_time.strftime('%H:%M:%S')}\n"
-                    f"• Thời gian kết thúc: {end_time.strftime('%H:%M:%S')}\n"
-                    f"• Tổng thời gian: {processing_seconds:.2f} giây\n"
-                    f"• Tốc độ: {success_count / processing_seconds:.1f} dòng/giây\n"
-                    f"• File kết quả: {os.path.basename(output_file)}")
-            else:
-                messagebox.showwarning(
-                    "Hoàn thành với lỗi",
-                    f"⚠️ HOÀN THÀNH VỚI LỖI!\n\n"
-                    f"• Thành công: {success_count} dòng\n"
-                    f"• Lỗi: {error_count} dòng\n"
-                    f"• Thời gian bắt đầu: {start_time.strftime('%H:%M:%S')}\n"
-                    f"• Thời gian kết thúc: {end_time.strftime('%H:%M:%S')}\n"
-                    f"• Tổng thời gian: {processing_seconds:.2f} giây\n"
-                    f"• File kết quả: {os.path.basename(output_file)}"
-                )
+
+            def on_finished(results, output_file, success_count, error_count):
+                end_time = datetime.now()
+                processing_seconds = (end_time - start_time).total_seconds()
+
+                # Hiển thị kết quả
+                result_text = f"✅ Đã xử lý: {success_count} dòng thành công, {error_count} dòng lỗi"
+                self.view.update_final_result_display(result_text)
+
+                # Thông báo kết quả
+                if error_count == 0:
+                    messagebox.showinfo(
+                        "Thành công",
+                        f"✅ ĐÃ XỬ LÝ THÀNH CÔNG!\n\n"
+                        f"• Số dòng: {success_count} dòng\n"
+                        f"• Thời gian bắt đầu: {start_time.strftime('%H:%M:%S')}\n"
+                        f"• Thời gian kết thúc: {end_time.strftime('%H:%M:%S')}\n"
+                        f"• Tổng thời gian: {processing_seconds:.2f} giây\n"
+                        f"• Tốc độ: {success_count / max(processing_seconds, 1e-9):.1f} dòng/giây\n"
+                        f"• File kết quả: {os.path.basename(output_file)}")
+                else:
+                    messagebox.showwarning(
+                        "Hoàn thành với lỗi",
+                        f"⚠️ HOÀN THÀNH VỚI LỖI!\n\n"
+                        f"• Thành công: {success_count} dòng\n"
+                        f"• Lỗi: {error_count} dòng\n"
+                        f"• Thời gian bắt đầu: {start_time.strftime('%H:%M:%S')}\n"
+                        f"• Thời gian kết thúc: {end_time.strftime('%H:%M:%S')}\n"
+                        f"• Tổng thời gian: {processing_seconds:.2f} giây\n"
+                        f"• File kết quả: {os.path.basename(output_file)}"
+                    )
+
+            self._chay_batch_nen(on_finished, output_path=file_path)
 
         except Exception as e:
             error_msg = f"❌ Lỗi xử lý file Excel: {str(e)}"
             self.view.update_final_result_display(error_msg)
             messagebox.showerror("Lỗi xử lý", f"Không thể xử lý file Excel:\n{str(e)}")
 
+    def _chay_batch_nen(self, on_finished, output_path=None, chunksize=1000):
+        """
+        Chạy batch hình học trên worker thread kèm cửa sổ tiến độ (tốc độ, ETA, nút hủy).
+
+        on_finished(results, output_file, success_count, error_count) được gọi trên thread giao diện.
+        """
+        if self.job_runner.running:
+            messagebox.showwarning("Đang xử lý", "Đang có file khác được xử lý, vui lòng đợi hoặc hủy!")
+            return
+
+        # Đọc tham số từ widget trên thread giao diện; worker thread không chạm vào Tk
+        operation = self.view.pheptoan_var.get()
+        params = (
+            self.view.imported_file_path,
+            self.view.dropdown1_var.get(),
+            self.view.dropdown2_var.get() if operation not in ["Diện tích", "Thể tích"] else None,
+            operation,
+            self.view.kich_thuoc_A_var.get(),
+            self.view.kich_thuoc_B_var.get(),
+        )
+        dialog = ProgressDialog(self.view.window, on_cancel=self.job_runner.cancel)
+        timer = StageTimer('geometry')
+
+        def job(token, report):
+            def progress_callback(progress, done, total, success, errors):
+                report(done, total, success=success, errors=errors)
+
+            return self.controller.process_excel_batch_chunked(
+                *params, chunksize=chunksize, progress_callback=progress_callback,
+                output_path=output_path, cancel_token=token, timer=timer
+            )
+
+        def on_done(result):
+            dialog.close()
+            # Thời gian theo giai đoạn (chi tiết trong file .run.json cạnh file kết quả)
+            self.view.last_run_summary = timer.summary_text()
+            self.view._update_quick_stats()
+            on_finished(*result)
+
+        def on_error(error):
+            dialog.close()
+            self.view.update_final_result_display(f"❌ Lỗi xử lý file Excel: {str(error)}")
+            messagebox.showerror("Lỗi xử lý", f"Không thể xử lý file Excel:\n{str(error)}")
+
+        def on_cancelled(result):
+            dialog.close()
+            message = "Đã hủy xử lý giữa chừng"
+            if result:
+                # Các chunk đã xử lý trước khi hủy vẫn được ghi ra file
+                _, output_file, success_count, error_count = result
+                message += f" ({success_count + error_count} dòng đã ghi vào {os.path.basename(output_file)})"
+            self.view.update_final_result_display(message)
+            messagebox.showinfo("Thông báo", "Đã hủy xử lý file Excel")
+
+        self.job_runner.start(job, on_progress=dialog.update, on_done=on_done,
+                              on_error=on_error, on_cancelled=on_cancelled)
+
     # === QUẢN LÝ TRẠNG THÁI IMPORT ===
     def _quit_import_mode(self):
         """Thoát khỏi chế độ import Excel và quay lại nhập liệu thủ công"""
@@ -535,50 +589,13 @@ class GeometryActions:
                 self.view.entry_mat_cau_B4.insert(0, result[3])
 
     def _thuc_thi_import_excel_chunked(self):
-        """Xử lý file Excel lớn với chunk processing"""
+        """Xử lý file Excel lớn với chunk processing (chạy nền, có thể hủy)"""
         try:
             if not self.view.imported_file_path:
                 messagebox.showerror("Lỗi", "Chưa import file Excel!")
                 return
 
-            # Tạo progress window
-            progress_window = self._create_progress_window()
-
-            # Biến để theo dõi hủy
-            self._cancellation_requested = False
-
-            def update_progress(progress, current, total, success, errors):
-                """Cập nhật tiến độ lên GUI"""
-                progress_window.progress_var.set(progress)
-                progress_window.status_label.config(
-                    text=f"Đang xử lý: {current}/{total} dòng | Thành công: {success} | Lỗi: {errors}"
-                )
-                progress_window.update()
-
-            def cancel_processing():
-                """Xử lý hủy bỏ"""
-                self._cancellation_requested = True
-                progress_window.destroy()
-
-            # Gọi controller xử lý với chunk
-            results, output_file, success_count, error_count = self.controller.process_excel_batch_chunked(
-                self.view.imported_file_path,
-                self.view.dropdown1_var.get(),
-                self.view.dropdown2_var.get() if self.view.pheptoan_var.get() not in ["Diện tích", "Thể tích"] else None,
-                self.view.pheptoan_var.get(),
-                self.view.kich_thuoc_A_var.get(),
-                self.view.kich_thuoc_B_var.get(),
-                chunksize=500,  # Có thể điều chỉnh
-                progress_callback=update_progress
-            )
-
-            progress_window.destroy()
-
-            # Hiển thị kết quả
-            if self._cancellation_requested:
-                self.view.update_final_result_display("Đã hủy xử lý giữa chừng")
-                messagebox.showinfo("Thông báo", "Đã hủy xử lý file Excel")
-            else:
+            def on_finished(results, output_file, success_count, error_count):
                 result_text = f"Hoàn thành: {success_count} dòng thành công, {error_count} dòng lỗi"
                 self.view.update_final_result_display(result_text)
 
@@ -589,37 +606,9 @@ class GeometryActions:
                     messagebox.showwarning("Hoàn thành với lỗi",
                                            f"Đã xử lý {success_count} dòng thành công, {error_count} dòng lỗi!\nFile: {os.path.basename(output_file)}")
 
+            self._chay_batch_nen(on_finished, chunksize=500)  # Có thể điều chỉnh
+
         except Exception as e:
             error_msg = f"❌ Lỗi xử lý file Excel: {str(e)}"
             self.view.update_final_result_display(error_msg)
             messagebox.showerror("Lỗi xử lý", f"Không thể xử lý file Excel:\n{str(e)}")
-
-    def _create_progress_window(self):
-        """Tạo cửa sổ hiển thị tiến độ"""
-        progress_window = tk.Toplevel(self.view.window)
-        progress_window.title("Đang xử lý...")
-        progress_window.geometry("400x150")
-        progress_window.transient(self.view.window)
-        progress_window.grab_set()
-
-        # Progress bar
-        tk.Label(progress_window, text="Đang xử lý file Excel...", font=("Arial", 12)).pack(pady=10)
-
-        progress_window.progress_var = tk.DoubleVar()
-        progress_bar = ttk.Progressbar(progress_window, variable=progress_window.progress_var, maximum=100)
-        progress_bar.pack(fill=tk.X, padx=20, pady=5)
-
-        # Status label
-        progress_window.status_label = tk.Label(progress_window, text="Đang khởi tạo...")
-        progress_window.status_label.pack(pady=5)
-
-        # Cancel button
-        tk.Button(progress_window, text="Hủy", command=lambda: self._cancel_processing(progress_window),
-                  bg="#F44336", fg="white").pack(pady=10)
-
-        return progress_window
-
-    def _cancel_processing(self, progress_window):
-        """Xử lý sự kiện hủy"""
-        self._cancellation_requested = True
-        progress_window.destroy()
\ No newline at end of file
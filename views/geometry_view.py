@@ -2,10 +2,10 @@ import tkinter as tk
 from tkinter import messagebox
 import json
 import os
+from config import registry as config_registry
 from controllers.geometry_controller import GeometryController
 from .geometry_actions import GeometryActions
 import gc
-import psutil
 
 
 class GeometryView:
@@ -50,6 +50,8 @@ class GeometryView:
         self.imported_data = False
         self.manual_data_entered = False
         self.imported_file_path = ""
+        # Tóm tắt thời gian theo giai đoạn của batch gần nhất (hiển thị trên header)
+        self.last_run_summary = None
 
     def _initialize_data_storage(self):
         """Khởi tạo storage cho kết quả"""
@@ -81,9 +83,9 @@ class GeometryView:
                     json.dump(default_versions, f, ensure_ascii=False, indent=2)
                 return default_versions["versions"]
 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("versions", ["Phiên bản 1.0"])
+            # Danh sách phiên bản dùng chung qua registry cấu hình (chỉ đọc lại khi file thay đổi)
+            data = config_registry.load(file_path)
+            return list(data.get("versions", ["Phiên bản 1.0"]))
 
         except Exception as e:
             print(f"Lỗi khi đọc file versions.json: {e}")
@@ -239,6 +241,8 @@ class GeometryView:
                 file_name = os.path.basename(self.imported_file_path)
                 file_size = os.path.getsize(self.imported_file_path) / 1024
                 stats_text = f"📁 {file_name} ({file_size:.1f}KB)"
+                if self.last_run_summary:
+                    stats_text += f" | {self.last_run_summary}"
                 self.quick_stats_label.config(text=stats_text)
             elif self.manual_data_entered:
                 shape_a = self.dropdown1_var.get()
@@ -257,6 +261,7 @@ class GeometryView:
     def _update_system_info(self):
         """Cập nhật thông tin hệ thống"""
         try:
+            import psutil
             process = psutil.Process()
             memory_mb = process.memory_info().rss / 1024 / 1024
 
@@ -950,6 +955,7 @@ class GeometryView:
         """Tối ưu hóa sử dụng bộ nhớ"""
         gc.collect()
         try:
+            import psutil
             process = psutil.Process()
             memory_mb = process.memory_info().rss / 1024 / 1024
             if memory_mb > 500:
@@ -0,0 +1,13 @@
+# services/polynomial/__init__.py
+# Service batch kéo theo pandas, numpy, openpyxl nên chỉ được nạp ở lần truy cập đầu tiên (PEP 562)
+from importlib import import_module
+
+__all__ = [
+    'PolynomialBatchService'
+]
+
+
+def __getattr__(name):
+    if name == 'PolynomialBatchService':
+        return getattr(import_module('.polynomial_batch_service', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,321 @@
+# services/polynomial/polynomial_batch_service.py
+import os
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence
+from config import registry as config_registry
+from models.polynomial_models import PolynomialSolver
+from models.polynomial_roots import RootList, batch_find_roots
+from processors.excel_processor import ExcelProcessor
+from utils import expressions
+from utils.checkpoint import BatchCheckpoint
+from utils.job_runner import CancellationToken, JobCancelled
+from utils.result_cache import ResultCache, make_scope, row_key, rules_fingerprint
+from utils.stage_timer import StageTimer
+
+_SUBSCRIPTS = str.maketrans("0123456789", "₀₁₂₃₄₅₆₇₈₉")
+_OVERFLOW_ERROR = "Hệ số quá lớn hoặc quá nhỏ, không tính được nghiệm"
+
+
+class PolynomialBatchService:
+    """
+    Giải hàng loạt phương trình bậc 2, 3, 4 từ file Excel.
+
+    Mỗi hệ số khác nhau chỉ được đánh giá một lần; các dòng được gom theo bậc
+    và giải cùng lúc bằng trị riêng ma trận đồng hành (models.polynomial_roots).
+    """
+
+    def __init__(self, excel_processor: ExcelProcessor, solver: PolynomialSolver = None):
+        self.excel_processor = excel_processor
+        self.solver = solver or PolynomialSolver()
+        self.precision = 6
+
+    def import_excel_file(self, file_path: str, degree: int) -> dict:
+        """Import file Excel và trả về thông tin file"""
+        try:
+            file_info = self.excel_processor.get_file_info(file_path)
+            df = self.excel_processor.read_excel_data(file_path)
+
+            # Validate cấu trúc
+            is_valid, missing_cols = self.excel_processor.validate_polynomial_structure(df, degree)
+            if not is_valid:
+                raise Exception(f"File thiếu các cột: {', '.join(missing_cols)}")
+
+            # Kiểm tra chất lượng dữ liệu
+            quality_info = self.excel_processor.validate_polynomial_data_quality(df, degree)
+
+            return {
+                'file_info': file_info,
+                'quality_info': quality_info,
+                'success': True
+            }
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    # Số dòng mỗi khối giải khi không có checkpoint (giữa hai lần báo tiến độ / kiểm tra hủy)
+    BLOCK_ROWS = 5000
+
+    def process_batch_file(self, file_path: str, degree: int,
+                           timer: Optional[StageTimer] = None,
+                           cache: Optional[ResultCache] = None,
+                           checkpoint: Optional[BatchCheckpoint] = None,
+                           progress_callback=None,
+                           cancel_token: Optional[CancellationToken] = None) -> List[Dict[str, Any]]:
+        """
+        Giải hàng loạt file Excel (bậc lấy từ cột 'Bậc', ô trống → bậc đang chọn)
+
+        Args:
+            timer: đo thời gian các giai đoạn read/extract/solve/build (tùy chọn)
+            cache: cache kết quả trên đĩa - chỉ giải các dòng chưa có trong cache
+            checkpoint: giải theo từng khối checkpoint.interval dòng, mỗi khối xong được ghi vào
+                file checkpoint; các khối đã lưu của lần chạy trước (cùng file, cùng tham số)
+                không phải giải lại. Người gọi xóa checkpoint sau khi đã ghi file kết quả
+            progress_callback: progress_callback(phần trăm, số dòng đã xử lý, tổng số dòng, thành công, lỗi)
+                sau mỗi khối
+            cancel_token: kiểm tra trước mỗi khối; bị hủy → JobCancelled
+
+        Returns:
+            Danh sách kết quả theo thứ tự dòng, chỉ gồm các dòng có dữ liệu
+        """
+        try:
+            # Áp dụng thay đổi của excel_mapping.json / math_replacements.json trước khi giải
+            config_registry.refresh()
+            timer = timer or StageTimer('polynomial')
+            timer.context.update(input=os.path.abspath(file_path), degree=degree)
+            with timer.stage('read'):
+                df = self.excel_processor.read_excel_data(file_path, keep_source=True)
+            timer.add_rows('read', len(df))
+
+            is_valid, missing_cols = self.excel_processor.validate_polynomial_structure(df, degree)
+            if not is_valid:
+                raise Exception(f"File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+
+            with timer.stage('extract', len(df)):
+                extracted = self.excel_processor.extract_polynomial_rows(df, degree)
+            row_indices = np.flatnonzero(extracted['has_data'])
+            if len(row_indices) == 0:
+                raise Exception("Không tìm thấy dòng nào có dữ liệu hợp lệ")
+
+            degrees = extracted['degrees'][row_indices]
+            coefficients = extracted['coefficients'][row_indices]
+            total_rows = len(row_indices)
+            results: List[Dict[str, Any]] = []
+            block_size = self.BLOCK_ROWS
+            if checkpoint is not None:
+                with timer.stage('checkpoint'):
+                    checkpoint.begin('polynomial', file_path, {
+                        'degree': degree, 'precision': self.precision, 'tolerance': self.solver.tolerance,
+                        'rules': rules_fingerprint(expressions.MATH_CONFIG_FILE),
+                    })
+                timer.context['resumed_rows'] = checkpoint.resumed_rows
+                results.extend(checkpoint.results)
+                block_size = checkpoint.interval
+
+            error_count = sum(1 for result in results if result['trang_thai'] == 'Lỗi')
+            for block_start in range(len(results), total_rows, block_size):
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
+                block = slice(block_start, block_start + block_size)
+                block_results = self._solve(row_indices[block], degrees[block], coefficients[block], timer, cache)
+                if checkpoint is not None:
+                    with timer.stage('checkpoint', len(block_results)):
+                        checkpoint.append(block_start, block_results)
+                results.extend(block_results)
+                error_count += sum(1 for result in block_results if result['trang_thai'] == 'Lỗi')
+                if progress_callback:
+                    done = len(results)
+                    progress_callback(done / total_rows * 100, done, total_rows, done - error_count, error_count)
+
+            timer.count('rows_ok', len(results) - error_count)
+            timer.count('rows_error', error_count)
+            return results
+
+        except JobCancelled:
+            raise
+        except Exception as e:
+            raise Exception(f"Lỗi xử lý hàng loạt: {str(e)}")
+
+    def solve_rows(self, row_indices: Sequence[int], degrees: np.ndarray,
+                   coefficients: np.ndarray, timer: Optional[StageTimer] = None) -> List[Dict[str, Any]]:
+        """
+        Giải các dòng đã trích xuất.
+
+        Args:
+            row_indices: chỉ số dòng trong file (0-based, không tính header)
+            degrees: bậc của từng dòng (0 = không hợp lệ)
+            coefficients: ma trận chuỗi hệ số (số dòng, 5) từ bậc cao đến hằng số
+            timer: đánh giá hệ số tính vào extract, tìm nghiệm vào solve, định dạng kết quả vào build
+        """
+        timer = timer or StageTimer('polynomial')
+        num_rows = len(row_indices)
+        results: List[Dict[str, Any]] = [None] * num_rows
+
+        # Đánh giá mỗi hệ số khác nhau đúng một lần (ô trống → 0)
+        with timer.stage('extract'):
+            values: Dict[str, float] = {"": 0.0}
+            errors: Dict[str, str] = {}
+            for hs in pd.unique(coefficients.ravel()):
+                if hs in values or hs in errors:
+                    continue
+                try:
+                    values[hs] = expressions.evaluate(hs)
+                except ValueError as e:
+                    errors[hs] = str(e)
+
+            numeric = np.empty(coefficients.shape, dtype=float)
+            for j in range(coefficients.shape[1]):
+                numeric[:, j] = pd.Series(coefficients[:, j], dtype=object).map(values).to_numpy(dtype=float)
+        timer.count('unique_coefficients', len(values) + len(errors) - 1)
+
+        for degree in self.excel_processor.POLYNOMIAL_DEGREES:
+            rows = np.flatnonzero(degrees == degree)
+            if len(rows) == 0:
+                continue
+            block = numeric[rows, :degree + 1]
+            valid = ~np.isnan(block).any(axis=1) & (np.abs(block[:, 0]) >= self.solver.tolerance)
+            # Hệ số hữu hạn nhưng quá lớn/nhỏ (vd. a = 1e-9, b = 1e300): -b/a tràn số thì
+            # ma trận đồng hành có inf và eigvals báo lỗi cho cả nhóm
+            with np.errstate(all='ignore'):
+                finite = np.isfinite(block).all(axis=1) & np.isfinite(block[:, 1:] / block[:, :1]).all(axis=1)
+            solvable = valid & finite
+
+            with timer.stage('solve', int(solvable.sum())):
+                roots_per_row = self._find_roots(block[solvable])
+            with timer.stage('build', len(rows)):
+                for i, roots in zip(rows[solvable], roots_per_row):
+                    if roots is None:
+                        results[i] = self._error_result(int(row_indices[i]), degree, _OVERFLOW_ERROR)
+                    else:
+                        results[i] = self._success_result(int(row_indices[i]), degree, roots)
+
+                for i, is_valid in zip(rows[~solvable], valid[~solvable]):
+                    message = _OVERFLOW_ERROR if is_valid else self._row_error(coefficients[i, :degree + 1], errors)
+                    results[i] = self._error_result(int(row_indices[i]), degree, message)
+
+        for i in np.flatnonzero(degrees == 0):
+            results[i] = self._error_result(int(row_indices[i]), 0, "Bậc không hợp lệ (chỉ hỗ trợ 2, 3, 4)")
+
+        return results
+
+    def _find_roots(self, block: np.ndarray) -> List[Optional[RootList]]:
+        """
+        batch_find_roots cho một nhóm cùng bậc; nếu cả nhóm lỗi thì giải lại từng dòng.
+        Dòng không tính được nghiệm hữu hạn → None
+        """
+        tolerance = self.solver.tolerance
+        with np.errstate(all='ignore'):
+            try:
+                roots_per_row = batch_find_roots(block, tolerance)
+            except (np.linalg.LinAlgError, ValueError, FloatingPointError):
+                roots_per_row = []
+                for k in range(len(block)):
+                    try:
+                        roots_per_row.extend(batch_find_roots(block[k:k + 1], tolerance))
+                    except (np.linalg.LinAlgError, ValueError, FloatingPointError):
+                        roots_per_row.append(None)
+        return [roots if roots is not None and all(np.isfinite(root) for root, _ in roots) else None
+                for roots in roots_per_row]
+
+    def _solve(self, row_indices: np.ndarray, degrees: np.ndarray, coefficients: np.ndarray,
+               timer: StageTimer, cache: Optional[ResultCache] = None) -> List[Dict[str, Any]]:
+        if cache is not None:
+            return self._solve_rows_cached(cache, row_indices, degrees, coefficients, timer)
+        return self.solve_rows(row_indices, degrees, coefficients, timer)
+
+    def _solve_rows_cached(self, cache: ResultCache, row_indices: np.ndarray, degrees: np.ndarray,
+                           coefficients: np.ndarray, timer: StageTimer) -> List[Dict[str, Any]]:
+        """solve_rows chỉ cho các dòng chưa có trong cache; dòng giải thành công được lưu lại"""
+        with timer.stage('cache', len(row_indices)):
+            scope = make_scope('polynomial', rules_fingerprint(expressions.MATH_CONFIG_FILE),
+                               precision=self.precision, tolerance=self.solver.tolerance)
+            keys = [row_key(scope, [int(row_degree)] + list(row))
+                    for row_degree, row in zip(degrees, coefficients)]
+            found = cache.get_many(keys)
+        missing = np.array([i for i, key in enumerate(keys) if key not in found], dtype=int)
+        timer.count('cache_hits', len(keys) - len(missing))
+        timer.count('cache_misses', len(missing))
+
+        solved = self.solve_rows(row_indices[missing], degrees[missing], coefficients[missing], timer) \
+            if len(missing) else []
+
+        with timer.stage('cache', len(missing)):
+            results: List[Dict[str, Any]] = [None] * len(keys)
+            for i, result in zip(missing, solved):
+                results[i] = result
+            new_items = []
+            for i, key in enumerate(keys):
+                if results[i] is None:
+                    results[i] = dict(found[key], row_index=int(row_indices[i]))
+                elif results[i]['trang_thai'] == 'Thành công':
+                    new_items.append((key, {name: value for name, value in results[i].items()
+                                            if name != 'row_index'}))
+            cache.put_many('polynomial', new_items)
+        return results
+
+    def export_batch_results(self, original_file_path: str, results: List[Dict[str, Any]],
+                             output_path: str, timer: Optional[StageTimer] = None) -> str:
+        """
+        Xuất kết quả hàng loạt ra file Excel (ghi streaming)
+
+        timer: StageTimer của lần chạy; nếu có, báo cáo thời gian (.run.json) được ghi cạnh file kết quả
+        """
+        try:
+            output_file = self.excel_processor.export_polynomial_results(original_file_path, results,
+                                                                         output_path, timer)
+            if timer is not None:
+                timer.write_report(output_file)
+            return output_file
+        except Exception as e:
+            raise Exception(f"Lỗi xuất kết quả: {str(e)}")
+
+    def _row_error(self, row_coefficients: Sequence[str], errors: Dict[str, str]) -> str:
+        """Thông báo lỗi của dòng không giải được (hệ số lỗi đầu tiên hoặc hệ số đầu bằng 0)"""
+        for hs in row_coefficients:
+            if hs in errors:
+                return f"Lỗi hệ số '{hs}': {errors[hs]}"
+        return "Hệ số đầu tiên (a) không được bằng 0"
+
+    def _format_root(self, index: int, root: Any, multiplicity: int) -> str:
+        """Định dạng một nghiệm: x₁ = 1.000000, x₂ = 0.500000 - 0.866025i (kèm bội nếu > 1)"""
+        precision = self.precision
+        name = f"x{str(index).translate(_SUBSCRIPTS)}"
+        if isinstance(root, complex):
+            # Làm tròn trước rồi + 0.0 để -0.0 (vd. phần thực của nghiệm x² + 1) không in thành "-0.000000"
+            real = round(root.real, precision) + 0.0
+            imag = round(root.imag, precision) + 0.0
+            sign = "+" if imag >= 0 else "-"
+            text = f"{name} = {real:.{precision}f} {sign} {abs(imag):.{precision}f}i"
+        else:
+            text = f"{name} = {round(root, precision) + 0.0:.{precision}f}"
+        if multiplicity > 1:
+            text += f" (bội {multiplicity})"
+        return text
+
+    def _success_result(self, row_index: int, degree: int, roots: RootList) -> Dict[str, Any]:
+        root_types = ['complex' if isinstance(root, complex) else 'real' for root, _ in roots]
+        multiplicities = [multiplicity for _, multiplicity in roots]
+        return {
+            'row_index': row_index,
+            'bac': degree,
+            'trang_thai': 'Thành công',
+            'ghi_chu': '',
+            'ket_qua_nghiem': "; ".join(
+                self._format_root(i + 1, root, multiplicity) for i, (root, multiplicity) in enumerate(roots)
+            ),
+            'phan_loai': self.solver.describe_roots(degree, root_types, multiplicities)
+        }
+
+    @staticmethod
+    def _error_result(row_index: int, degree: int, message: str) -> Dict[str, Any]:
+        return {
+            'row_index': row_index,
+            'bac': degree,
+            'trang_thai': 'Lỗi',
+            'ghi_chu': message,
+            'ket_qua_nghiem': f"❌ Lỗi: {message}",
+            'phan_loai': ''
+        }
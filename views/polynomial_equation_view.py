@@ -1,9 +1,12 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
-import json
+from tkinter import ttk, messagebox, filedialog
 import os
+from config import registry as config_registry
 from datetime import datetime
 from controllers.polynomial_controller import PolynomialController
+from utils.job_runner import JobRunner
+from utils.stage_timer import StageTimer
+from views.progress_dialog import ProgressDialog
 
 
 
@@ -33,6 +36,12 @@ class PolynomialEquationView:
         self.is_imported_mode = False
         self.has_manual_data = False
 
+        # Xử lý hàng loạt từ Excel (service kéo theo pandas/openpyxl, tạo khi import lần đầu)
+        self._batch_service = None
+        self._job_runner = None
+        self.imported_file_path = None
+        self.batch_results = None
+
         # Load danh sách phiên bản
         self.phien_ban_list = self._load_phien_ban_from_json()
 
@@ -40,15 +49,31 @@ class PolynomialEquationView:
         self._update_input_fields()
         self._update_button_visibility()
 
+    @property
+    def job_runner(self) -> JobRunner:
+        """Chạy batch trên worker thread, cập nhật giao diện qua after()"""
+        if self._job_runner is None:
+            self._job_runner = JobRunner(self.window)
+        return self._job_runner
+
+    @property
+    def batch_service(self):
+        """PolynomialBatchService, khởi tạo ở lần import Excel đầu tiên"""
+        if self._batch_service is None:
+            from processors.excel_processor import ExcelProcessor
+            from views.polynomial import PolynomialBatchService
+            self._batch_service = PolynomialBatchService(ExcelProcessor())
+        return self._batch_service
+
     def _load_phien_ban_from_json(self, file_path: str = "config/versions.json") -> list:
         """Load danh sách phiên bản từ JSON"""
         try:
             if not os.path.exists(file_path):
                 return ["fx799", "fx880"]
 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("versions", ["fx799", "fx991", "fx570", "fx580", "fx115"])
+            # Danh sách phiên bản dùng chung qua registry cấu hình (chỉ đọc lại khi file thay đổi)
+            data = config_registry.load(file_path)
+            return list(data.get("versions", ["fx799", "fx991", "fx570", "fx580", "fx115"]))
         except Exception as e:
             print(f"Lỗi khi đọc file versions.json: {e}")
             return ["fx799", "fx991", "fx570", "fx580", "fx115"]
@@ -302,7 +327,7 @@ class PolynomialEquationView:
             font=("Arial", 10, "bold"),
             width=15,
             height=2,
-            command=self._import_excel_placeholder
+            command=self._import_excel
         )
         self.btn_import.pack(side="left", padx=10)
 
@@ -328,7 +353,7 @@ class PolynomialEquationView:
             font=("Arial", 10, "bold"),
             width=15,
             height=2,
-            command=self._export_excel_placeholder
+            command=self._export_excel
         )
         self.btn_export.pack(side="left", padx=10)
 
@@ -499,13 +524,164 @@ class PolynomialEquationView:
         self.is_imported_mode = False
         self.status_label.config(text="✏️ Đang nhập liệu thủ công...")
 
-    # Placeholder methods cho các chức năng
-    def _import_excel_placeholder(self):
-        """Placeholder cho import Excel"""
-        messagebox.showinfo("Chức năng", "Import Excel - Chưa được triển khai")
+    # ========== IMPORT / XỬ LÝ HÀNG LOẠT ==========
+    def _import_excel(self):
+        """Import file Excel để giải hàng loạt"""
+        try:
+            file_path = filedialog.askopenfilename(
+                title="Chọn file Excel để import",
+                filetypes=[("Excel files", "*.xlsx *.xls"), ("All files", "*.*")]
+            )
+
+            if not file_path:
+                self.status_label.config(text="❌ Không có file được chọn")
+                return
+
+            degree = int(self.bac_phuong_trinh_var.get())
+            import_result = self.batch_service.import_excel_file(file_path, degree)
+            if not import_result['success']:
+                raise Exception(import_result['error'])
+
+            file_info = import_result['file_info']
+            quality_info = import_result['quality_info']
+            file_name = os.path.basename(file_path)
+
+            if quality_info['rows_with_errors']:
+                messagebox.showwarning(
+                    "Cảnh báo chất lượng dữ liệu",
+                    f"File có vấn đề: {quality_info['rows_with_errors']} dòng lỗi"
+                )
+
+            self.imported_file_path = file_path
+            self.batch_results = None
+            self.is_imported_mode = True
+            self.has_manual_data = False
+
+            degree_summary = ", ".join(
+                f"bậc {bac}: {count}" for bac, count in quality_info['degree_counts'].items()
+            )
+            self.roots_text.delete("1.0", tk.END)
+            self.roots_text.insert("1.0", "\n".join([
+                f"📁 File: {file_name}",
+                f"Số dòng có dữ liệu: {quality_info['rows_with_data']}/{file_info['total_rows']}",
+                f"Phân bố: {degree_summary}" if degree_summary else "",
+                "",
+                "Nhấn 'Giải & Mã hóa' để giải hàng loạt."
+            ]))
+            self.status_label.config(
+                text=f"✅ Đã import: {file_name} ({quality_info['rows_with_data']}/{file_info['total_rows']} dòng có dữ liệu)",
+                fg="#2E7D32"
+            )
+
+        except Exception as e:
+            self.imported_file_path = None
+            self.is_imported_mode = False
+            error_msg = f"Không thể import file Excel: {str(e)}"
+            messagebox.showerror("Lỗi", error_msg)
+            self.status_label.config(text=f"🔴 {error_msg}", fg="#C62828")
+
+    def _process_imported_file(self):
+        """Giải hàng loạt file đã import rồi xuất kết quả (chạy nền, giao diện không bị treo)"""
+        try:
+            if self.job_runner.running:
+                messagebox.showwarning("Đang xử lý", "Đang có file khác được xử lý, vui lòng đợi hoặc hủy!")
+                return
+
+            # Đọc tham số và chọn nơi lưu trên thread giao diện; worker thread không chạm vào Tk
+            degree = int(self.bac_phuong_trinh_var.get())
+            file_path = self.imported_file_path
+            file_name = os.path.basename(file_path)
+            output_path = self._ask_output_path()
+            if not output_path:
+                self.status_label.config(text="🔴 Chưa chọn nơi lưu file kết quả", fg="#C62828")
+                return
+            batch_service = self.batch_service
+
+            self.status_label.config(text=f"⏳ Đang giải hàng loạt file: {file_name}...", fg="#1E3A8A")
+            dialog = ProgressDialog(self.window, message=f"Đang giải hàng loạt: {file_name}",
+                                    on_cancel=self.job_runner.cancel)
+            timer = StageTimer('polynomial')
+
+            def job(token, report):
+                results = batch_service.process_batch_file(
+                    file_path, degree, timer,
+                    progress_callback=lambda progress, done, total, success, errors:
+                        report(done, total, success=success, errors=errors),
+                    cancel_token=token
+                )
+                token.raise_if_cancelled()
+                return results, batch_service.export_batch_results(file_path, results, output_path, timer), timer
+
+            def on_done(payload):
+                dialog.close()
+                self._finish_imported_file(*payload)
+
+            def on_error(error):
+                dialog.close()
+                error_msg = f"Lỗi xử lý hàng loạt: {str(error)}"
+                messagebox.showerror("Lỗi", error_msg)
+                self.status_label.config(text=f"🔴 {error_msg}", fg="#C62828")
+
+            def on_cancelled(_):
+                dialog.close()
+                self.status_label.config(text="⏹ Đã hủy giải hàng loạt", fg="#C62828")
+
+            self.job_runner.start(job, on_progress=dialog.update, on_done=on_done,
+                                  on_error=on_error, on_cancelled=on_cancelled)
+
+        except Exception as e:
+            error_msg = f"Lỗi xử lý hàng loạt: {str(e)}"
+            messagebox.showerror("Lỗi", error_msg)
+            self.status_label.config(text=f"🔴 {error_msg}", fg="#C62828")
+
+    def _finish_imported_file(self, results, output_file, timer):
+        """Hiển thị kết quả sau khi batch chạy nền hoàn tất"""
+        self.batch_results = results
+        success_count = sum(1 for r in results if r['trang_thai'] == 'Thành công')
+        error_count = len(results) - success_count
+
+        self.roots_text.delete("1.0", tk.END)
+        self.roots_text.insert("1.0", "\n".join([
+            f"✅ Giải hàng loạt hoàn tất: {success_count} thành công, {error_count} lỗi",
+            f"File kết quả: {output_file}"
+        ]))
+        # Kèm thời gian theo giai đoạn (chi tiết trong file .run.json cạnh file kết quả)
+        self.status_label.config(
+            text=f"✅ Đã giải hàng loạt: {success_count} thành công, {error_count} lỗi - {timer.summary_text()}",
+            fg="#2E7D32"
+        )
+
+        messagebox.showinfo(
+            "Xử lý hàng loạt hoàn tất",
+            f"Đã xử lý {len(results)} dòng dữ liệu:\n"
+            f"- Thành công: {success_count} dòng\n"
+            f"- Lỗi: {error_count} dòng\n\n"
+            f"Kết quả đã được lưu vào file:\n{output_file}"
+        )
+
+    def _ask_output_path(self):
+        """Hỏi nơi lưu kết quả hàng loạt; trả về đường dẫn hoặc '' nếu hủy"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return filedialog.asksaveasfilename(
+            defaultextension=".xlsx",
+            filetypes=[("Excel files", "*.xlsx")],
+            title="Lưu kết quả giải hàng loạt",
+            initialfile=f"polynomial_batch_results_{timestamp}.xlsx"
+        )
+
+    def _save_batch_results(self, timer=None):
+        """Hỏi nơi lưu và xuất kết quả hàng loạt; trả về đường dẫn hoặc None nếu hủy"""
+        output_path = self._ask_output_path()
+        if not output_path:
+            return None
+        return self.batch_service.export_batch_results(self.imported_file_path, self.batch_results, output_path, timer)
 
     def _process_placeholder(self):
         """Thay thế placeholder: thực hiện xử lý phương trình"""
+        if self.is_imported_mode and self.imported_file_path:
+            self._process_imported_file()
+            return
+
         try:
             degree = int(self.bac_phuong_trinh_var.get())
             version = self.phien_ban_var.get()
@@ -582,12 +758,29 @@ class PolynomialEquationView:
             messagebox.showerror("Lỗi", f"Có lỗi xảy ra: {str(e)}")
             self.status_label.config(text=f"🔴 Lỗi: {str(e)}", fg="#C62828")
 
-    def _export_excel_placeholder(self):
-        """Placeholder cho export Excel"""
-        messagebox.showinfo("Chức năng", "Export Excel - Chưa được triển khai")
+    def _export_excel(self):
+        """Xuất lại kết quả giải hàng loạt gần nhất ra file Excel"""
+        if not self.batch_results:
+            messagebox.showinfo(
+                "Export Excel",
+                "Chưa có kết quả hàng loạt. Hãy import file Excel và nhấn 'Giải & Mã hóa' trước."
+            )
+            return
+
+        try:
+            output_file = self._save_batch_results()
+            if output_file:
+                self.status_label.config(text=f"💾 Đã xuất: {os.path.basename(output_file)}", fg="#2E7D32")
+        except Exception as e:
+            messagebox.showerror("Lỗi", str(e))
+            self.status_label.config(text=f"🔴 Lỗi: {str(e)}", fg="#C62828")
 
     def _reset_all(self):
         """Reset tất cả dữ liệu"""
+        self.imported_file_path = None
+        self.batch_results = None
+        self.is_imported_mode = False
+
         # Clear all entries
         for entry in self.coefficient_entries:
             entry.delete(0, tk.END)
@@ -0,0 +1,59 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Callable, Dict, Optional
+from utils.job_runner import ThroughputTracker
+
+
+class ProgressDialog:
+    """Cửa sổ tiến độ cho tác vụ batch chạy nền: thanh tiến độ, tốc độ, ETA và nút hủy"""
+
+    def __init__(self, parent, title: str = "Đang xử lý...", message: str = "Đang xử lý file Excel...",
+                 on_cancel: Optional[Callable[[], None]] = None):
+        self.on_cancel = on_cancel
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("440x190")
+        self.window.transient(parent)
+        self.window.grab_set()
+        # Đóng cửa sổ bằng nút X tương đương bấm Hủy
+        self.window.protocol("WM_DELETE_WINDOW", self._cancel)
+
+        tk.Label(self.window, text=message, font=("Arial", 12)).pack(pady=10)
+
+        self.progress_var = tk.DoubleVar()
+        ttk.Progressbar(self.window, variable=self.progress_var, maximum=100).pack(fill=tk.X, padx=20, pady=5)
+
+        self.status_label = tk.Label(self.window, text="Đang khởi tạo...")
+        self.status_label.pack(pady=2)
+        self.speed_label = tk.Label(self.window, text="", fg="#555555")
+        self.speed_label.pack(pady=2)
+
+        self.cancel_button = tk.Button(self.window, text="Hủy", command=self._cancel, bg="#F44336", fg="white")
+        self.cancel_button.pack(pady=8)
+
+    def update(self, info: Dict[str, Any]):
+        """Cập nhật từ thông tin tiến độ của JobRunner (done, total, rate, eta_seconds, success, errors)"""
+        done, total = info.get('done', 0), info.get('total')
+        if total:
+            self.progress_var.set(done / total * 100)
+
+        text = f"Đang xử lý: {done}/{total} dòng" if total else f"Đang xử lý: {done} dòng"
+        if 'success' in info:
+            text += f" | Thành công: {info['success']} | Lỗi: {info.get('errors', 0)}"
+        self.status_label.config(text=text)
+        self.speed_label.config(
+            text=f"⚡ {info.get('rate', 0):.0f} dòng/giây | ⏱ Còn lại: {ThroughputTracker.format_eta(info.get('eta_seconds'))}"
+        )
+
+    def _cancel(self):
+        self.cancel_button.config(state="disabled", text="Đang hủy...")
+        self.status_label.config(text="Đang dừng sau chunk hiện tại...")
+        if self.on_cancel:
+            self.on_cancel()
+
+    def close(self):
+        try:
+            self.window.grab_release()
+            self.window.destroy()
+        except tk.TclError:
+            pass